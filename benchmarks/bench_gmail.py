@@ -0,0 +1,56 @@
+"""Latency of fetching the most recent emails against a local stand-in Gmail server, the old
+list + one full get per message path against batched metadata requests.
+
+Run with: uv run benchmarks/bench_gmail.py
+"""
+import os, sys, time, statistics, warnings
+import httplib2
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+warnings.filterwarnings("ignore", category=FutureWarning)
+from googleapiclient.discovery import build
+from googleapiclient.http import BatchHttpRequest
+from google_clients import HttpPool
+from fake_google import FakeGoogle
+from functions import google_ops
+
+SIZES = [5, 20, 50]
+RUNS = 3
+LATENCY = 0.05  # Seconds added to every HTTP request
+
+def gmail_service(url: str):
+    service = build("gmail", "v1", http=httplib2.Http(), client_options={"api_endpoint": url}, static_discovery=True)
+    # The discovery document hard codes Google's batch endpoint
+    service.new_batch_http_request = lambda callback=None: BatchHttpRequest(callback=callback, batch_uri=f"{url}/batch/gmail/v1")
+    return service
+
+def old_fetch(service, limit: int) -> list:
+    messages = service.users().messages().list(userId="me", maxResults=limit, labelIds=["INBOX"]).execute().get("messages", [])
+    return [service.users().messages().get(userId="me", id=m["id"], format="full").execute() for m in messages]
+
+def new_fetch(service, limit: int) -> list:
+    return google_ops._fetch_recent_emails(limit=limit, service=service, http_pool=HttpPool(httplib2.Http))
+
+def measure(gmail: FakeGoogle, fetch, limit: int) -> tuple:
+    times = []
+    for _ in range(RUNS):
+        service = gmail_service(gmail.url)
+        gmail.requests = 0
+        start = time.perf_counter()
+        emails = fetch(service, limit)
+        times.append(time.perf_counter() - start)
+        assert len(emails) == limit
+    return statistics.median(times), gmail.requests
+
+if __name__ == "__main__":
+    gmail = FakeGoogle(messages=max(SIZES), latency=LATENCY).start()
+    try:
+        print(f"Stand-in Gmail with {LATENCY * 1000:.0f} ms per request, batch size {google_ops.GMAIL_BATCH_SIZE}, {google_ops.GMAIL_MAX_CONCURRENT_BATCHES} concurrent batches\n")
+        print(f"{'emails':>6}  {'full gets':>18}  {'batched metadata':>18}  {'speedup':>7}")
+        for size in SIZES:
+            old_time, old_requests = measure(gmail, old_fetch, size)
+            new_time, new_requests = measure(gmail, new_fetch, size)
+            print(f"{size:>6}  {old_time * 1000:8.0f} ms {old_requests:3d} req  {new_time * 1000:8.0f} ms {new_requests:3d} req  {old_time / new_time:6.1f}x")
+    finally:
+        gmail.stop()
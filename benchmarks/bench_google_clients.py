@@ -0,0 +1,60 @@
+"""Cold and warm latency of a calendar call against a local stand-in Google endpoint, building
+credentials, service and connection per call as before against the shared GoogleClients.
+
+Run with: uv run benchmarks/bench_google_clients.py
+"""
+import os, sys, time, datetime, tempfile, statistics, warnings
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+warnings.filterwarnings("ignore", category=FutureWarning)
+from google.oauth2.credentials import Credentials
+from fake_google import FakeGoogle
+from google_clients import GoogleClients
+from functions import google_ops
+
+CALLS = 20
+LATENCY = 0.03  # Seconds added to every HTTP request
+CONNECT_LATENCY = 0.1  # Seconds added to every new connection, TCP and TLS handshakes
+
+def write_token(path: str, url: str):
+    expiry = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None) + datetime.timedelta(hours=1)
+    creds = Credentials(token="token", refresh_token="refresh", token_uri=f"{url}/token", client_id="client", client_secret="secret", scopes=google_ops.SCOPES, expiry=expiry)
+    with open(path, "w") as f:
+        f.write(creds.to_json())
+
+def per_call(token_path: str, options: dict):
+    # What every calendar call did before: read the token, build the service, open a connection
+    creds = Credentials.from_authorized_user_file(token_path, google_ops.SCOPES)
+    service = google_ops.build("calendar", "v3", credentials=creds, cache_discovery=False, client_options=options)
+    return google_ops._fetch_calendar_events(days=7, service=service)
+
+def timed(call) -> float:
+    start = time.perf_counter()
+    call()
+    return (time.perf_counter() - start) * 1000
+
+def report(label: str, google: FakeGoogle, call):
+    google.connections = 0
+    cold = timed(call)
+    warm = [timed(call) for _ in range(CALLS)]
+    print(f"{label:<16} {cold:8.0f} ms {statistics.median(warm):8.1f} ms {max(warm):8.1f} ms {google.connections:6d}")
+
+if __name__ == "__main__":
+    google = FakeGoogle(latency=LATENCY, connect_latency=CONNECT_LATENCY).start()
+    options = {"api_endpoint": google.url}
+    with tempfile.TemporaryDirectory() as directory:
+        token_path = os.path.join(directory, "google_token.json")
+        write_token(token_path, google.url)
+        clients = GoogleClients(
+            load_credentials=lambda: Credentials.from_authorized_user_file(token_path, google_ops.SCOPES),
+            build=google_ops.build, client_options=options,
+        )
+        try:
+            print(f"Stand-in Google with {LATENCY * 1000:.0f} ms per request and {CONNECT_LATENCY * 1000:.0f} ms per new connection, {CALLS} warm calls\n")
+            print(f"{'':<16} {'cold':>11} {'warm p50':>11} {'warm max':>11} {'conns':>6}")
+            report("per call", google, lambda: per_call(token_path, options))
+            report("GoogleClients", google, lambda: google_ops._fetch_calendar_events(days=7, service=clients.service("calendar", "v3")))
+        finally:
+            clients.reset()
+            google.stop()
@@ -0,0 +1,65 @@
+"""Logging overhead per frame on the event loop thread, the old synchronous FileHandler
+against the queued JSON logging of observer.setup_logging, with the default throttling and
+sampling and with both turned off, which writes every record like the synchronous run.
+
+Each frame logs what MetricsLogger logs for an LLM turn's metrics, and every tenth frame a
+tool payload the size of a formatted inbox.
+
+Run with: uv run benchmarks/bench_logging.py
+"""
+import os, sys, time, logging, tempfile, statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+import observer
+
+FRAMES = 20000
+PAYLOAD = "From: someone@example.com\nSubject: Quarterly review\n" * 200
+
+def log_frame(n: int):
+    logging.info(f"Metric: TTFBMetricsData, time to first byte: {0.123 + n * 1e-6}")
+    logging.info(f"Metric: ProcessingMetricsData, processing: {0.456 + n * 1e-6}")
+    logging.info(f"Metric: TTSUsageMetricsData, characters: {n % 300}")
+    if n % 10 == 0:
+        logging.info(f"get_recent_emails output: {PAYLOAD}")
+
+def run() -> list:
+    times = []
+    for n in range(FRAMES):
+        start = time.perf_counter()
+        log_frame(n)
+        times.append((time.perf_counter() - start) * 1e6)
+    return times
+
+def synchronous(log_dir: str) -> list:
+    # What setup_logging did before
+    logging.basicConfig(filename=os.path.join(log_dir, "sync.txt"), level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', filemode='w', force=True)
+    return run()
+
+def queued(log_dir: str, log_format: str, throttled: bool=True) -> list:
+    noise_filter = None if throttled else observer.NoiseFilter(rate=float("inf"), burst=float("inf"), sampled={})
+    observer.setup_logging(log_dir=log_dir, log_format=log_format, noise_filter=noise_filter)
+    try:
+        return run()
+    finally:
+        observer.stop_logging()
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as log_dir:
+        results, sizes = {}, {}
+        for label, run_logging in [
+            ("sync FileHandler", lambda: synchronous(log_dir)),
+            ("queued JSON, all", lambda: queued(log_dir, "json", throttled=False)),
+            ("queued text, all", lambda: queued(log_dir, "text", throttled=False)),
+            ("queued JSON", lambda: queued(log_dir, "json")),
+        ]:
+            before = set(os.listdir(log_dir))
+            results[label] = run_logging()
+            time.sleep(1)  # Log files are named by the second
+            written, = set(os.listdir(log_dir)) - before
+            sizes[label] = os.path.getsize(os.path.join(log_dir, written))
+        logging.basicConfig(handlers=[logging.NullHandler()], force=True)
+
+    print(f"{'':<18} {'mean':>10} {'p50':>10} {'p99':>10} {'written':>10}")
+    for label, times in results.items():
+        times.sort()
+        print(f"{label:<18} {statistics.mean(times):6.1f} us {times[len(times) // 2]:6.1f} us {times[int(len(times) * 0.99)]:6.1f} us {sizes[label] / 1024:7.0f} KB")
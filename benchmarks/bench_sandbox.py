@@ -0,0 +1,44 @@
+"""Latency of run_python_code on a warm sandbox worker against spawning a worker per call,
+with the old in-process exec for reference.
+
+Run with: uv run benchmarks/bench_sandbox.py
+"""
+import os, sys, time, statistics, warnings
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+warnings.filterwarnings("ignore", category=FutureWarning)
+from functions import sandbox
+from sandbox_worker import SAFE_MODULE_NAMES, execute
+
+RUNS = 20
+CODE = "import math\nprint(sum(math.sqrt(i) for i in range(1000)))"
+
+def timed(call) -> float:
+    start = time.perf_counter()
+    call()
+    return (time.perf_counter() - start) * 1000
+
+def cold_spawn():
+    worker = sandbox.SandboxWorker()
+    try:
+        worker.run(CODE, sandbox.SANDBOX_TIMEOUT, sandbox.SANDBOX_CPU_SECONDS, sandbox.SANDBOX_OUTPUT_LIMIT)
+    finally:
+        worker.kill()
+
+if __name__ == "__main__":
+    modules = {name: __import__(name) for name in SAFE_MODULE_NAMES}
+    pool = sandbox.SandboxPool(size=1)
+    pool.start()
+    pool.run("pass")  # Wait for the worker to finish starting
+    try:
+        results = {
+            "in-process exec": [timed(lambda: execute(CODE, modules, sandbox.SANDBOX_OUTPUT_LIMIT)) for _ in range(RUNS)],
+            "warm pool": [timed(lambda: pool.run(CODE)) for _ in range(RUNS)],
+            "cold spawn": [timed(cold_spawn) for _ in range(RUNS // 4)],
+        }
+    finally:
+        pool.close()
+
+    print(f"{'':<16} {'p50':>10} {'max':>10}")
+    for label, times in results.items():
+        print(f"{label:<16} {statistics.median(times):7.2f} ms {max(times):7.2f} ms")
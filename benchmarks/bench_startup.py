@@ -0,0 +1,89 @@
+"""Import cost of the tool modules, eager imports against the lazy ToolRegistry.
+
+Every measurement runs in a fresh interpreter so nothing is already in sys.modules.
+The import time report parses ``python -X importtime`` and lists the slowest modules.
+
+Run with: uv run benchmarks/bench_startup.py
+"""
+import os, sys, time, subprocess
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+sys.path.insert(0, SRC_DIR)
+from tool_registry import TOOL_MODULES
+from config import DEFAULT_TOOLS
+
+RUNS = 3
+TOP = 15
+# Already paid for by the pipeline itself, so it is not counted against the tools
+BASELINE = "import pipecat.services.llm_service, pipecat.adapters.schemas.function_schema"
+
+# Modules with platform only dependencies (winsound on Linux) are skipped rather than failing the run
+EAGER = BASELINE + """
+import importlib, time
+from tool_registry import TOOL_MODULES
+start = time.perf_counter()
+for module in dict.fromkeys(TOOL_MODULES.values()):
+    try:
+        importlib.import_module(module)
+    except ImportError:
+        pass
+print(time.perf_counter() - start)
+"""
+
+LAZY = BASELINE + """
+import time
+from tool_registry import ToolRegistry
+from config import DEFAULT_TOOLS
+start = time.perf_counter()
+registry = ToolRegistry(enabled=DEFAULT_TOOLS)
+for name in DEFAULT_TOOLS:
+    try:
+        registry.tool(name)
+    except ImportError:
+        pass
+print(time.perf_counter() - start)
+"""
+
+def run(code: str, *flags: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, *flags, "-c", code], cwd=SRC_DIR, capture_output=True, text=True)
+
+def timed(code: str) -> str:
+    results = []
+    for _ in range(RUNS):
+        proc = run(code)
+        if proc.returncode != 0:
+            return f"failed: {proc.stderr.strip().splitlines()[-1]}"
+        results.append(float(proc.stdout.strip().splitlines()[-1]))
+    return f"{min(results) * 1000:8.1f} ms"
+
+def import_times(code: str) -> subprocess.CompletedProcess:
+    proc = run(code, "-X", "importtime")
+    proc.rows = []  # (self us, cumulative us, module)
+    for line in proc.stderr.splitlines():
+        if line.startswith("import time:") and "self [us]" not in line:
+            self_us, cumulative_us, name = (part.strip() for part in line[len("import time:"):].split("|"))
+            proc.rows.append((int(self_us), int(cumulative_us), name))
+    return proc
+
+if __name__ == "__main__":
+    modules = list(dict.fromkeys(TOOL_MODULES.values()))
+    print(f"Enabled tools: {len(DEFAULT_TOOLS)} of {len(TOOL_MODULES)}\n")
+    baseline = {name for _, _, name in import_times(BASELINE).rows}
+    print("Per module import time (fresh interpreter, -X importtime):")
+    slowest = {}
+    for module in modules:
+        proc = import_times(f"{BASELINE}\nimport {module}")
+        total = next((cumulative for _, cumulative, name in proc.rows if name == module), None)
+        status = "import failed" if proc.returncode != 0 else f"{total / 1000:7.1f} ms cumulative"
+        print(f"  {module:<28} {status}")
+        for self_us, _, name in proc.rows:
+            if name not in baseline:
+                slowest[name] = max(slowest.get(name, 0), self_us)
+
+    print(f"\nSlowest {TOP} individual imports by self time:")
+    for name, self_us in sorted(slowest.items(), key=lambda item: -item[1])[:TOP]:
+        print(f"  {name:<50} {self_us / 1000:7.1f} ms")
+
+    print(f"\nTool import wall time, best of {RUNS}:")
+    print(f"  {'eager (every tool module)':<40} {timed(EAGER)}")
+    print(f"  {'ToolRegistry (enabled schemas only)':<40} {timed(LAZY)}")
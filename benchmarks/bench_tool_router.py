@@ -0,0 +1,92 @@
+"""Tool schema payload and latency with and without the ToolRouter, replayed over the
+user turns recorded in .history.
+
+By default it reports estimated tool schema tokens, the router's own overhead and how often
+the tools block is unchanged from the previous turn, which is when Ollama can reuse the
+cached prompt prefix, with the sticky selection ToolSelector uses and without it. With
+--ollama MODEL it also sends each turn to a local Ollama with both tool sets and reports
+the prompt tokens Ollama evaluated and how long the prefill took.
+
+Run with: uv run benchmarks/bench_tool_router.py [--ollama mistral-nemo]
+"""
+import os, sys, glob, json, time, argparse, statistics, urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+from tool_registry import ToolRegistry, TOOL_MODULES
+from tool_router import ToolRouter
+from config import DEFAULT_TOOLS
+
+REPEATS = 200
+
+def load_turns() -> list:
+    turns = []
+    for path in sorted(glob.glob(os.path.join(ROOT, ".history", "**", "*.txt"), recursive=True)):
+        with open(path, encoding="utf-8") as f:
+            turns.extend(line[len("User:"):].strip() for line in f if line.startswith("User:"))
+    return turns
+
+def payload(schemas) -> list:
+    return [{"type": "function", "function": schema.to_default_dict()} for schema in schemas]
+
+def tokens(schemas) -> int:
+    # Same ~4 characters per token estimate the context governor uses
+    return len(json.dumps(payload(schemas))) // 4
+
+def ollama_prefill(model: str, system_prompt: str, text: str, tools: list) -> tuple:
+    body = json.dumps({
+        "model": model,
+        "messages": [{"role": "system", "content": system_prompt}, {"role": "user", "content": text}],
+        "tools": tools,
+        "stream": False,
+        "options": {"num_predict": 1},
+    }).encode("utf-8")
+    request = urllib.request.Request("http://localhost:11434/api/chat", data=body, headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=120) as response:
+        result = json.loads(response.read())
+    return result.get("prompt_eval_count", 0), result.get("prompt_eval_duration", 0) / 1e6
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ollama", metavar="MODEL", help="also measure real prefill against a local Ollama")
+    parser.add_argument("--all-tools", action="store_true", help="route over every tool instead of the default profile")
+    parser.add_argument("--top-k", type=int, default=2)
+    args = parser.parse_args()
+
+    registry = ToolRegistry(enabled=list(TOOL_MODULES) if args.all_tools else DEFAULT_TOOLS)
+    full = registry.schemas()
+    router = ToolRouter(registry.tools(), top_k=args.top_k)
+    turns = load_turns()
+    if not turns:
+        sys.exit("No recorded user turns found in .history")
+
+    print(f"{len(turns)} user turns, {len(full)} tools enabled, top_k={args.top_k}\n")
+    print(f"{'utterance':<50} {'full':>6} {'routed':>7} {'route us':>9}  tools")
+    routed_tokens, route_times, selections = [], [], []
+    current, fresh, kept, kept_fresh = [], [], 0, 0
+    for text in turns:
+        start = time.perf_counter()
+        for _ in range(REPEATS):
+            selection = router.select(text, current=current)
+            schemas = router.schemas(selection)
+        route_times.append((time.perf_counter() - start) / REPEATS * 1e6)
+        routed_tokens.append(tokens(schemas))
+        kept += selection == current
+        kept_fresh += router.select(text) == fresh
+        current, fresh = selection, router.select(text)
+        selections.append(selection)
+        print(f"{text[:50]:<50} {tokens(full):>6} {routed_tokens[-1]:>7} {route_times[-1]:>9.1f}  {', '.join(selection)}")
+
+    print(f"\nTool schema tokens per request: {tokens(full)} without the router, {statistics.mean(routed_tokens):.0f} on average with it")
+    print(f"Router overhead: median {statistics.median(route_times):.1f} us per turn")
+    print(f"Tools block cache hits: {kept / len(turns):.0%} of turns sticky, {kept_fresh / len(turns):.0%} reselecting every turn")
+
+    if args.ollama:
+        system_prompt = open(os.path.join(ROOT, "tools", "system.txt"), encoding="utf-8").read()
+        results = {"full": [], "routed": []}
+        for text, selection in zip(turns, selections):
+            for label, schemas in (("full", full), ("routed", router.schemas(selection))):
+                results[label].append(ollama_prefill(args.ollama, system_prompt, text, payload(schemas)))
+        print(f"\nOllama ({args.ollama}) prefill per turn:")
+        for label, samples in results.items():
+            print(f"  {label:<7} {statistics.mean(s[0] for s in samples):7.0f} prompt tokens  {statistics.mean(s[1] for s in samples):8.1f} ms")
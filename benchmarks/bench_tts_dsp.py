@@ -0,0 +1,48 @@
+"""Throughput of the TTS output path: the old volume multiply plus the transport's
+stream resampler, against the single OutputDSP stage.
+
+Run with: uv run benchmarks/bench_tts_dsp.py
+"""
+import os, sys, time, asyncio
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+from dsp import OutputDSP
+from pipecat.audio.utils import create_stream_resampler
+
+IN_RATE = 22050
+OUT_RATE = 16000
+VOLUME = 0.3
+SECONDS = 60
+
+def make_audio() -> bytes:
+    t = np.arange(IN_RATE * SECONDS) / IN_RATE
+    return (12000 * np.sin(2 * np.pi * 220 * t) * np.sin(2 * np.pi * 0.5 * t)).astype(np.int16).tobytes()
+
+async def bench_old_path(audio: bytes) -> float:
+    resampler = create_stream_resampler()
+    start = time.perf_counter()
+    # Volume on the whole utterance, 4096 byte frames, resampled by the output transport
+    scaled = (np.frombuffer(audio, dtype=np.int16) * VOLUME).astype(np.int16).tobytes()
+    for i in range(0, len(scaled), 4096):
+        await resampler.resample(scaled[i : i + 4096], IN_RATE, OUT_RATE)
+    return time.perf_counter() - start
+
+def bench_dsp(audio: bytes, soft_limit: bool) -> float:
+    dsp = OutputDSP(in_rate=IN_RATE, out_rate=OUT_RATE, gain=VOLUME, soft_limit=soft_limit)
+    frame_bytes = IN_RATE * 20 // 1000 * 2
+    start = time.perf_counter()
+    for i in range(0, len(audio), frame_bytes):
+        dsp.process(audio[i : i + frame_bytes])
+    dsp.flush()
+    return time.perf_counter() - start
+
+def report(name: str, seconds: float):
+    print(f"{name:<40} {seconds * 1000:8.1f} ms  {SECONDS / seconds:8.0f}x realtime")
+
+if __name__ == "__main__":
+    audio = make_audio()
+    print(f"{SECONDS} s of {IN_RATE} Hz audio -> {OUT_RATE} Hz")
+    report("volume + transport stream resampler", min(asyncio.run(bench_old_path(audio)) for _ in range(3)))
+    report("OutputDSP (20 ms frames)", min(bench_dsp(audio, False) for _ in range(3)))
+    report("OutputDSP + soft limit (20 ms frames)", min(bench_dsp(audio, True) for _ in range(3)))
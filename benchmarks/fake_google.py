@@ -0,0 +1,128 @@
+"""A local stand-in for the parts of the Gmail and Calendar APIs the assistant uses.
+
+Serves Gmail messages().list, messages().get in ``full`` and ``metadata`` format and
+multipart/mixed batch requests, and Calendar events().list, adding a fixed delay to every
+HTTP request to play the part of the round trip to Google and ``connect_latency`` to every
+new connection for the TCP and TLS handshakes. Full messages carry a body of
+``body_bytes`` so the cost of downloading whole messages shows up too.
+"""
+import base64, email, json, re, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+MESSAGE_PATH = re.compile(r"^/gmail/v1/users/me/messages/([^/?]+)$")
+
+class FakeGoogle:
+    def __init__(self, messages: int=100, latency: float=0.05, body_bytes: int=40_000, connect_latency: float=0.0):
+        self.latency = latency
+        self.connect_latency = connect_latency
+        self.requests = 0
+        self.connections = 0
+        self._body = base64.urlsafe_b64encode(b"x" * body_bytes).decode()
+        self._messages = {
+            f"m{i}": {
+                "From": f"sender{i}@example.com",
+                "Date": f"Mon, {1 + i % 28:02d} Jan 2024 10:00:00 +0000",
+                "Subject": f"Subject {i}",
+                "To": "me@example.com",
+                "Received": "by example.com",
+                "snippet": f"Snippet of message {i}",
+                "labelIds": ["INBOX", "UNREAD"] if i % 3 == 0 else ["INBOX"],
+            }
+            for i in range(messages)
+        }
+        self._server = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def message(self, message_id: str, fmt: str, headers) -> dict:
+        data = self._messages[message_id]
+        names = ["From", "Date", "Subject", "To", "Received"]
+        if fmt == "metadata" and headers:
+            names = [n for n in names if n in headers]
+        result = {
+            "id": message_id,
+            "snippet": data["snippet"],
+            "labelIds": data["labelIds"],
+            "payload": {"headers": [{"name": n, "value": data[n]} for n in names]},
+        }
+        if fmt == "full":
+            result["payload"]["parts"] = [{"mimeType": "text/html", "body": {"size": len(self._body), "data": self._body}}]
+        return result
+
+    def handle(self, method: str, path: str) -> tuple:
+        url = urlparse(path)
+        query = parse_qs(url.query)
+        # The Calendar discovery document drops its service path when the endpoint is overridden
+        if url.path.endswith("/calendars/primary/events"):
+            return 200, {"items": [
+                {"id": f"e{i}", "summary": f"Meeting {i}", "start": {"dateTime": f"2024-01-{1 + i:02d}T10:00:00Z"}, "end": {"dateTime": f"2024-01-{1 + i:02d}T11:00:00Z"}}
+                for i in range(10)
+            ]}
+        if url.path == "/gmail/v1/users/me/messages":
+            limit = int(query.get("maxResults", ["100"])[0])
+            return 200, {"messages": [{"id": i, "threadId": i} for i in list(self._messages)[:limit]]}
+        match = MESSAGE_PATH.match(url.path)
+        if match and match.group(1) in self._messages:
+            return 200, self.message(match.group(1), query.get("format", ["full"])[0], query.get("metadataHeaders", []))
+        return 404, {"error": {"code": 404, "message": "Not found"}}
+
+    def start(self) -> "FakeGoogle":
+        google = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in separate writes, Nagle would hold the body back on kept-alive connections
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def setup(self):
+                super().setup()
+                google.connections += 1
+                time.sleep(google.connect_latency)
+
+            def _reply(self, status: int, content_type: str, body: bytes):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                google.requests += 1
+                time.sleep(google.latency)
+                status, payload = google.handle("GET", self.path)
+                self._reply(status, "application/json", json.dumps(payload).encode())
+
+            def do_POST(self):
+                google.requests += 1
+                time.sleep(google.latency)
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                content_type = self.headers["Content-Type"]
+                parsed = email.message_from_bytes(f"Content-Type: {content_type}\r\n\r\n".encode() + body)
+                boundary = "batch_response_boundary"
+                parts = []
+                for part in parsed.get_payload():
+                    request_line = part.get_payload().lstrip().splitlines()[0]
+                    method, path, _ = request_line.split(" ", 2)
+                    status, payload = google.handle(method, path)
+                    content_id = part["Content-ID"].strip("<>")
+                    parts.append(
+                        f"--{boundary}\r\nContent-Type: application/http\r\nContent-ID: <response-{content_id}>\r\n\r\n"
+                        f"HTTP/1.1 {status} OK\r\nContent-Type: application/json\r\n\r\n{json.dumps(payload)}\r\n"
+                    )
+                response = "".join(parts) + f"--{boundary}--\r\n"
+                self._reply(200, f"multipart/mixed; boundary={boundary}", response.encode())
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
@@ -1,12 +1,24 @@
 import socket
 import logging
 
+# Tools offered to the LLM unless a host profile overrides them, see tool_registry.TOOL_MODULES
+DEFAULT_TOOLS = [
+    "search_internet",
+    "get_date_time_location",
+    "append_to_memory",
+    "manage_file_system",
+    "get_recent_emails",
+    "get_calendar_events",
+    "schedule_alarm",
+]
+
 class Config:
-    def __init__(self, git_base_path, whisper_device, whisper_compute_type, ollama_num_ctx=16384):
+    def __init__(self, git_base_path, whisper_device, whisper_compute_type, ollama_num_ctx=16384, tools=None):
         self.GIT_BASE_PATH = git_base_path
         self.WHISPER_DEVICE = whisper_device
         self.WHISPER_COMPUTE_TYPE = whisper_compute_type
         self.OLLAMA_NUM_CTX = ollama_num_ctx
+        self.TOOLS = list(DEFAULT_TOOLS if tools is None else tools)
 
 # Configuration dictionary keyed by hostname
 CONFIGS = {
@@ -0,0 +1,125 @@
+from math import gcd
+from typing import Optional, Tuple
+import functools
+import numpy as np
+
+@functools.lru_cache(maxsize=8)
+def polyphase_filter(in_rate: int, out_rate: int, taps_per_phase: int=16, beta: float=8.0) -> Tuple[int, int, np.ndarray]:
+    """Designs a Kaiser windowed sinc low pass filter for in_rate -> out_rate.
+
+    Returns ``(up, down, phases)`` where ``phases[p]`` holds the taps for output phase
+    ``p``, reversed so they can be dotted directly with a window of input samples.
+    """
+    divisor = gcd(in_rate, out_rate)
+    up, down = out_rate // divisor, in_rate // divisor
+    length = taps_per_phase * up
+    cutoff = min(1.0 / up, 1.0 / down)
+    n = np.arange(length) - (length - 1) / 2.0
+    h = up * cutoff * np.sinc(cutoff * n) * np.kaiser(length, beta)
+
+    phases = h.reshape(taps_per_phase, up).T[:, ::-1]
+    return up, down, np.ascontiguousarray(phases, dtype=np.float32)
+
+class OutputDSP:
+    """Gain, optional soft limiting and polyphase resampling of mono int16 PCM.
+
+    Filter state is carried between ``process`` calls so chunk boundaries stay click
+    free, call ``flush`` at the end of an utterance to drain the filter and reset it.
+    Work buffers are reused between calls and only grow.
+    """
+    def __init__(self, *, in_rate: int, out_rate: Optional[int]=None, gain: float=1.0, soft_limit: bool=False, limit_threshold: float=0.8, taps_per_phase: int=16):
+        self.in_rate = in_rate
+        self.out_rate = out_rate or in_rate
+        self.gain = gain
+        self.soft_limit = soft_limit
+        self._threshold = limit_threshold * 32767.0
+        self._resample = self.out_rate != in_rate
+        self._input = np.zeros(0, dtype=np.float32)
+        self._output = np.zeros(0, dtype=np.float32)
+        self._scratch = np.zeros(0, dtype=np.float32)
+        self._pcm = np.zeros(0, dtype=np.int16)
+
+        if self._resample:
+            self._up, self._down, self._phases = polyphase_filter(in_rate, self.out_rate, taps_per_phase)
+            self._taps = self._phases.shape[1]
+            self._history = np.zeros(self._taps - 1, dtype=np.float32)
+            self._position = 0  # Next output position in upsampled units, relative to the chunk start
+
+    def reset(self):
+        if self._resample:
+            self._history[:] = 0.0
+            self._position = 0
+
+    @staticmethod
+    def _grow(buffer: np.ndarray, size: int) -> np.ndarray:
+        return buffer if len(buffer) >= size else np.zeros(max(size, 2 * len(buffer)), dtype=buffer.dtype)
+
+    def process(self, chunk: bytes) -> bytes:
+        samples = np.frombuffer(chunk, dtype=np.int16)
+        if not self._resample:
+            self._output = self._grow(self._output, len(samples))
+            out = self._output[: len(samples)]
+            np.copyto(out, samples)
+        else:
+            out = self._resample_chunk(samples)
+        return self._finish(out)
+
+    def flush(self) -> bytes:
+        """Drains the filter tail of the current utterance and resets the state."""
+        if not self._resample:
+            return b""
+        out = self._resample_chunk(np.zeros(self._taps // 2, dtype=np.int16))
+        data = self._finish(out)
+        self.reset()
+        return data
+
+    def _resample_chunk(self, samples: np.ndarray) -> np.ndarray:
+        keep = self._taps - 1
+        total = keep + len(samples)
+        self._input = self._grow(self._input, total)
+        buffer = self._input[:total]
+        buffer[:keep] = self._history
+        np.copyto(buffer[keep:], samples)
+
+        # Outputs whose newest input sample falls inside this chunk
+        count = max(0, -(-(len(samples) * self._up - self._position) // self._down))
+        self._output = self._grow(self._output, count)
+        out = self._output[:count]
+        if count:
+            positions = self._position + self._down * np.arange(count)
+            windows = np.lib.stride_tricks.sliding_window_view(buffer, self._taps)[positions // self._up]
+            np.einsum("ij,ij->i", windows, self._phases[positions % self._up], out=out)
+            self._position = int(positions[-1]) + self._down
+        self._position -= len(samples) * self._up
+
+        self._history[:] = buffer[total - keep : total]
+        return out
+
+    def _finish(self, out: np.ndarray) -> bytes:
+        if self.gain != 1.0:
+            np.multiply(out, self.gain, out=out)
+        if self.soft_limit:
+            self._limit(out)
+        np.rint(out, out=out)
+        np.clip(out, -32768, 32767, out=out)
+        self._pcm = self._grow(self._pcm, len(out))
+        pcm = self._pcm[: len(out)]
+        np.copyto(pcm, out, casting="unsafe")
+        return pcm.tobytes()
+
+    def _limit(self, out: np.ndarray):
+        """Compresses everything above the threshold smoothly towards full scale."""
+        headroom = 32767.0 - self._threshold
+        self._scratch = self._grow(self._scratch, len(out))
+        over = self._scratch[: len(out)]
+        np.abs(out, out=over)
+        mask = over > self._threshold
+        if not mask.any():
+            return
+        over -= self._threshold
+        over /= headroom
+        np.tanh(over, out=over)
+        over *= headroom
+        over += self._threshold
+        np.copysign(over, out, out=over)
+        np.copyto(out, over, where=mask)
@@ -1,5 +1,7 @@
 from pipecat.adapters.schemas.function_schema import FunctionSchema
 from pipecat.services.llm_service import FunctionCallParams
+from tool_registry import Tool
+from timer_service import TIMERS, Timer
 import asyncio
 import datetime
 import logging
@@ -9,9 +11,8 @@ from plyer import notification
 import winsound
 import time
 
-# Store active alarms
-active_alarms = {}
-alarm_counter = 0
+# Alarms missed while the assistant was not running still go off if they are at most this late, in seconds
+ALARM_MISSED_GRACE = 60 * 60
 
 def _play_alarm_sound():
     sounds = [(150, 100), (300, 150), (500, 200), (300, 250)]
@@ -23,24 +24,17 @@ def _play_alarm_sound():
 if __name__ == "__main__":
     _play_alarm_sound()
 
-async def _trigger_alarm(alarm_id: int, alarm_name: str, scheduled_time: str):
-    logging.info(f"Alarm triggered: {alarm_name} (ID: {alarm_id})")
+async def _trigger_alarm(timer: Timer, late: float):
+    alarm_name, scheduled_time = timer.payload["name"], timer.payload["scheduled_time"]
+    logging.info(f"Alarm triggered: {alarm_name}")
     
-    notification.notify(title=f"⏰ Alarm: {alarm_name}", message=f"Scheduled for {scheduled_time}", app_name="Personal Assistant", timeout=10)
+    message = f"Scheduled for {scheduled_time}" + (" (missed while the assistant was off)" if late > 60 else "")
+    await asyncio.to_thread(notification.notify, title=f"⏰ Alarm: {alarm_name}", message=message, app_name="Personal Assistant", timeout=10)
     
     sound_thread = threading.Thread(target=_play_alarm_sound)
     sound_thread.start()
-    
-    if alarm_id in active_alarms:
-        del active_alarms[alarm_id]
 
-async def _schedule_alarm_task(alarm_id: int, delay_seconds: float, alarm_name: str, scheduled_time: str):
-    try:
-        await asyncio.sleep(delay_seconds)
-        await _trigger_alarm(alarm_id, alarm_name, scheduled_time)
-    except asyncio.CancelledError:
-        logging.info(f"Alarm {alarm_id} ({alarm_name}) was cancelled")
-        raise
+TIMERS.register("alarm", _trigger_alarm, missed_grace=ALARM_MISSED_GRACE)
 
 def _parse_time_input(time_str: str) -> Optional[datetime.datetime]:
     time_str = time_str.strip()
@@ -72,8 +66,6 @@ def _parse_time_input(time_str: str) -> Optional[datetime.datetime]:
     return None
 
 async def execute_schedule_alarm(params: FunctionCallParams):
-    global alarm_counter
-    
     alarm_name = params.arguments.get("alarm_name", "Alarm")
     time_str = params.arguments.get("time")
     minutes = params.arguments.get("minutes")
@@ -111,20 +103,11 @@ async def execute_schedule_alarm(params: FunctionCallParams):
         await params.result_callback({"error": error_msg})
         return
     
-    alarm_counter += 1
-    alarm_id = alarm_counter
-    
-    task = asyncio.create_task(_schedule_alarm_task(alarm_id, delay_seconds, alarm_name, scheduled_time_str))
-    active_alarms[alarm_id] = {
-        "task": task,
-        "name": alarm_name,
-        "scheduled_time": scheduled_time_str,
-        "target_time": target_time
-    }
+    timer = TIMERS.schedule("alarm", delay_seconds, {"name": alarm_name, "scheduled_time": scheduled_time_str})
     
     result_msg = f"Alarm '{alarm_name}' scheduled for {scheduled_time_str}"
     logging.info(f"schedule_alarm output: {result_msg}")
-    await params.result_callback({"result": result_msg, "alarm_id": alarm_id})
+    await params.result_callback({"result": result_msg, "alarm_id": timer.id})
 
 schedule_alarm = FunctionSchema(
     name="schedule_alarm",
@@ -150,3 +133,10 @@ schedule_alarm = FunctionSchema(
     },
     required=[]
 )
+
+TOOLS = [
+    Tool(
+        schedule_alarm, execute_schedule_alarm, cancel_on_interruption=False, timeout_secs=5,
+        examples=["set an alarm for 7 am", "wake me up in 20 minutes", "remind me in one hour", "set a timer for ten minutes"],
+    ),
+]
@@ -5,6 +5,7 @@ import asyncio
 import logging
 from pipecat.services.llm_service import FunctionCallParams
 from pipecat.adapters.schemas.function_schema import FunctionSchema
+from tool_registry import Tool
 
 async def execute_get_date_time_location(params: FunctionCallParams):
     """Returns the current date, time, and location."""
@@ -42,3 +43,10 @@ get_date_time_location = FunctionSchema(
     properties={},
     required=[]
 )
+
+TOOLS = [
+    Tool(
+        get_date_time_location, execute_get_date_time_location, timeout_secs=10,
+        examples=["what time is it", "what's the date today", "what day is it", "where am I"],
+    ),
+]
@@ -3,6 +3,7 @@ import asyncio
 import logging
 from pipecat.services.llm_service import FunctionCallParams
 from pipecat.adapters.schemas.function_schema import FunctionSchema
+from tool_registry import Tool
 
 # Base paths
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -94,8 +95,7 @@ async def execute_manage_file_system(params: FunctionCallParams):
     if result.startswith("Error"):
         logging.error(f"manage_file_system error: {result}")
     else:
-        log_output = result[:500] + "..." if len(result) > 500 else result
-        logging.info(f"manage_file_system success: {log_output}")
+        logging.info(f"manage_file_system success: {result}")
     
     await params.result_callback(result)
 
@@ -155,3 +155,14 @@ append_to_memory = FunctionSchema(
     },
     required=["content"]
 )
+
+TOOLS = [
+    Tool(
+        append_to_memory, execute_append_to_memory, timeout_secs=5,
+        examples=["remember that I like coffee", "don't forget my birthday", "save this fact about me"],
+    ),
+    Tool(
+        manage_file_system, execute_manage_file_system, timeout_secs=5,
+        examples=["read my notes file", "list my files", "write this down in a file"],
+    ),
+]
@@ -1,15 +1,71 @@
 from pipecat.adapters.schemas.function_schema import FunctionSchema
 from pipecat.services.llm_service import FunctionCallParams
-from tavily import TavilyClient
-import os, psutil, logging
+from tool_registry import Tool
+from tool_cache import TOOL_CACHE
+from concurrent.futures import ThreadPoolExecutor
+import os, time, psutil, asyncio, logging
 
-tavily = TavilyClient(api_key=os.getenv("TAVILY_API_KEY"))
+tavily = None  # Built on first use, see _get_tavily
+SEARCH_TIMEOUT = 8  # Seconds before a search gives up, inside the tool's own timeout
+SEARCH_MAX_WORKERS = 2  # Searches in flight at once, abandoned ones still hold a worker until they return
+
+def _get_tavily():
+    global tavily
+    if tavily is None:
+        from tavily import TavilyClient
+        tavily = TavilyClient(api_key=os.getenv("TAVILY_API_KEY"))
+    return tavily
+
+class TavilyBackend:
+    def search(self, query: str) -> dict:
+        return _get_tavily().search(query=query, search_depth="basic", max_results=1)
+
+class LocalSearchBackend:
+    """Answers every query with canned results after ``delay`` seconds, for tests and offline runs.
+
+    The delay is a blocking sleep, like the network round trip of the real client.
+    """
+    def __init__(self, results=None, delay: float=0.0):
+        self.results = results or ["No results, searching is disabled on this machine."]
+        self.delay = delay
+        self.queries = []
+
+    def search(self, query: str) -> dict:
+        self.queries.append(query)
+        time.sleep(self.delay)
+        return {"results": [{"content": content} for content in self.results]}
+
+SEARCH_BACKENDS = {"tavily": TavilyBackend, "local": LocalSearchBackend}
+search_backend = SEARCH_BACKENDS[os.getenv("SEARCH_BACKEND", "tavily")]()
+
+# Search clients block, so they run here rather than on the event loop
+_search_executor = ThreadPoolExecutor(max_workers=SEARCH_MAX_WORKERS, thread_name_prefix="search")
+
+def warm_up():
+    if isinstance(search_backend, TavilyBackend):
+        _get_tavily()
+
+def normalize_query(query) -> str:
+    return " ".join(str(query).lower().split())
 
 async def execute_web_search(params: FunctionCallParams):
     query = params.arguments.get("query")
 
     logging.info(f"Searching: {query}")
-    response = tavily.search(query=query, search_depth="basic", max_results=1)
+    backend = search_backend
+    async def search():
+        return await asyncio.get_running_loop().run_in_executor(_search_executor, backend.search, query)
+    try:
+        # Cancelling this call on an interruption leaves the shared fetch running, so a repeated question is still cached
+        response = await asyncio.wait_for(TOOL_CACHE.fetch(SEARCH_TOOL.name, normalize_query(query), search, ttl=SEARCH_TOOL.cache_ttl), timeout=SEARCH_TIMEOUT)
+    except asyncio.TimeoutError:
+        logging.error(f"Search for {query} timed out after {SEARCH_TIMEOUT} s")
+        await params.result_callback({"error": f"The search did not finish within {SEARCH_TIMEOUT} seconds."})
+        return
+    except Exception as e:
+        logging.error(f"Search for {query} failed: {e}")
+        await params.result_callback({"error": f"The search failed: {e}"})
+        return
     context = "\n".join([r["content"] for r in response["results"]])
     logging.info(f"Got results: {context}")
     
@@ -34,7 +90,9 @@ async def monitor_resources(params: FunctionCallParams):
     ram_used_mb = memory_info.rss / (1024 * 1024)
 
     logging.info("Requesting usage")
-    process.cpu_percent(interval=0.1) 
+    # cpu_percent(interval=0.1) would block the event loop for the interval, so it is primed and sampled around a sleep
+    process.cpu_percent(interval=None)
+    await asyncio.sleep(0.1)
     cpu_usage_percent = process.cpu_percent(interval=None)
     logging.info(f"Usage: CPU {cpu_usage_percent} RAM {ram_used_mb}")
     
@@ -44,4 +102,17 @@ get_resource_usage = FunctionSchema(
     name="get_resource_usage",
     description="Use this to get the CPU and Memory usage of the program",
     properties={}, required=[]
-)
\ No newline at end of file
+)
+
+SEARCH_TOOL = Tool(
+    search_internet, execute_web_search, timeout_secs=15, cache_ttl=300,
+    examples=["what's the weather like", "look up the news", "who won the game last night", "search the web for", "how tall is the eiffel tower", "current price of bitcoin"],
+)
+
+TOOLS = [
+    SEARCH_TOOL,
+    Tool(
+        get_resource_usage, monitor_resources, timeout_secs=5,
+        examples=["how much memory are you using", "what is the cpu usage", "check system resources"],
+    ),
+]
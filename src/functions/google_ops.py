@@ -1,13 +1,15 @@
 import os
 import datetime
 import logging
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
 import asyncio
 from pipecat.services.llm_service import FunctionCallParams
 from pipecat.adapters.schemas.function_schema import FunctionSchema
+from tool_registry import Tool
+from tool_cache import TOOL_CACHE
+from google_clients import GoogleClients, HttpPool
+from google_sync import GoogleStore, GoogleSync, describe_age, event_start, CALENDAR_SYNC_PAST, GMAIL_SYNC_LIMIT
+from typing import Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
 
 # Define scopes for read-only access
 SCOPES = [
@@ -20,8 +22,46 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__fil
 TOOLS_DIR = os.path.join(BASE_DIR, "tools")
 CREDENTIALS_FILE = os.path.join(TOOLS_DIR, "google_credentials.json")
 TOKEN_FILE = os.path.join(TOOLS_DIR, "google_token.json")
+SYNC_DB_FILE = os.path.join(TOOLS_DIR, "google_sync.db")
+
+# Gmail recommends at most 50 requests per batch, smaller batches spread over a few connections
+GMAIL_BATCH_SIZE = 25
+GMAIL_MAX_CONCURRENT_BATCHES = 2
+EMAIL_HEADERS = ['Subject', 'From', 'Date']
+
+# The Google client libraries take ~100 ms to import, so they are only loaded on first use
+def build(*args, **kwargs):
+    from googleapiclient.discovery import build as discovery_build
+    return discovery_build(*args, **kwargs)
+
+def warm_up():
+    import googleapiclient.discovery, google_auth_oauthlib.flow, google.oauth2.credentials
+    CLIENTS.warm_up(('gmail', 'v1'), ('calendar', 'v3'))
+    start_sync()
+
+# Background mirror of the inbox and calendar, tool calls read from it while it is fresh
+_sync: Optional[GoogleSync] = None
+
+def start_sync() -> GoogleSync:
+    global _sync
+    if _sync is None:
+        _sync = GoogleSync(
+            GoogleStore(SYNC_DB_FILE),
+            gmail=lambda: CLIENTS.service('gmail', 'v1'),
+            calendar=lambda: CLIENTS.service('calendar', 'v3'),
+            fetch_metadata=lambda service, ids: _get_message_metadata(service, ids, CLIENTS.pool),
+        )
+        _sync.start()
+    return _sync
+
+def _synced_age(source: str) -> Optional[float]:
+    return _sync.age(source) if _sync is not None else None
 
 def _get_creds():
+    from google.auth.transport.requests import Request
+    from google.oauth2.credentials import Credentials
+    from google_auth_oauthlib.flow import InstalledAppFlow
+
     creds = None
     if os.path.exists(TOKEN_FILE):
         creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
@@ -43,48 +83,90 @@ def _get_creds():
             creds = flow.run_local_server(port=0)
         
         # Save the credentials for the next run
-        with open(TOKEN_FILE, 'w') as token:
-            token.write(creds.to_json())
+        _save_creds(creds)
             
     return creds
 
-def _get_recent_emails_sync(limit=50):
-    try:
-        creds = _get_creds()
-        service = build('gmail', 'v1', credentials=creds, cache_discovery=False)
+def _save_creds(creds):
+    with open(TOKEN_FILE, 'w') as token:
+        token.write(creds.to_json())
 
-        # Call the Gmail API
-        results = service.users().messages().list(userId='me', maxResults=limit, labelIds=['INBOX']).execute()
-        messages = results.get('messages', [])
+# Credentials, services and connections shared by every call, looked up lazily so tests can patch them
+CLIENTS = GoogleClients(
+    load_credentials=lambda: _get_creds(),
+    save_credentials=lambda creds: _save_creds(creds),
+    build=lambda *args, **kwargs: build(*args, **kwargs),
+)
 
-        logging.info(f"Found {len(messages)} emails in INBOX (limit={limit})")
+def _get_message_metadata(service, message_ids: List[str], http_pool: HttpPool) -> List[dict]:
+    """Fetches the headers and snippet of every message with batched metadata requests.
 
-        if not messages:
-            return "No emails found."
+    Each batch is a single HTTP round trip. Up to GMAIL_MAX_CONCURRENT_BATCHES run at once,
+    each on a connection leased from ``http_pool`` since httplib2 connections are not
+    thread safe, and requests the server rate limits get one retry in a later batch.
+    """
+    results: Dict[str, dict] = {}
+    failed: List[str] = []
 
-        email_data = []
-        for message in messages:
-            msg = service.users().messages().get(userId='me', id=message['id'], format='full').execute()
-            payload = msg.get('payload', {})
-            headers = payload.get('headers', [])
-            
-            subject = next((h['value'] for h in headers if h['name'] == 'Subject'), 'No Subject')
-            sender = next((h['value'] for h in headers if h['name'] == 'From'), 'Unknown Sender')
-            date = next((h['value'] for h in headers if h['name'] == 'Date'), 'Unknown Date')
-            snippet = msg.get('snippet', '')
-            
-            # Check for UNREAD label
-            label_ids = msg.get('labelIds', [])
-            status = "Unread" if "UNREAD" in label_ids else "Read"
-            
-            email_info = f"From: {sender} | Date: {date} | Status: {status} | Subject: {subject} | Snippet: {snippet}"
-            email_data.append(email_info)
+    def run_batch(ids: List[str]):
+        def callback(request_id, response, exception):
+            if exception is not None:
+                logging.warning(f"Failed to fetch email {request_id}: {exception}")
+                failed.append(request_id)
+            else:
+                results[request_id] = response
+        batch = service.new_batch_http_request(callback=callback)
+        for message_id in ids:
+            batch.add(service.users().messages().get(userId='me', id=message_id, format='metadata', metadataHeaders=EMAIL_HEADERS), request_id=message_id)
+        with http_pool.lease() as http:
+            batch.execute(http=http)
 
-        formatted_emails = "\n".join(email_data)
-        return f"[CTX: EMAILS - Natural Speech/No Lists]\n{formatted_emails}\n[END DATA]"
+    chunks = [message_ids[i : i + GMAIL_BATCH_SIZE] for i in range(0, len(message_ids), GMAIL_BATCH_SIZE)]
+    if len(chunks) == 1:
+        run_batch(chunks[0])
+    elif chunks:
+        with ThreadPoolExecutor(max_workers=min(GMAIL_MAX_CONCURRENT_BATCHES, len(chunks))) as pool:
+            list(pool.map(run_batch, chunks))
 
-    except Exception as e:
-        return f"Error fetching emails: {str(e)}"
+    if failed:
+        retry, failed[:] = list(failed), []
+        run_batch(retry)
+    return [results[message_id] for message_id in message_ids if message_id in results]
+
+def _fetch_recent_emails(limit=50, service=None, http_pool: Optional[HttpPool]=None) -> List[str]:
+    if service is None:
+        service = CLIENTS.service('gmail', 'v1')
+    http_pool = http_pool or CLIENTS.pool
+
+    # Call the Gmail API
+    results = service.users().messages().list(userId='me', maxResults=limit, labelIds=['INBOX']).execute()
+    messages = results.get('messages', [])
+
+    logging.info(f"Found {len(messages)} emails in INBOX (limit={limit})")
+
+    return [_describe_email(msg) for msg in _get_message_metadata(service, [m['id'] for m in messages], http_pool)]
+
+def _describe_email(msg: dict) -> str:
+    payload = msg.get('payload', {})
+    headers = payload.get('headers', [])
+    
+    subject = next((h['value'] for h in headers if h['name'] == 'Subject'), 'No Subject')
+    sender = next((h['value'] for h in headers if h['name'] == 'From'), 'Unknown Sender')
+    date = next((h['value'] for h in headers if h['name'] == 'Date'), 'Unknown Date')
+    snippet = msg.get('snippet', '')
+    
+    # Check for UNREAD label
+    label_ids = msg.get('labelIds', [])
+    status = "Unread" if "UNREAD" in label_ids else "Read"
+    
+    return f"From: {sender} | Date: {date} | Status: {status} | Subject: {subject} | Snippet: {snippet}"
+
+def _format_emails(email_data: List[str], synced_age: Optional[float]=None) -> str:
+    if not email_data:
+        return "No emails found."
+    formatted_emails = "\n".join(email_data)
+    synced = f"[Synced {describe_age(synced_age)}]\n" if synced_age is not None else ""
+    return f"[CTX: EMAILS - Natural Speech/No Lists]\n{synced}{formatted_emails}\n[END DATA]"
 
 async def execute_get_recent_emails(params: FunctionCallParams):
     """Fetches the last N emails from Gmail (default 5)."""
@@ -96,11 +178,22 @@ async def execute_get_recent_emails(params: FunctionCallParams):
             limit = 5
             
     logging.info(f"Calling get_recent_emails with limit={limit}")
-    result = await asyncio.to_thread(_get_recent_emails_sync, limit=limit)
+    try:
+        age = _synced_age("gmail")
+        if age is not None and limit <= GMAIL_SYNC_LIMIT:
+            messages = await asyncio.to_thread(_sync.store.emails, limit)
+            result = _format_emails([_describe_email(msg) for msg in messages], age)
+        else:
+            # The newest emails come first, so a cached longer list answers a smaller limit
+            emails = await TOOL_CACHE.fetch(
+                EMAILS_TOOL.name, None, lambda: asyncio.to_thread(_fetch_recent_emails, limit=limit),
+                ttl=EMAILS_TOOL.cache_ttl, span=limit, narrow=lambda emails, n: emails[:n],
+            )
+            result = _format_emails(emails)
+    except Exception as e:
+        result = f"Error fetching emails: {str(e)}"
     
-    # Log output with truncation to prevent bloat
-    log_output = result[:500] + "..." if len(result) > 500 else result
-    logging.info(f"get_recent_emails output: {log_output}")
+    logging.info(f"get_recent_emails output: {result}")
     
     await params.result_callback(result)
 
@@ -116,46 +209,48 @@ get_recent_emails = FunctionSchema(
     required=["limit"]
 )
 
-def _get_calendar_events_sync(days=7):
-    try:
-        creds = _get_creds()
-        service = build('calendar', 'v3', credentials=creds, cache_discovery=False)
-
-        # Calculate time range: -2 weeks to +N days
-        now = datetime.datetime.utcnow()
-        start_time = (now - datetime.timedelta(weeks=2)).isoformat() + 'Z'  # 'Z' indicates UTC time
-        end_time = (now + datetime.timedelta(days=days)).isoformat() + 'Z'
-
-        logging.info(f"Fetching calendar events from {start_time} to {end_time}")
-
-        events_result = service.events().list(
-            calendarId='primary', 
-            timeMin=start_time, 
-            timeMax=end_time,
-            singleEvents=True,
-            orderBy='startTime'
-        ).execute()
-        events = events_result.get('items', [])
-
-        if not events:
-            return "No upcoming events found."
-
-        event_list = []
-        for event in events:
-            start = event['start'].get('dateTime', event['start'].get('date'))
-            end = event['end'].get('dateTime', event['end'].get('date'))
-            summary = event.get('summary', 'No Title')
-            description = event.get('description', 'No Description')
-            location = event.get('location', 'No Location')
-            
-            event_info = f"Event: {summary}\nStart: {start}\nEnd: {end}\nLocation: {location}\nDescription: {description}"
-            event_list.append(event_info)
+def _fetch_calendar_events(days=7, service=None) -> List[dict]:
+    service = service or CLIENTS.service('calendar', 'v3')
 
-        formatted_events = "\n".join(event_list)
-        return f"[CTX: CALENDAR - Natural Speech/No Lists]\n{formatted_events}\n[END DATA]"
+    # Calculate time range: -2 weeks to +N days
+    now = datetime.datetime.utcnow()
+    start_time = (now - CALENDAR_SYNC_PAST).isoformat() + 'Z'  # 'Z' indicates UTC time
+    end_time = (now + datetime.timedelta(days=days)).isoformat() + 'Z'
 
-    except Exception as e:
-        return f"Error fetching calendar events: {str(e)}"
+    logging.info(f"Fetching calendar events from {start_time} to {end_time}")
+
+    events_result = service.events().list(
+        calendarId='primary', 
+        timeMin=start_time, 
+        timeMax=end_time,
+        singleEvents=True,
+        orderBy='startTime'
+    ).execute()
+    return events_result.get('items', [])
+
+def _events_within(events: List[dict], days: int) -> List[dict]:
+    """Drops events a fetch for ``days`` would not have returned, like the API's timeMax."""
+    end = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(days=days)
+    return [event for event in events if event_start(event) < end]
+
+def _format_events(events: List[dict], synced_age: Optional[float]=None) -> str:
+    if not events:
+        return "No upcoming events found."
+
+    event_list = []
+    for event in events:
+        start = event['start'].get('dateTime', event['start'].get('date'))
+        end = event['end'].get('dateTime', event['end'].get('date'))
+        summary = event.get('summary', 'No Title')
+        description = event.get('description', 'No Description')
+        location = event.get('location', 'No Location')
+        
+        event_info = f"Event: {summary}\nStart: {start}\nEnd: {end}\nLocation: {location}\nDescription: {description}"
+        event_list.append(event_info)
+
+    formatted_events = "\n".join(event_list)
+    synced = f"[Synced {describe_age(synced_age)}]\n" if synced_age is not None else ""
+    return f"[CTX: CALENDAR - Natural Speech/No Lists]\n{synced}{formatted_events}\n[END DATA]"
 
 async def execute_get_calendar_events(params: FunctionCallParams):
     """Fetches calendar events for the last 2 weeks and next N days (default 7)."""
@@ -167,11 +262,22 @@ async def execute_get_calendar_events(params: FunctionCallParams):
             days = 7
 
     logging.info(f"Calling get_calendar_events with days={days}")
-    result = await asyncio.to_thread(_get_calendar_events_sync, days=days)
+    try:
+        age = _synced_age("calendar")
+        if age is not None:
+            now = datetime.datetime.now(datetime.timezone.utc)
+            events = await asyncio.to_thread(_sync.store.events, now - CALENDAR_SYNC_PAST, now + datetime.timedelta(days=days))
+            result = _format_events(events, age)
+        else:
+            events = await TOOL_CACHE.fetch(
+                CALENDAR_TOOL.name, None, lambda: asyncio.to_thread(_fetch_calendar_events, days=days),
+                ttl=CALENDAR_TOOL.cache_ttl, span=days, narrow=_events_within,
+            )
+            result = _format_events(events)
+    except Exception as e:
+        result = f"Error fetching calendar events: {str(e)}"
     
-    # Log output with truncation to prevent bloat
-    log_output = result[:500] + "..." if len(result) > 500 else result
-    logging.info(f"get_calendar_events output: {log_output}")
+    logging.info(f"get_calendar_events output: {result}")
     
     await params.result_callback(result)
 
@@ -186,3 +292,15 @@ get_calendar_events = FunctionSchema(
     },
     required=["days"]
 )
+
+# New mail arrives more often than events change
+EMAILS_TOOL = Tool(
+    get_recent_emails, execute_get_recent_emails, timeout_secs=20, cache_ttl=60,
+    examples=["check my email", "summarize my last email", "do I have any unread messages in my inbox", "who emailed me"],
+)
+CALENDAR_TOOL = Tool(
+    get_calendar_events, execute_get_calendar_events, timeout_secs=20, cache_ttl=300,
+    examples=["what's on my calendar", "what do I have to do today", "when is my next meeting", "what events do I have this week", "my schedule for tomorrow"],
+)
+
+TOOLS = [EMAILS_TOOL, CALENDAR_TOOL]
@@ -1,9 +1,124 @@
 import sys
-import io
-import contextlib
+import json
+import time
+import queue
+import signal
+import asyncio
 import logging
+import threading
+import subprocess
 from pipecat.services.llm_service import FunctionCallParams
 from pipecat.adapters.schemas.function_schema import FunctionSchema
+from tool_registry import Tool
+import sandbox_worker
+
+SANDBOX_WORKERS = 2  # Warm worker processes, a runaway one is replaced in the background
+SANDBOX_TIMEOUT = 5  # Wall clock seconds a run may take, inside the tool's own timeout
+SANDBOX_BUSY_TIMEOUT = 4  # Seconds a run waits for an idle worker, together with SANDBOX_TIMEOUT inside the tool's timeout
+# The CPU and address space limits need the resource module, which Windows does not have,
+# so there neither applies and only the wall clock timeout stops a run
+SANDBOX_CPU_SECONDS = 5  # CPU seconds a run may use
+SANDBOX_MEMORY_BYTES = 512 * 1024 * 1024  # Address space of a worker
+SANDBOX_OUTPUT_LIMIT = 10_000  # Characters of output kept
+SANDBOX_START_TIMEOUT = 30  # Seconds a new worker may take to import the allowed modules
+
+class SandboxWorker:
+    """One worker process running sandbox_worker.py, and a thread reading its results.
+
+    The worker is a plain interpreter in isolated mode rather than a multiprocessing child,
+    which would import the assistant's main module and everything it pulls in.
+    """
+    def __init__(self, memory_limit: int=SANDBOX_MEMORY_BYTES):
+        self.process = subprocess.Popen(
+            [sys.executable, "-I", sandbox_worker.__file__, str(memory_limit)],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+        )
+        self._results: "queue.Queue" = queue.Queue()
+        self.ready = False
+        threading.Thread(target=self._read, name="sandbox-reader", daemon=True).start()
+
+    def _read(self):
+        for line in self.process.stdout:
+            self._results.put(json.loads(line))
+        self._results.put(None)
+
+    def _wait_ready(self):
+        if not self.ready:
+            try:
+                self._results.get(timeout=SANDBOX_START_TIMEOUT)
+            except queue.Empty:
+                raise TimeoutError("Sandbox worker did not start")
+            self.ready = True
+
+    def run(self, code: str, timeout: float, cpu_seconds: float, output_limit: int) -> str:
+        self._wait_ready()
+        self.process.stdin.write(json.dumps({"code": code, "cpu_seconds": cpu_seconds, "output_limit": output_limit}).encode() + b"\n")
+        self.process.stdin.flush()
+        try:
+            result = self._results.get(timeout=timeout)
+        except queue.Empty:
+            self.kill()
+            return f"Error: Code did not finish within {timeout:g} seconds and was stopped."
+        if result is None:
+            returncode = self.process.wait(1)
+            if returncode == -getattr(signal, "SIGXCPU", 0):
+                return f"Error: Code exceeded the CPU limit of {cpu_seconds:g} seconds and was stopped."
+            return f"Error: Sandbox worker exited with code {returncode}."
+        logging.info(f"Sandbox run took {result['elapsed'] * 1000:.1f} ms")
+        return f"Error: {result['error']}" if result["error"] else result["output"]
+
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def kill(self):
+        self.process.kill()
+        self.process.wait()
+
+class SandboxPool:
+    """Warm worker processes that already imported the allowed modules.
+
+    Each run goes to an idle worker, a worker that timed out, hit a limit or died is
+    killed and replaced with a freshly spawned one, which warms up while it waits in the
+    idle queue. When every worker is busy runs wait for one, for ``SANDBOX_BUSY_TIMEOUT``.
+    """
+    def __init__(self, size: int=SANDBOX_WORKERS):
+        self.size = size
+        self._idle: "queue.Queue[SandboxWorker]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._started = False
+
+    def start(self):
+        with self._lock:
+            if not self._started:
+                for _ in range(self.size):
+                    self._idle.put(SandboxWorker())
+                self._started = True
+
+    def run(self, code: str) -> str:
+        self.start()
+        try:
+            worker = self._idle.get(timeout=SANDBOX_BUSY_TIMEOUT)
+        except queue.Empty:
+            return f"Error: Sandbox busy, no worker became free within {SANDBOX_BUSY_TIMEOUT:g} seconds."
+        try:
+            return worker.run(code, SANDBOX_TIMEOUT, SANDBOX_CPU_SECONDS, SANDBOX_OUTPUT_LIMIT)
+        finally:
+            if worker.alive():
+                self._idle.put(worker)
+            else:
+                logging.warning("Replacing a stopped sandbox worker")
+                self._idle.put(SandboxWorker())
+
+    def close(self):
+        with self._lock:
+            while not self._idle.empty():
+                self._idle.get_nowait().kill()
+            self._started = False
+
+_pool = SandboxPool()
+
+def warm_up():
+    _pool.start()
 
 async def execute_run_python_code(params: FunctionCallParams):
     """
@@ -11,59 +126,16 @@ async def execute_run_python_code(params: FunctionCallParams):
     """
     code = params.arguments.get("code")
     logging.info(f"Executing sandboxed python code: {code}")
-    
-    # Allowed modules
-    safe_modules = {
-        'math': __import__('math'),
-        'random': __import__('random'),
-        'datetime': __import__('datetime'),
-        'json': __import__('json'),
-    }
-
-    def safe_import(name, globals=None, locals=None, fromlist=(), level=0):
-        if name in safe_modules:
-            return safe_modules[name]
-        raise ImportError(f"Import of '{name}' is not allowed")
-    
-    # Custom restricted builtins
-    safe_builtins = {
-        'abs': abs, 'all': all, 'any': any, 'ascii': ascii, 'bin': bin, 'bool': bool,
-        'bytearray': bytearray, 'bytes': bytes, 'callable': callable, 'chr': chr,
-        'complex': complex, 'dict': dict, 'divmod': divmod, 'enumerate': enumerate,
-        'filter': filter, 'float': float, 'format': format, 'frozenset': frozenset,
-        'getattr': getattr, 'hasattr': hasattr, 'hash': hash, 'hex': hex, 'id': id,
-        'int': int, 'isinstance': isinstance, 'issubclass': issubclass, 'iter': iter,
-        'len': len, 'list': list, 'map': map, 'max': max, 'min': min, 'next': next,
-        'object': object, 'oct': oct, 'ord': ord, 'pow': pow, 'print': print,
-        'range': range, 'repr': repr, 'reversed': reversed, 'round': round,
-        'set': set, 'slice': slice, 'sorted': sorted, 'str': str, 'sum': sum,
-        'tuple': tuple, 'type': type, 'zip': zip,
-        '__import__': safe_import
-    }
-
-    # Restricted environment
-    restricted_globals = {
-        '__builtins__': safe_builtins,
-    }
-
-    # Capture output
-    output_buffer = io.StringIO()
-    result = ""
+
+    start = time.perf_counter()
     try:
-        # Redirect stdout and stderr
-        with contextlib.redirect_stdout(output_buffer), contextlib.redirect_stderr(output_buffer):
-            exec(code, restricted_globals)
-        result = output_buffer.getvalue()
+        result = await asyncio.to_thread(_pool.run, code)
     except Exception as e:
         result = f"Error: {e}"
+    if result.startswith("Error:"):
         logging.error(f"Sandbox execution error: {result}")
-    finally:
-        output_buffer.close()
-    
-    # Log output with truncation to prevent bloat
-    log_output = result[:300] + "..." if len(result) > 300 else result
-    logging.info(f"Sandbox execution result: {log_output}")
-    
+    logging.info(f"Sandbox execution result in {(time.perf_counter() - start) * 1000:.0f} ms: {result}")
+
     await params.result_callback(result)
 
 run_python_code = FunctionSchema(
@@ -77,3 +149,10 @@ run_python_code = FunctionSchema(
     },
     required=["code"]
 )
+
+TOOLS = [
+    Tool(
+        run_python_code, execute_run_python_code, timeout_secs=10,
+        examples=["calculate the square root", "run this python code", "compute the math for me"],
+    ),
+]
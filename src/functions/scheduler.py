@@ -1,7 +1,11 @@
-import asyncio
 import logging
 from pipecat.services.llm_service import FunctionCallParams
 from pipecat.adapters.schemas.function_schema import FunctionSchema
+from tool_registry import Tool
+from timer_service import TIMERS, Timer
+
+# Prompts missed while the assistant was not running are dropped if they are later than this, in seconds
+PROMPT_MISSED_GRACE = 10 * 60
 
 # Global injector instance
 _injector = None
@@ -10,15 +14,16 @@ def set_injector(injector):
     global _injector
     _injector = injector
 
-async def _wait_and_inject(delay_seconds: int, prompt: str):
-    logging.info(f"Adding prompt to schedule in {delay_seconds} seconds: {prompt}")
-    await asyncio.sleep(delay_seconds)
+async def _inject(timer: Timer, late: float):
+    prompt = timer.payload["prompt"]
     if _injector:
         logging.info(f"Injecting scheduled prompt: {prompt}")
         _injector.schedule(prompt)
     else:
         logging.error("Injector not set. Cannot schedule prompt.")
 
+TIMERS.register("prompt", _inject, missed_grace=PROMPT_MISSED_GRACE)
+
 async def execute_schedule_prompt(params: FunctionCallParams):
     prompt = params.arguments.get("prompt")
     delay = params.arguments.get("delay_seconds")
@@ -33,7 +38,8 @@ async def execute_schedule_prompt(params: FunctionCallParams):
     # but MessageInjector injects as user role, so LLM sees "User: prompt"
     # The system prompt ensures it acts as Jarvis.
     
-    asyncio.create_task(_wait_and_inject(delay, prompt))
+    logging.info(f"Adding prompt to schedule in {delay} seconds: {prompt}")
+    TIMERS.schedule("prompt", delay, {"prompt": prompt})
     
     await params.result_callback(f"Scheduled prompt '{prompt}' in {delay} seconds.")
 
@@ -52,3 +58,10 @@ schedule_prompt_schema = FunctionSchema(
     },
     required=["prompt", "delay_seconds"]
 )
+
+TOOLS = [
+    Tool(
+        schedule_prompt_schema, execute_schedule_prompt, cancel_on_interruption=False, timeout_secs=5,
+        examples=["check back with me in an hour", "ask me later how the meeting went", "follow up with me tomorrow"],
+    ),
+]
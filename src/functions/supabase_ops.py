@@ -1,11 +1,12 @@
 import os
 import json
+import asyncio
 import logging
 import datetime
 from typing import Optional, List, Dict, Any
 from pipecat.adapters.schemas.function_schema import FunctionSchema
 from pipecat.services.llm_service import FunctionCallParams
-from supabase import create_client, Client
+from tool_registry import Tool
 
 # Attempt to load secrets
 SECRETS_FILE = "credentials.json"
@@ -16,13 +17,17 @@ def load_supabase_credentials():
     url = None
     key = None
     
-    with open(SECRETS_FILE, 'r') as f:
-        secrets = json.load(f)
-        url = secrets.get("SUPABASE_URL")
-        key = secrets.get("SUPABASE_ANON_KEY")
+    try:
+        with open(SECRETS_FILE, 'r') as f:
+            secrets = json.load(f)
+            url = secrets.get("SUPABASE_URL")
+            key = secrets.get("SUPABASE_ANON_KEY")
+    except (OSError, json.JSONDecodeError) as e:
+        logging.error(f"Failed to read Supabase credentials from {SECRETS_FILE}: {e}")
 
     if url and key:
         try:
+            from supabase import create_client
             supabase = create_client(url, key)
             logging.info("Supabase client initialized.")
         except Exception as e:
@@ -30,7 +35,14 @@ def load_supabase_credentials():
     else:
         logging.warning("Supabase credentials not found. Functions will return recursion errors.")
 
-load_supabase_credentials()
+def _get_supabase():
+    # Connects on the first tool call (or warm up) instead of at import
+    if supabase is None:
+        load_supabase_credentials()
+    return supabase
+
+def warm_up():
+    _get_supabase()
 
 # Device UUID to label mapping
 DEVICE_LABELS = {
@@ -41,6 +53,7 @@ async def execute_get_habits(params: FunctionCallParams):
     days = params.arguments.get("days", 7)
     logging.info(f"Getting habits for past {days} days")
     
+    supabase = await asyncio.to_thread(_get_supabase)
     if not supabase:
         await params.result_callback({"error": "Supabase client not initialized."})
         return
@@ -49,11 +62,11 @@ async def execute_get_habits(params: FunctionCallParams):
         today = datetime.date.today()
         start_date = today - datetime.timedelta(days=days)
         
-        response = supabase.table("habits") \
+        query = supabase.table("habits") \
             .select("*") \
             .gte("date", start_date.isoformat()) \
-            .lte("date", today.isoformat()) \
-            .execute()
+            .lte("date", today.isoformat())
+        response = await asyncio.to_thread(query.execute)
             
         data = response.data
         
@@ -72,9 +85,7 @@ async def execute_get_habits(params: FunctionCallParams):
 
         formatted_result = f"[SYSTEM FETCHED DATA: HABITS]:\n\n{json.dumps(grouped_data, indent=2)}\n\n[END DATA]"
         
-        # Log output with truncation to prevent bloat
-        log_output = formatted_result[:500] + "..." if len(formatted_result) > 500 else formatted_result
-        logging.info(f"get_habits output: {log_output}")
+        logging.info(f"get_habits output: {formatted_result}")
         
         await params.result_callback({"result": formatted_result})
         
@@ -99,6 +110,7 @@ async def execute_get_website_usage(params: FunctionCallParams):
     days = params.arguments.get("days", 7)
     logging.info(f"Getting website usage for past {days} days")
     
+    supabase = await asyncio.to_thread(_get_supabase)
     if not supabase:
         await params.result_callback({"error": "Supabase client not initialized."})
         return
@@ -110,12 +122,12 @@ async def execute_get_website_usage(params: FunctionCallParams):
         # Filter: timespent > 1 minute (60 seconds)
         MIN_DURATION_SECONDS = 60
         
-        response = supabase.table("website_usage") \
+        query = supabase.table("website_usage") \
             .select("*") \
             .gte("date", start_date.isoformat()) \
             .lte("date", today.isoformat()) \
-            .gt("timespent", MIN_DURATION_SECONDS) \
-            .execute()
+            .gt("timespent", MIN_DURATION_SECONDS)
+        response = await asyncio.to_thread(query.execute)
 
         data = response.data
 
@@ -140,9 +152,7 @@ async def execute_get_website_usage(params: FunctionCallParams):
 
         formatted_result = f"[SYSTEM FETCHED DATA: WEBSITE USAGE (Minutes)]:\n\n{json.dumps(grouped_data, indent=2)}\n\n[END DATA]"
         
-        # Log output with truncation to prevent bloat
-        log_output = formatted_result[:500] + "..." if len(formatted_result) > 500 else formatted_result
-        logging.info(f"get_website_usage output: {log_output}")
+        logging.info(f"get_website_usage output: {formatted_result}")
         
         await params.result_callback({"result": formatted_result})
 
@@ -162,3 +172,14 @@ get_website_usage = FunctionSchema(
     },
     required=[]
 )
+
+TOOLS = [
+    Tool(
+        get_habits, execute_get_habits, timeout_secs=15,
+        examples=["how are my habits going", "did I exercise this week", "show my habit tracker"],
+    ),
+    Tool(
+        get_website_usage, execute_get_website_usage, timeout_secs=15,
+        examples=["how much time did I spend on youtube", "what websites did I use most", "my screen time"],
+    ),
+]
@@ -1,18 +1,15 @@
-import asyncio
 import datetime
 import logging
 import os
 import json
-from typing import List, Dict
+from typing import Dict
 from urllib.parse import urlparse
 from pipecat.services.llm_service import FunctionCallParams
 from pipecat.adapters.schemas.function_schema import FunctionSchema
+from tool_registry import Tool
+from timer_service import TIMERS, Timer
 from plyer import notification
 
-# Store active blocks
-active_blocks: Dict[int, Dict] = {}
-block_counter = 0
-
 # Command file location - use current user's directory
 COMMAND_FILE_PATH = r"C:\Users\Billy1301\Documents\Programming\Programs\personal-assistant\.extension-data\block-commands.json"
 
@@ -66,8 +63,9 @@ def _show_notification(title: str, message: str) -> None:
     except Exception as e:
         logging.error(f"Error showing notification: {e}")
 
-async def _trigger_unblock(block_id: int, domains: List[str], block_name: str) -> None:
+async def _trigger_unblock(timer: Timer, late: float) -> None:
     """Trigger unblocking - write unblock command to file."""
+    block_id, domains, block_name = timer.id, timer.payload["domains"], timer.payload["name"]
     logging.info(f"Auto-unblocking triggered: {block_name} (ID: {block_id})")
     
     try:
@@ -87,24 +85,12 @@ async def _trigger_unblock(block_id: int, domains: List[str], block_name: str) -
         )
     except Exception as e:
         logging.error(f"Error during auto-unblock: {e}")
-    
-    # Remove from active blocks
-    if block_id in active_blocks:
-        del active_blocks[block_id]
 
-async def _unblock_task(block_id: int, delay_seconds: float, domains: List[str], block_name: str) -> None:
-    """Background task that waits and triggers the unblock."""
-    try:
-        await asyncio.sleep(delay_seconds)
-        await _trigger_unblock(block_id, domains, block_name)
-    except asyncio.CancelledError:
-        logging.info(f"Block {block_id} was cancelled")
-        raise
+# Blocks always lift, however long the assistant was not running
+TIMERS.register("unblock", _trigger_unblock)
 
 async def execute_block_websites(params: FunctionCallParams) -> None:
     """Block specified websites for a given duration."""
-    global block_counter
-    
     websites = params.arguments.get("websites", [])
     minutes = params.arguments.get("minutes")
     hours = params.arguments.get("hours")
@@ -158,9 +144,10 @@ async def execute_block_websites(params: FunctionCallParams) -> None:
     unblock_timestamp = int(unblock_time.timestamp())
     unblock_time_str = unblock_time.strftime("%I:%M %p on %Y-%m-%d")
     
-    # Create block ID
-    block_counter += 1
-    block_id = block_counter
+    # Schedule auto-unblock, the timer ID doubles as the block ID
+    block_name = f"Block {', '.join(domains)}"
+    timer = TIMERS.schedule("unblock", delay_seconds, {"domains": domains, "name": block_name})
+    block_id = timer.id
     
     # Write block command to file
     try:
@@ -172,22 +159,12 @@ async def execute_block_websites(params: FunctionCallParams) -> None:
         }
         _write_command_file(command)
     except Exception as e:
+        TIMERS.cancel(timer.id)
         error_msg = str(e)
         logging.error(error_msg)
         await params.result_callback({"error": error_msg})
         return
     
-    # Schedule auto-unblock
-    block_name = f"Block {', '.join(domains)}"
-    task = asyncio.create_task(_unblock_task(block_id, delay_seconds, domains, block_name))
-    
-    active_blocks[block_id] = {
-        "task": task,
-        "domains": domains,
-        "unblock_time": unblock_time_str,
-        "name": block_name
-    }
-    
     # Show confirmation notification
     domain_list = ", ".join(domains)
     duration_str = f"{hours}h " if hours else ""
@@ -227,3 +204,10 @@ block_websites = FunctionSchema(
     },
     required=["websites"]
 )
+
+TOOLS = [
+    Tool(
+        block_websites, execute_block_websites, cancel_on_interruption=False, timeout_secs=5,
+        examples=["block youtube for an hour", "help me focus by blocking reddit", "stop me from using social media"],
+    ),
+]
@@ -0,0 +1,156 @@
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional, Tuple
+import datetime, logging, queue, threading, time
+
+# Credentials are refreshed this long before they expire, in seconds
+CREDENTIALS_REFRESH_MARGIN = 5 * 60
+# Retry delay after a failed background refresh
+CREDENTIALS_RETRY_DELAY = 60
+# Idle keep-alive connections kept for reuse
+HTTP_POOL_MAX_IDLE = 4
+HTTP_TIMEOUT = 30
+
+class HttpPool:
+    """Keep-alive HTTP connections handed out to one thread at a time.
+
+    httplib2 connections are not thread safe, so each ``asyncio.to_thread`` worker leases
+    one for the length of a request and puts it back, keeping its connection open for
+    the next caller. A new connection is only opened when every idle one is in use.
+    """
+    def __init__(self, factory: Callable[[], Any], max_idle: int=HTTP_POOL_MAX_IDLE):
+        self._factory = factory
+        self._idle: "queue.LifoQueue" = queue.LifoQueue()
+        self.max_idle = max_idle
+        self.created = 0
+
+    @contextmanager
+    def lease(self):
+        try:
+            http = self._idle.get_nowait()
+        except queue.Empty:
+            http = self._factory()
+            self.created += 1
+        try:
+            yield http
+        finally:
+            if self._idle.qsize() < self.max_idle:
+                self._idle.put(http)
+
+    def clear(self):
+        while not self._idle.empty():
+            self._idle.get_nowait()
+
+def _pooled_request_class(pool: HttpPool):
+    from googleapiclient.http import HttpRequest
+
+    class PooledHttpRequest(HttpRequest):
+        """An HttpRequest that runs on a leased connection instead of the one its service was built with."""
+        def execute(self, http=None, num_retries=0):
+            if http is not None:
+                return super().execute(http=http, num_retries=num_retries)
+            with pool.lease() as http:
+                return super().execute(http=http, num_retries=num_retries)
+    return PooledHttpRequest
+
+class GoogleClients:
+    """Process wide Google credentials, API services and connections.
+
+    Credentials are loaded once, kept in memory and refreshed in the background shortly
+    before they expire, instead of being read from disk on every tool call. Each API's
+    discovery based service is built once and shared, its requests run on connections
+    leased from an HttpPool so the services can be used from several threads at once.
+    """
+    def __init__(self, load_credentials: Callable[[], Any], save_credentials: Optional[Callable[[Any], None]]=None, build: Optional[Callable[..., Any]]=None, client_options: Optional[dict]=None):
+        self._load_credentials = load_credentials
+        self._save_credentials = save_credentials
+        self._build = build
+        self._client_options = client_options
+        self._lock = threading.RLock()
+        self._creds = None
+        self._services: Dict[Tuple[str, str], Any] = {}
+        self._refresh_timer: Optional[threading.Timer] = None
+        self.pool = HttpPool(self._authorized_http)
+
+    def _authorized_http(self):
+        import google_auth_httplib2, httplib2
+        return google_auth_httplib2.AuthorizedHttp(self.credentials(), http=httplib2.Http(timeout=HTTP_TIMEOUT))
+
+    def _expires_in(self, creds) -> Optional[float]:
+        expiry = getattr(creds, 'expiry', None)
+        if not isinstance(expiry, datetime.datetime):
+            return None
+        # google-auth keeps expiry as naive UTC
+        return (expiry - datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)).total_seconds()
+
+    def _refresh(self, creds):
+        from google.auth.transport.requests import Request
+        start = time.perf_counter()
+        creds.refresh(Request())
+        if self._save_credentials:
+            self._save_credentials(creds)
+        logging.info(f"Refreshed Google credentials in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    def credentials(self):
+        with self._lock:
+            loaded = self._creds is None
+            if loaded:
+                self._creds = self._load_credentials()
+            expires_in = self._expires_in(self._creds)
+            refresh = expires_in is not None and expires_in < CREDENTIALS_REFRESH_MARGIN
+            if refresh:
+                # Only reached on first load or when the background refresh has not kept up
+                self._refresh(self._creds)
+            if loaded or refresh:
+                self._schedule_refresh()
+            return self._creds
+
+    def _schedule_refresh(self, delay: Optional[float]=None):
+        if delay is None:
+            expires_in = self._expires_in(self._creds)
+            if expires_in is None:
+                return
+            delay = max(expires_in - CREDENTIALS_REFRESH_MARGIN, 0)
+        if self._refresh_timer:
+            self._refresh_timer.cancel()
+        self._refresh_timer = threading.Timer(delay, self._background_refresh)
+        self._refresh_timer.daemon = True
+        self._refresh_timer.start()
+
+    def _background_refresh(self):
+        with self._lock:
+            if self._creds is None:
+                return
+            try:
+                # Refreshed in place, so services and pooled connections pick up the new token
+                self._refresh(self._creds)
+                self._schedule_refresh()
+            except Exception as e:
+                logging.error(f"Background refresh of Google credentials failed: {e}")
+                self._schedule_refresh(CREDENTIALS_RETRY_DELAY)
+
+    def service(self, name: str, version: str):
+        with self._lock:
+            service = self._services.get((name, version))
+            if service is None:
+                start = time.perf_counter()
+                kwargs = {"client_options": self._client_options} if self._client_options else {}
+                with self.pool.lease() as http:
+                    service = self._build(name, version, http=http, requestBuilder=_pooled_request_class(self.pool), cache_discovery=False, **kwargs)
+                self._services[(name, version)] = service
+                logging.info(f"Built Google {name} {version} service in {(time.perf_counter() - start) * 1000:.0f} ms")
+            return service
+
+    def warm_up(self, *services: Tuple[str, str]):
+        self.credentials()
+        for name, version in services:
+            self.service(name, version)
+
+    def reset(self):
+        """Forgets credentials, services and connections, e.g. after the token file changed."""
+        with self._lock:
+            if self._refresh_timer:
+                self._refresh_timer.cancel()
+            self._refresh_timer = None
+            self._creds = None
+            self._services.clear()
+            self.pool.clear()
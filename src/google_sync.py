@@ -0,0 +1,238 @@
+from typing import Any, Callable, Iterable, List, Optional
+import datetime, json, logging, sqlite3, threading, time
+
+# How often the worker pulls changes, in seconds
+GOOGLE_SYNC_INTERVAL = 60
+# Mirrors older than this are not trusted to answer tool calls
+GOOGLE_SYNC_MAX_STALENESS = 10 * 60
+# A periodic full resync drops past events and anything incremental sync missed
+GOOGLE_FULL_RESYNC_INTERVAL = 24 * 60 * 60
+# Newest inbox messages kept in the mirror
+GMAIL_SYNC_LIMIT = 100
+# Calendar events are mirrored from this far in the past onwards
+CALENDAR_SYNC_PAST = datetime.timedelta(weeks=2)
+
+def event_start(event: dict) -> datetime.datetime:
+    start = event['start'].get('dateTime', event['start'].get('date'))
+    # All day events have a bare date and are taken as local midnight
+    return datetime.datetime.fromisoformat(start.replace('Z', '+00:00')).astimezone(datetime.timezone.utc)
+
+def describe_age(seconds: float) -> str:
+    if seconds < 60:
+        return "just now"
+    if seconds < 60 * 60:
+        minutes = int(seconds // 60)
+        return f"{minutes} minute{'s' if minutes != 1 else ''} ago"
+    hours = int(seconds // (60 * 60))
+    return f"{hours} hour{'s' if hours != 1 else ''} ago"
+
+def _status(error: Exception) -> Optional[int]:
+    # googleapiclient's HttpError keeps the response, checked by duck typing so the client is not imported here
+    return getattr(getattr(error, 'resp', None), 'status', None)
+
+class GoogleStore:
+    """SQLite mirror of the inbox metadata and calendar events, with the sync token of each.
+
+    Messages and events are stored as the JSON the API returned, next to a sort key. The
+    sync worker writes from its own thread while tool handlers read from others, so every
+    access goes through one lock.
+    """
+    def __init__(self, path: str):
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            self._db.executescript("""
+                CREATE TABLE IF NOT EXISTS emails (id TEXT PRIMARY KEY, sort_key INTEGER, data TEXT);
+                CREATE TABLE IF NOT EXISTS events (id TEXT PRIMARY KEY, sort_key TEXT, data TEXT);
+                CREATE TABLE IF NOT EXISTS sync_state (source TEXT PRIMARY KEY, token TEXT, synced_at REAL, full_synced_at REAL);
+            """)
+
+    def _state(self, source: str):
+        with self._lock:
+            return self._db.execute("SELECT token, synced_at, full_synced_at FROM sync_state WHERE source = ?", (source,)).fetchone()
+
+    def token(self, source: str) -> Optional[str]:
+        state = self._state(source)
+        return state[0] if state else None
+
+    def age(self, source: str) -> Optional[float]:
+        """Seconds since ``source`` last synced, ``None`` if it never has."""
+        state = self._state(source)
+        return time.time() - state[1] if state and state[1] is not None else None
+
+    def full_sync_age(self, source: str) -> Optional[float]:
+        state = self._state(source)
+        return time.time() - state[2] if state and state[2] is not None else None
+
+    def ids(self, table: str) -> set:
+        with self._lock:
+            return {row[0] for row in self._db.execute(f"SELECT id FROM {table}")}
+
+    def apply(self, table: str, upserts: Iterable[tuple], deletes: Iterable[str]=(), *, source: str, token: str, full: bool=False):
+        """Writes ``(id, sort_key, item)`` rows and the new sync token in one transaction, a full sync replaces the table."""
+        now = time.time()
+        with self._lock, self._db:
+            if full:
+                self._db.execute(f"DELETE FROM {table}")
+            self._db.executemany(f"DELETE FROM {table} WHERE id = ?", [(item_id,) for item_id in deletes])
+            self._db.executemany(f"INSERT OR REPLACE INTO {table} (id, sort_key, data) VALUES (?, ?, ?)", [(item_id, key, json.dumps(item)) for item_id, key, item in upserts])
+            if table == "emails":
+                self._db.execute("DELETE FROM emails WHERE id NOT IN (SELECT id FROM emails ORDER BY sort_key DESC LIMIT ?)", (GMAIL_SYNC_LIMIT,))
+            self._db.execute("""
+                INSERT INTO sync_state (source, token, synced_at, full_synced_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT(source) DO UPDATE SET token = excluded.token, synced_at = excluded.synced_at,
+                    full_synced_at = COALESCE(excluded.full_synced_at, sync_state.full_synced_at)
+            """, (source, token, now, now if full else None))
+
+    def emails(self, limit: int) -> List[dict]:
+        with self._lock:
+            rows = self._db.execute("SELECT data FROM emails ORDER BY sort_key DESC LIMIT ?", (limit,)).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def events(self, start: datetime.datetime, end: datetime.datetime) -> List[dict]:
+        with self._lock:
+            rows = self._db.execute("SELECT data FROM events WHERE sort_key >= ? AND sort_key < ? ORDER BY sort_key", (start.isoformat(), end.isoformat())).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+class GoogleSync:
+    """Keeps a GoogleStore up to date from Gmail ``history.list`` and Calendar ``syncToken`` incremental sync.
+
+    The factories return the API services on first use from the worker thread. In the
+    assistant they are the process wide services of GoogleClients, whose requests lease a
+    connection from its HttpPool, so the worker shares them with the tool handlers.
+    When Google rejects a sync token as too old the source falls back to a full resync.
+    """
+    def __init__(self, store: GoogleStore, gmail: Optional[Callable[[], Any]], calendar: Optional[Callable[[], Any]], fetch_metadata: Callable[[Any, List[str]], List[dict]], interval: float=GOOGLE_SYNC_INTERVAL):
+        self.store = store
+        self._factories = {"gmail": gmail, "calendar": calendar}
+        self._services = {}
+        self._fetch_metadata = fetch_metadata
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _service(self, source: str):
+        if source not in self._services:
+            self._services[source] = self._factories[source]()
+        return self._services[source]
+
+    def _full_due(self, source: str) -> bool:
+        age = self.store.full_sync_age(source)
+        return self.store.token(source) is None or age is None or age > GOOGLE_FULL_RESYNC_INTERVAL
+
+    def _email_rows(self, messages: List[dict]) -> List[tuple]:
+        return [(m['id'], int(m.get('internalDate', 0)), m) for m in messages]
+
+    def full_sync_gmail(self):
+        service = self._service("gmail")
+        # Read the history id first so changes made during the sync are picked up by the next one
+        history_id = service.users().getProfile(userId='me').execute()['historyId']
+        listed = service.users().messages().list(userId='me', maxResults=GMAIL_SYNC_LIMIT, labelIds=['INBOX']).execute().get('messages', [])
+        messages = self._fetch_metadata(service, [m['id'] for m in listed])
+        self.store.apply("emails", self._email_rows(messages), source="gmail", token=str(history_id), full=True)
+        logging.info(f"Full Gmail sync stored {len(messages)} emails")
+
+    def sync_gmail(self):
+        if self._full_due("gmail"):
+            return self.full_sync_gmail()
+        service = self._service("gmail")
+        token = self.store.token("gmail")
+        known = self.store.ids("emails")
+        changed, deleted, history_id, page = set(), set(), token, None
+        try:
+            while True:
+                response = service.users().history().list(userId='me', startHistoryId=token, pageToken=page).execute()
+                for record in response.get('history', []):
+                    for item in record.get('messagesAdded', []):
+                        if 'INBOX' in item['message'].get('labelIds', []):
+                            changed.add(item['message']['id'])
+                    for item in record.get('labelsAdded', []) + record.get('labelsRemoved', []):
+                        if item['message']['id'] in known or 'INBOX' in item.get('labelIds', []):
+                            changed.add(item['message']['id'])
+                    for item in record.get('messagesDeleted', []):
+                        deleted.add(item['message']['id'])
+                history_id = response.get('historyId', history_id)
+                page = response.get('nextPageToken')
+                if not page:
+                    break
+        except Exception as e:
+            if _status(e) != 404:
+                raise
+            logging.warning(f"Gmail history id {token} expired, running a full resync")
+            return self.full_sync_gmail()
+
+        changed -= deleted
+        messages = self._fetch_metadata(service, sorted(changed)) if changed else []
+        inbox = [m for m in messages if 'INBOX' in m.get('labelIds', [])]
+        # Messages that left the inbox or vanished before they could be fetched are dropped too
+        removed = deleted | (changed - {m['id'] for m in inbox})
+        self.store.apply("emails", self._email_rows(inbox), removed & known, source="gmail", token=str(history_id))
+        if changed or deleted:
+            logging.info(f"Gmail sync updated {len(inbox)} and removed {len(removed & known)} emails")
+
+    def _event_rows(self, events: List[dict]) -> List[tuple]:
+        return [(e['id'], event_start(e).isoformat(), e) for e in events]
+
+    def _list_events(self, **kwargs) -> tuple:
+        service = self._service("calendar")
+        events, page = [], None
+        while True:
+            response = service.events().list(calendarId='primary', singleEvents=True, maxResults=2500, pageToken=page, **kwargs).execute()
+            events.extend(response.get('items', []))
+            page = response.get('nextPageToken')
+            if not page:
+                return events, response.get('nextSyncToken')
+
+    def full_sync_calendar(self):
+        start = (datetime.datetime.utcnow() - CALENDAR_SYNC_PAST).isoformat() + 'Z'
+        events, token = self._list_events(timeMin=start)
+        self.store.apply("events", self._event_rows(events), source="calendar", token=token, full=True)
+        logging.info(f"Full calendar sync stored {len(events)} events")
+
+    def sync_calendar(self):
+        if self._full_due("calendar"):
+            return self.full_sync_calendar()
+        try:
+            events, token = self._list_events(syncToken=self.store.token("calendar"))
+        except Exception as e:
+            if _status(e) != 410:
+                raise
+            logging.warning("Calendar sync token expired, running a full resync")
+            return self.full_sync_calendar()
+
+        cancelled = {e['id'] for e in events if e.get('status') == 'cancelled'}
+        updated = [e for e in events if e['id'] not in cancelled]
+        self.store.apply("events", self._event_rows(updated), cancelled, source="calendar", token=token)
+        if events:
+            logging.info(f"Calendar sync updated {len(updated)} and removed {len(cancelled)} events")
+
+    def sync_once(self):
+        for source, sync in (("gmail", self.sync_gmail), ("calendar", self.sync_calendar)):
+            if self._factories[source] is None:
+                continue
+            start = time.perf_counter()
+            try:
+                sync()
+                logging.debug(f"Synced {source} in {(time.perf_counter() - start) * 1000:.0f} ms")
+            except Exception as e:
+                age = self.store.age(source)
+                logging.error(f"Failed to sync {source}, local copy last synced {describe_age(age) if age is not None else 'never'}: {e}")
+
+    def age(self, source: str) -> Optional[float]:
+        """Age of the mirror of ``source`` in seconds, ``None`` when it is too stale to answer from."""
+        age = self.store.age(source)
+        return age if age is not None and age <= GOOGLE_SYNC_MAX_STALENESS else None
+
+    def run(self):
+        while not self._stop.is_set():
+            self.sync_once()
+            self._stop.wait(self.interval)
+
+    def start(self) -> threading.Thread:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.run, name="google-sync", daemon=True)
+            self._thread.start()
+        return self._thread
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,89 @@
+from typing import Dict, Optional, Tuple
+import re
+
+NUMBER_WORDS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+    "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "fifteen": 15, "twenty": 20,
+    "thirty": 30, "forty": 40, "forty-five": 45, "fifty": 50, "sixty": 60, "ninety": 90,
+}
+_NUMBER = r"(\d{1,3}|" + "|".join(sorted((re.escape(w) for w in NUMBER_WORDS), key=len, reverse=True)) + r")"
+
+# Politeness and the wake word around the request, stripped before matching
+_FILLER = re.compile(r"^(?:(?:hey|ok|okay|so|um|uh|yes|jarvis|please|can you|could you|would you|will you)\b[\s,]*)+|(?:[\s,]*\b(?:please|jarvis|sir|thanks|thank you))+$", re.IGNORECASE)
+
+_TIME = re.compile(r"what(?:'s| is)? the (?:current )?time(?: now| right now)?|what time is it(?: now| right now)?|tell me the time", re.IGNORECASE)
+_DATE = re.compile(r"what(?:'s| is)? (?:the )?(?:date|today's date)(?: today)?|what day is (?:it|today)|what is today|tell me the date", re.IGNORECASE)
+_CLOCK_ALARM = re.compile(r"(?:set|schedule|make) (?:an |a )?alarm (?:for|at) (\d{1,2})(?::(\d{2}))? ?(a\.?m\.?|p\.?m\.?)?|wake me up at (\d{1,2})(?::(\d{2}))? ?(a\.?m\.?|p\.?m\.?)?", re.IGNORECASE)
+_DURATION = rf"{_NUMBER} (minute|minutes|min|mins|hour|hours)(?: and {_NUMBER} (minute|minutes|min|mins))?|half an hour"
+_TIMER = re.compile(rf"(?:set|start|make) (?:an |a )?(alarm|timer) (?:for|in) (?:{_DURATION})|(?:set|start|make) (?:an |a )?(?:{_DURATION}) (timer|alarm)|wake me up in (?:{_DURATION})", re.IGNORECASE)
+
+def _number(word: str) -> int:
+    return int(word) if word.isdigit() else NUMBER_WORDS[word.lower()]
+
+def _strip(text: str) -> str:
+    text = text.strip().strip(".!?").strip()
+    previous = None
+    while previous != text:
+        previous = text
+        text = _FILLER.sub("", text).strip(" ,.!?")
+    return text
+
+def _duration(groups: Tuple[Optional[str], ...], text: str) -> Dict[str, int]:
+    amount, unit, extra_minutes = groups[0], groups[1], groups[2]
+    if amount is None:
+        return {"minutes": 30} if "half an hour" in text.lower() else {}
+    if unit.lower().startswith("h"):
+        arguments = {"hours": _number(amount)}
+        if extra_minutes:
+            arguments["minutes"] = _number(extra_minutes)
+        return arguments
+    return {"minutes": _number(amount)}
+
+def match_intent(text: str) -> Optional[Tuple[str, Dict]]:
+    """Matches a whole utterance against the deterministic intents.
+
+    Returns ``(intent, arguments)`` or ``None``, where arguments for alarms and timers are in
+    the shape ``schedule_alarm`` takes. Only utterances that are nothing but the request
+    match, anything longer or vaguer is left to the LLM.
+    """
+    request = _strip(text)
+    if _TIME.fullmatch(request):
+        return "time", {}
+    if _DATE.fullmatch(request):
+        return "date", {}
+
+    match = _CLOCK_ALARM.fullmatch(request)
+    if match:
+        hour, minute, meridiem = match.group(1, 2, 3) if match.group(1) else match.group(4, 5, 6)
+        hour, minute = int(hour), int(minute or 0)
+        if meridiem:
+            if not 1 <= hour <= 12 or minute > 59:
+                return None
+            time = f"{hour}:{minute:02d} {'AM' if meridiem.lower().startswith('a') else 'PM'}"
+        else:
+            if hour > 23 or minute > 59:
+                return None
+            time = f"{hour:02d}:{minute:02d}"
+        return "alarm", {"alarm_name": "Alarm", "time": time}
+
+    match = _TIMER.fullmatch(request)
+    if match:
+        if match.group(1):
+            kind, groups = match.group(1), match.group(2, 3, 4, 5)
+        elif match.group(10):
+            kind, groups = match.group(10), match.group(6, 7, 8, 9)
+        else:
+            kind, groups = "alarm", match.group(11, 12, 13, 14)
+        arguments = _duration(groups, request)
+        if not arguments or not any(arguments.values()):
+            return None
+        return "timer", {"alarm_name": kind.capitalize(), **arguments}
+    return None
+
+def describe_duration(arguments: Dict) -> str:
+    parts = []
+    for unit in ("hours", "minutes"):
+        value = arguments.get(unit)
+        if value:
+            parts.append(f"{value} {unit if value != 1 else unit[:-1]}")
+    return " and ".join(parts)
@@ -0,0 +1,108 @@
+from collections import deque
+from typing import Optional
+import asyncio, logging, sys, threading, time, traceback
+
+STACK_DEPTH = 12  # Innermost frames of the blocking stack kept in the log
+
+def describe_active(frame) -> str:
+    """Names the tool and pipeline processor a stack belongs to, found by walking out from ``frame``."""
+    tool, processor, location = None, None, None
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module.startswith("functions.") or module.startswith("src.functions."):
+            # The outermost tool frame is the handler the LLM called
+            tool = f"{module.rsplit('.', 1)[-1]}.{frame.f_code.co_name}"
+        if location is None and not module.startswith(("asyncio", "threading", "concurrent")):
+            location = f"{module}.{frame.f_code.co_name}"
+        if processor is None:
+            owner = frame.f_locals.get("self")
+            if hasattr(owner, "process_frame") and hasattr(owner, "name"):
+                processor = owner.name
+        frame = frame.f_back
+    parts = [f"tool {tool}"] if tool else []
+    if processor:
+        parts.append(f"processor {processor}")
+    return ", ".join(parts) or location or "unknown"
+
+class LoopWatchdog:
+    """Measures event loop lag and logs what blocked the loop whenever it stalls.
+
+    A heartbeat task sleeps for ``interval`` and records how late it woke up. A watcher
+    thread notices a heartbeat that is ``threshold`` overdue and captures the loop
+    thread's stack while the stall is still happening, so the warning logged once the loop
+    recovers shows the blocking call and the tool or processor it ran in. Cheap enough to
+    leave on, a wake up every ``interval``.
+    """
+    def __init__(self, threshold: float=0.1, interval: float=0.02, max_samples: int=5000):
+        self.threshold = threshold
+        self.interval = interval
+        self.lags = deque(maxlen=max_samples)
+        self.stalls = 0
+        self.last_stall: Optional[str] = None
+        self._last_beat = time.monotonic()
+        self._captured = None  # (beat the stall started after, stack, active)
+        self._loop_thread = None
+        self._task = None
+        self._stop = threading.Event()
+
+    def start(self):
+        """Starts watching the running loop, must be called from it."""
+        self._loop_thread = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        threading.Thread(target=self._watch, name="loop-watchdog", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+
+    async def _heartbeat(self):
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(now - start - self.interval, 0.0)
+            self.lags.append(lag)
+            previous, self._last_beat = self._last_beat, now
+            if lag >= self.threshold:
+                self._report(lag, previous)
+
+    def _report(self, lag: float, beat: float):
+        self.stalls += 1
+        captured, self._captured = self._captured, None
+        if captured and captured[0] == beat:
+            _, stack, active = captured
+        else:
+            stack, active = "  (stack not captured)\n", "unknown"
+        self.last_stall = active
+        logging.warning(f"Event loop stalled for {lag * 1000:.0f} ms in {active}, blocking stack:\n{stack.rstrip()}")
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            beat = self._last_beat
+            if time.monotonic() - beat - self.interval < self.threshold or (self._captured and self._captured[0] == beat):
+                continue
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+            try:
+                stack = "".join(traceback.format_stack(frame)[-STACK_DEPTH:])
+                self._captured = (beat, stack, describe_active(frame))
+            except Exception as e:
+                # The loop thread keeps running while its frames are inspected, never let that stop the watcher
+                logging.debug(f"Could not capture the event loop stack: {e}")
+
+    def percentile(self, fraction: float) -> float:
+        if not self.lags:
+            return 0.0
+        ordered = sorted(self.lags)
+        return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+    def summary(self) -> str:
+        return (
+            f"lag p50 {self.percentile(0.5) * 1000:.1f} ms, p95 {self.percentile(0.95) * 1000:.1f} ms, "
+            f"p99 {self.percentile(0.99) * 1000:.1f} ms, max {max(self.lags, default=0) * 1000:.0f} ms, "
+            f"{self.stalls} stalls over {self.threshold * 1000:.0f} ms"
+        )
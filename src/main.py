@@ -16,16 +16,21 @@ from pipecat.services.llm_service import LLMContext
 from pipecat.pipeline.runner import PipelineRunner
 from pipecat.pipeline.pipeline import Pipeline
 
-from processors import WakeWordGate, ConsoleLogger, HardcodedInputInjector, MessageInjector, SystemInstructionRefresher
-from ollama import ensure_ollama_running, ensure_model_downloaded, unload_model
-from tts import LocalPiperTTSService
+from processors import WakeWordGate, ConsoleLogger, HardcodedInputInjector, MessageInjector, SystemInstructionRefresher, SentenceChunker, ContextGovernor, PromptCacheStats, LLMReadinessGate, ToolSelector, IntentFastPath
+from ollama import ensure_ollama_running, ensure_model_downloaded, unload_model, summarize_conversation
+from tts import LocalPiperTTSService, OnnxPiperTTSService
 from loguru import logger
-from functions import functions, basic, sandbox, files, google_ops, supabase_ops, alarm, website_blocker, scheduler
+from functions import scheduler
+from tool_registry import ToolRegistry
+from tool_router import ToolRouter
+from tool_cache import TOOL_CACHE
 from observer import MetricsLogger, setup_logging
+from startup import StartupTimer
+from loop_watchdog import LoopWatchdog
+from timer_service import TIMERS
+from transcript import TranscriptWriter
 from config import get_config
 import logging
-import datetime
-import os
 
 logger.remove()
 setup_logging()
@@ -39,36 +44,78 @@ setup_logging()
 VERBOSE = True
 HARDCODE_INPUT = False
 HARDCODED_INPUT_TEXT = "Jarvis What is the current weather, use the search_internet function"
+TTS_ENGINE = "subprocess" # "subprocess" runs piper.exe, "onnx" runs the voice in-process
+TTS_CACHE_DIR = ".tts-cache"
+TTS_STREAMING = False # Stream piper output as it is synthesized, at the cost of a new piper process per utterance
+TOOL_ROUTER_TOP_K = 2 # Best matching tools sent per request, on top of the search fallback
+LOOP_STALL_THRESHOLD = 0.1 # Seconds the event loop may block before the stack is logged, None disables the watchdog
+COMPRESS_TRANSCRIPTS = False # Gzip finished transcript files in .history
 # MODEL_NAME = "qwen2.5:32b"
 MODEL_NAME = "mistral-nemo"
 # MODEL_NAME = "qwen2.5:14b"
 # MODEL_NAME = "qwen3:4b-instruct-2507-q4_K_M"
 
+def warm_up_llm(config):
+    ensure_ollama_running()
+    ensure_model_downloaded(MODEL_NAME, options={"num_ctx": config.OLLAMA_NUM_CTX})
+
 async def main():
     config = get_config()
+    startup = StartupTimer()
+    loop_watchdog = None
+    if LOOP_STALL_THRESHOLD:
+        loop_watchdog = LoopWatchdog(threshold=LOOP_STALL_THRESHOLD)
+        loop_watchdog.start()
+
+    # Ollama and the model load in the background, turns are held until it is ready
+    llm_ready = asyncio.Event()
+    async def prepare_llm():
+        try:
+            await startup.run("ollama", warm_up_llm, config)
+        finally:
+            llm_ready.set()
+    llm_task = asyncio.create_task(prepare_llm())
+
+    # Transcript under .history/Week_X/DayName, written off the event loop
+    transcript = TranscriptWriter(compress=COMPRESS_TRANSCRIPTS)
+    transcript.start()
 
-    # Create history directory if it doesn't exist
-    base_history_dir = ".history"
-    
-    # Generate timestamp and derived folder names
-    now = datetime.datetime.now()
-    week_num = now.isocalendar()[1]
-    day_name = now.strftime("%A")
-    
-    # Create directory structure: .history/Week_X/DayName
-    history_dir = os.path.join(base_history_dir, f"Week_{week_num}", day_name)
-    os.makedirs(history_dir, exist_ok=True)
-    
-    # Generate transcript filename based on current time
-    transcript_filename = now.strftime("%Y-%m-%d_%H-%M-%S.txt")
-    transcript_file = os.path.join(history_dir, transcript_filename)
-    logging.info(f"Logging conversation to {transcript_file}")
+    # TTS
+    prewarm_phrases = open("./tools/tts_phrases.txt").read().splitlines()
+    if TTS_ENGINE == "onnx":
+        tts = OnnxPiperTTSService(
+            voice_path="./tools/voices/jarvis-medium.onnx",
+            espeak_data_path="./tools/piper/espeak-ng-data",
+            volume=0.3,
+            output_sample_rate=16000,
+            intra_op_threads=2,
+            inter_op_threads=1,
+            cache_dir=TTS_CACHE_DIR,
+            prewarm_phrases=prewarm_phrases,
+        )
+    else:
+        tts = LocalPiperTTSService(
+            piper_path="./tools/piper/piper.exe", 
+            voice_path="./tools/voices/jarvis-medium.onnx", 
+            volume=0.3,
+            output_sample_rate=16000,
+            streaming=TTS_STREAMING,
+            cache_dir=TTS_CACHE_DIR,
+            prewarm_phrases=prewarm_phrases,
+        )
+
+    # Model loads are independent, run them side by side
+    vad, stt, turn_analyzer, _ = await asyncio.gather(
+        startup.run("vad", SileroVADAnalyzer, params=VADParams(
+            start_secs=0.1,
+            stop_secs=0.2,
+        )),
+        startup.run("whisper", WhisperSTTService, model=Model.SMALL, device=config.WHISPER_DEVICE, compute_type=config.WHISPER_COMPUTE_TYPE),
+        startup.run("smart_turn", LocalSmartTurnAnalyzerV3) if not HARDCODE_INPUT else asyncio.sleep(0),
+        startup.track("tts", tts.warm_up()),
+    )
 
     # SST
-    vad = SileroVADAnalyzer(params=VADParams(
-        start_secs=0.1,
-        stop_secs=0.2,
-    ))
     # TODO https://docs.pipecat.ai/guides/features/krisp-viva
     transport = LocalAudioTransport(params=LocalAudioTransportParams(
             audio_in_enabled=not HARDCODE_INPUT,
@@ -80,40 +127,15 @@ async def main():
             audio_out_index=7,
             allow_interruptions=False,
     ))
-    stt = WhisperSTTService(model=Model.SMALL, device=config.WHISPER_DEVICE, compute_type=config.WHISPER_COMPUTE_TYPE)
 
     # LLM
     llm = OLLamaLLMService(model=MODEL_NAME, base_url="http://localhost:11434/v1", options={"num_ctx": config.OLLAMA_NUM_CTX})
-    llm.register_function("search_internet", functions.execute_web_search, cancel_on_interruption=True)
-    # llm.register_function("get_resource_usage", functions.monitor_resources, cancel_on_interruption=True)
-    llm.register_function("get_date_time_location", basic.execute_get_date_time_location, cancel_on_interruption=True)
-    # llm.register_function("run_python_code", sandbox.execute_run_python_code, cancel_on_interruption=True)
-    llm.register_function("append_to_memory", files.execute_append_to_memory, cancel_on_interruption=True)
-    llm.register_function("manage_file_system", files.execute_manage_file_system, cancel_on_interruption=True)
-    llm.register_function("get_recent_emails", google_ops.execute_get_recent_emails, cancel_on_interruption=True)
-    llm.register_function("get_calendar_events", google_ops.execute_get_calendar_events, cancel_on_interruption=True)
-    # llm.register_function("get_habits", supabase_ops.execute_get_habits, cancel_on_interruption=True)
-    # llm.register_function("get_website_usage", supabase_ops.execute_get_website_usage, cancel_on_interruption=True)
-    llm.register_function("schedule_alarm", alarm.execute_schedule_alarm, cancel_on_interruption=False)
-    # llm.register_function("block_websites", website_blocker.execute_block_websites, cancel_on_interruption=False)
-    # llm.register_function("schedule_prompt", scheduler.execute_schedule_prompt, cancel_on_interruption=False)
+    tool_registry = ToolRegistry(enabled=config.TOOLS)
+    tool_registry.register(llm)
 
     # Context
-    tools = ToolsSchema(standard_tools=[
-        functions.search_internet, 
-        # functions.get_resource_usage,
-        basic.get_date_time_location,
-        # sandbox.run_python_code,
-        files.append_to_memory,
-        files.manage_file_system,
-        google_ops.get_recent_emails,
-        google_ops.get_calendar_events,
-        # supabase_ops.get_habits,
-        # supabase_ops.get_website_usage,
-        alarm.schedule_alarm,
-        # website_blocker.block_websites,
-        # scheduler.schedule_prompt,
-    ])
+    tools = ToolsSchema(standard_tools=tool_registry.schemas())
+    logging.info(f"Tools enabled: {', '.join(tool_registry.enabled)} ({tool_registry.payload_size()} chars of schema per request)")
     system_prompt = open("./tools/system.txt").read()
     # function_prompt = open("./tools/functions.txt").read()
     memory_content = open("./tools/memory.txt").read()
@@ -124,13 +146,6 @@ async def main():
         "content": full_system_prompt
     }], tools=tools)
 
-    # TTS
-    tts = LocalPiperTTSService(
-        piper_path="./tools/piper/piper.exe", 
-        voice_path="./tools/voices/jarvis-medium.onnx", 
-        volume=0.3
-    )
-
     # Smart Turn Aggregators
     if HARDCODE_INPUT:
         user_aggregator, assistant_aggregator = LLMContextAggregatorPair(context)
@@ -140,32 +155,48 @@ async def main():
             user_params=LLMUserAggregatorParams(
                 user_turn_strategies=UserTurnStrategies(
                     stop=[TurnAnalyzerUserTurnStopStrategy(
-                        turn_analyzer=LocalSmartTurnAnalyzerV3()
+                        turn_analyzer=turn_analyzer
                     )]
                 ),
             ),
         )
     
     # Custom Processors
-    wake_word_gate = WakeWordGate(context=context, transcript_file=transcript_file)
+    wake_word_gate = WakeWordGate(context=context, transcript=transcript, drop_ambient=True, lead_in_secs=10)
     refresher_prompt = open("./tools/refresher.txt").read()
-    system_refresher = SystemInstructionRefresher(instructional_anchor=refresher_prompt)
+    prompt_stats = PromptCacheStats()
+    system_refresher = SystemInstructionRefresher(context=context, instructional_anchor=refresher_prompt, prompt_stats=prompt_stats)
     message_injector = MessageInjector(context=context)
+    context_governor = ContextGovernor(
+        context=context,
+        max_tokens=config.OLLAMA_NUM_CTX // 2,
+        keep_turns=6,
+        summarize=lambda text: asyncio.to_thread(summarize_conversation, MODEL_NAME, text, {"num_ctx": config.OLLAMA_NUM_CTX}),
+    )
+    llm_gate = LLMReadinessGate(ready=llm_ready)
+    intent_fast_path = IntentFastPath(context=context, registry=tool_registry, transcript=transcript)
+    tool_selector = ToolSelector(context=context, router=ToolRouter(tool_registry.tools(), top_k=TOOL_ROUTER_TOP_K))
     scheduler.set_injector(message_injector)
     
-    console_logger = ConsoleLogger(transcript_file=transcript_file)
+    console_logger = ConsoleLogger(transcript=transcript)
+    sentence_chunker = SentenceChunker(tts=tts, lookahead_depth=2)
 
     pipeline_steps = [transport.input()]
     if HARDCODE_INPUT:
         pipeline_steps.append(HardcodedInputInjector(HARDCODED_INPUT_TEXT))
     pipeline_steps.extend([
         stt,
-        system_refresher,
         user_aggregator,
         wake_word_gate,
-        # message_injector,
+        intent_fast_path,
+        message_injector,
+        context_governor,
+        tool_selector,
+        system_refresher,
+        llm_gate,
         llm,
         console_logger,
+        sentence_chunker,
         tts, 
         assistant_aggregator,
         transport.output(),
@@ -176,7 +207,14 @@ async def main():
     task = PipelineTask(pipeline, params=PipelineParams(
         enable_metrics=VERBOSE,
         enable_usage_metrics=VERBOSE,
-    ), observers=[MetricsLogger()], idle_timeout_secs=60*60)
+    ), observers=[MetricsLogger(prompt_stats=prompt_stats, tool_cache=TOOL_CACHE, loop_watchdog=loop_watchdog)], idle_timeout_secs=60*60)
+
+    @task.event_handler("on_pipeline_started")
+    async def on_pipeline_started(task, frame):
+        # Build tool clients in the background now that the audio path is live
+        tool_registry.start_warm_up()
+        # Restores alarms, scheduled prompts and unblocks from before a restart
+        TIMERS.start()
 
     @task.event_handler("on_idle_timeout")
     async def on_idle_handler():
@@ -184,6 +222,7 @@ async def main():
         logging.warning("Pipeline finishing due to idle timeout.")
 
     runner = PipelineRunner()
+    startup.report("Audio path ready")
 
     print("Voice Assistant Running... Say 'Jarvis' to interact.")
     logging.info("Voice Assistant Running... Say 'Jarvis' to interact.")
@@ -196,11 +235,16 @@ async def main():
     except Exception as e:
         logger.exception(f"Unexpected error in main loop: {e}")
         await task.cancel()
+    finally:
+        if not llm_task.done():
+            llm_task.cancel()
+        TIMERS.stop()
+        await transcript.close()
+        if loop_watchdog:
+            logging.info(f"Event loop: {loop_watchdog.summary()}")
+            loop_watchdog.stop()
 
 if __name__ == "__main__":
-    config = get_config()
-    ensure_ollama_running()
-    ensure_model_downloaded(MODEL_NAME, options={"num_ctx": config.OLLAMA_NUM_CTX})
     try:
         asyncio.run(main())
     finally:
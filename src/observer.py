@@ -2,25 +2,143 @@ from pipecat.observers.base_observer import BaseObserver, FramePushed, FrameProc
 from pipecat.frames.frames import MetricsFrame
 from datetime import datetime
 from pipecat.metrics.metrics import LLMUsageMetricsData, ProcessingMetricsData, TTFBMetricsData, TTSUsageMetricsData
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 from collections import deque
-import logging, os
+from typing import Optional
+import atexit, json, logging, os, queue, threading
 
-def setup_logging():
-    log_dir = Path("logs")
+LOG_DIR = "logs"
+LOG_FILES_KEPT = 5
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "json")  # "json" writes one object per line, "text" the plain format
+LOG_MAX_CHARS = 2000  # Longer messages are truncated once, when they are written
+LOG_RATE = 20  # Records per second one call site may log once its burst is used up
+LOG_BURST = 100  # Records one call site may log at once
+LOG_SAMPLED = {"Metric: ProcessingMetricsData": 5}  # Message prefixes of which only every Nth record is kept, per frame metrics only
+
+_turn = 0
+_listener = None
+
+def begin_turn() -> int:
+    """Starts a new conversation turn, records logged from now on carry its ID."""
+    global _turn
+    _turn += 1
+    return _turn
+
+def truncate_message(message: str, limit: int=LOG_MAX_CHARS) -> str:
+    if len(message) <= limit:
+        return message
+    return f"{message[:limit]}... [{len(message) - limit} more characters]"
+
+class TurnFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.turn = _turn
+        return True
+
+class NoiseFilter(logging.Filter):
+    """Throttles call sites that log too often and samples messages that are logged for every frame.
+
+    Each call site gets a token bucket of ``burst`` records refilled at ``rate`` per second,
+    the number of records it dropped is attached to the next one that passes. Of messages
+    starting with a prefix in ``sampled`` only every Nth record is kept. Warnings and
+    errors always pass.
+    """
+    def __init__(self, rate: float=LOG_RATE, burst: int=LOG_BURST, sampled: dict=None):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.sampled = LOG_SAMPLED if sampled is None else sampled
+        self._buckets = {}  # (path, line) -> [tokens, last refill, dropped]
+        self._seen = {}  # Prefix -> records seen
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        with self._lock:
+            key = (record.pathname, record.lineno)
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [self.burst, record.created, 0]
+            elapsed = record.created - bucket[1]
+            if elapsed > 0:
+                bucket[0] = min(self.burst, bucket[0] + elapsed * self.rate)
+                bucket[1] = record.created
+            if bucket[0] < 1:
+                bucket[2] += 1
+                return False
+            bucket[0] -= 1
+            if bucket[2]:
+                record.suppressed, bucket[2] = bucket[2], 0
+            if isinstance(record.msg, str):
+                for prefix, every in self.sampled.items():
+                    if record.msg.startswith(prefix):
+                        seen = self._seen[prefix] = self._seen.get(prefix, 0) + 1
+                        if (seen - 1) % every:
+                            return False
+                        record.sampled = every
+                        break
+        return True
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "turn": getattr(record, "turn", None),
+            "message": truncate_message(record.getMessage()),
+        }
+        for field in ("suppressed", "sampled"):
+            if hasattr(record, field):
+                entry[field] = getattr(record, field)
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        record.msg, record.args = truncate_message(record.getMessage()), None
+        return super().format(record)
+
+class BackgroundQueueHandler(QueueHandler):
+    """Queues records as they are, so formatting happens on the listener thread too."""
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+def stop_logging():
+    """Writes out queued records and stops the listener thread."""
+    global _listener
+    if _listener:
+        _listener.stop()
+        _listener = None
+
+def setup_logging(log_dir: str=LOG_DIR, log_format: str=LOG_FORMAT, noise_filter: Optional[logging.Filter]=None):
+    """Logs to a new file in ``log_dir`` from a background thread.
+
+    Records are filtered and tagged with the turn on the calling thread, everything else,
+    message formatting, truncation and the disk write, happens on the listener thread.
+    ``noise_filter`` replaces the default NoiseFilter.
+    """
+    log_dir = Path(log_dir)
     log_dir.mkdir(exist_ok=True)
+    extension = "jsonl" if log_format == "json" else "txt"
 
-    logging.basicConfig(
-        filename=log_dir / f'{datetime.now().strftime("%Y-%m-%d_%H-%M-%S")}.txt', 
-        level=logging.INFO, 
-        format='%(asctime)s - %(levelname)s - %(message)s', 
-        filemode='w',
-        force=True
-    )
+    file_handler = logging.FileHandler(log_dir / f'{datetime.now().strftime("%Y-%m-%d_%H-%M-%S")}.{extension}', mode='w', encoding='utf-8')
+    file_handler.setFormatter(JsonFormatter() if log_format == "json" else TextFormatter('%(asctime)s - %(levelname)s - [turn %(turn)s] %(message)s'))
+
+    stop_logging()
+    global _listener
+    _listener = QueueListener(queue.SimpleQueue(), file_handler)
+    handler = BackgroundQueueHandler(_listener.queue)
+    handler.addFilter(noise_filter or NoiseFilter())
+    handler.addFilter(TurnFilter())
+    logging.basicConfig(level=logging.INFO, handlers=[handler], force=True)
+    _listener.start()
 
     # Delete old logs
-    files = sorted(Path("logs").glob("*.txt"), key=os.path.getmtime)
-    total_files = 5
+    files = sorted([*log_dir.glob("*.txt"), *log_dir.glob("*.jsonl")], key=os.path.getmtime)
+    total_files = LOG_FILES_KEPT
     if len(files) > total_files:
         for f in files[:-total_files]:
             try:
@@ -35,10 +153,31 @@ def setup_logging():
     logging.getLogger("httpcore").setLevel(logging.WARNING)
     logging.getLogger("websockets").setLevel(logging.WARNING)
 
+# Runs before logging's own shutdown, which was registered first
+atexit.register(stop_logging)
+
 class MetricsLogger(BaseObserver):
-    def __init__(self):
+    def __init__(self, prompt_stats=None, tool_cache=None, loop_watchdog=None):
         super().__init__()
         self._seen_frames = deque(maxlen=100)
+        self._prompt_stats = prompt_stats
+        self._tool_cache = tool_cache
+        self._loop_watchdog = loop_watchdog
+        self._last_cache_summary = None
+
+    def log_tool_cache(self):
+        """Logs the tool cache statistics whenever they changed since the last report."""
+        if not self._tool_cache or not self._tool_cache.stats:
+            return
+        summary = self._tool_cache.summary()
+        if summary != self._last_cache_summary:
+            self._last_cache_summary = summary
+            logging.info(f"Tool cache: {summary}")
+
+    def log_loop_lag(self):
+        """Logs event loop lag percentiles, once per LLM turn."""
+        if self._loop_watchdog and self._loop_watchdog.lags:
+            logging.info(f"Event loop: {self._loop_watchdog.summary()}")
 
     async def on_push_frame(self, data: FramePushed):
         if isinstance(data.frame, MetricsFrame):
@@ -52,6 +191,10 @@ class MetricsLogger(BaseObserver):
                     logging.info(f"Metric: {type(d).__name__}, processing: {d.value}")
                 elif isinstance(d, LLMUsageMetricsData):
                     logging.info(f"Metric: {type(d).__name__}, tokens: {d.value.prompt_tokens}, characters: {d.value.completion_tokens}")
+                    if self._prompt_stats:
+                        self._prompt_stats.record_usage(d.value.prompt_tokens)
+                    self.log_tool_cache()
+                    self.log_loop_lag()
                 elif isinstance(d, TTSUsageMetricsData):
                     logging.info(f"Metric: {type(d).__name__}, characters: {d.value}")
                 else:
@@ -1,5 +1,19 @@
 import time, subprocess, urllib.request, urllib.error, logging, json
 
+def wait_for_ollama(url: str = "http://localhost:11434/", timeout: float = 20.0, initial_delay: float = 0.05, max_delay: float = 1.0) -> bool:
+    # Exponential backoff, Ollama is usually up within a few hundred milliseconds
+    deadline = time.monotonic() + timeout
+    delay = initial_delay
+    while True:
+        try:
+            urllib.request.urlopen(url, timeout=2)
+            return True
+        except (urllib.error.URLError, ConnectionRefusedError, OSError):
+            if time.monotonic() + delay > deadline:
+                return False
+            time.sleep(delay)
+            delay = min(delay * 2, max_delay)
+
 def ensure_ollama_running():
     url = "http://localhost:11434/"
     try:
@@ -12,19 +26,13 @@ def ensure_ollama_running():
         logging.info("Ollama is not running. Starting it...")
         subprocess.Popen(["ollama", "serve"], shell=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
 
-        print("Waiting for Ollama to become ready...", end="", flush=True)
         logging.info("Waiting for Ollama to become ready...")
-        retries = 20
-        while retries > 0:
-            try:
-                urllib.request.urlopen(url)
-                print("\nOllama is ready!")
-                logging.info("\nOllama is ready!")
-                return
-            except (urllib.error.URLError, ConnectionRefusedError):
-                time.sleep(1)
-                print(".", end="", flush=True)
-                retries -= 1
+        if wait_for_ollama(url):
+            print("Ollama is ready!")
+            logging.info("Ollama is ready!")
+        else:
+            print("Warning: Ollama did not become ready in time.")
+            logging.error("Ollama did not become ready in time.")
 
 def ensure_model_downloaded(model_name: str, options: dict = None):
     print(f"Checking if model '{model_name}' is available...")
@@ -85,4 +93,22 @@ def unload_model(model_name: str):
              logging.error(f"Warning: Failed to unload model: {e}")
     except Exception as e:
         print(f"Warning: Failed to unload model: {e}")
-        logging.error(f"Warning: Failed to unload model: {e}")
\ No newline at end of file
+        logging.error(f"Warning: Failed to unload model: {e}")
+
+
+def summarize_conversation(model_name: str, text: str, options: dict = None) -> str:
+    # Same options as the chat requests, otherwise Ollama reloads the model with a different context size
+    prompt = (
+        "Condense these notes from earlier in a conversation between Aidan and his assistant Jarvis. "
+        "Keep names, dates, times, numbers, decisions and preferences. Reply with a few plain sentences only.\n\n"
+        f"{text}"
+    )
+    payload = {"model": model_name, "prompt": prompt, "stream": False, "keep_alive": "60m"}
+    if options:
+        payload["options"] = options
+
+    url = "http://localhost:11434/api/generate"
+    data = json.dumps(payload).encode("utf-8")
+    req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(req, timeout=120) as response:
+        return json.loads(response.read().decode("utf-8")).get("response", "")
@@ -1,36 +1,159 @@
 import asyncio
-from pipecat.frames.frames import Frame, LLMContextFrame, TextFrame, TranscriptionFrame, LLMFullResponseStartFrame, LLMFullResponseEndFrame, StartFrame, FunctionCallInProgressFrame, LLMMessagesAppendFrame
+import datetime
+import json
+import re
+import time
+from collections import deque
+from types import SimpleNamespace
+from typing import Awaitable, Callable, List, Optional
+from pipecat.frames.frames import Frame, LLMContextFrame, TextFrame, TranscriptionFrame, LLMFullResponseStartFrame, LLMFullResponseEndFrame, StartFrame, EndFrame, CancelFrame, FunctionCallInProgressFrame, AggregatedTextFrame, InterruptionFrame, TTSSpeakFrame, BotStartedSpeakingFrame, BotStoppedSpeakingFrame, UserStartedSpeakingFrame, UserStoppedSpeakingFrame
+from pipecat.utils.text.base_text_aggregator import AggregationType
 from pipecat.processors.frame_processor import FrameProcessor, FrameDirection
 from pipecat.services.llm_service import LLMContext
+from pipecat.adapters.schemas.tools_schema import ToolsSchema
+from tool_router import ToolRouter
+from observer import begin_turn
+from intents import match_intent, describe_duration
 from fuzzywuzzy import process, fuzz
 import logging
 
 
+def estimate_tokens(message: dict) -> int:
+    content = message.get("content") or ""
+    if not isinstance(content, str):
+        content = json.dumps(content)
+    length = len(content)
+    if message.get("tool_calls"):
+        length += len(json.dumps(message["tool_calls"]))
+    # Roughly 4 characters per token plus the chat template overhead
+    return length // 4 + 4
+
+class PromptCacheStats:
+    """Matches the prompt sent each turn with the prompt tokens Ollama reports evaluating.
+
+    Ollama only evaluates the part of the prompt after the longest prefix it still has
+    in its KV cache, so ``1 - evaluated / total`` estimates the prefix cache hit rate.
+    """
+    def __init__(self):
+        self._previous: List[str] = []
+        self._pending = None
+        self.turns = []  # (estimated prompt tokens, evaluated prompt tokens, hit rate)
+
+    def record_prompt(self, messages: List[dict]):
+        snapshot = [json.dumps(m, sort_keys=True, default=str) for m in messages]
+        tokens = [estimate_tokens(m) for m in messages]
+        stable = 0
+        for previous, current in zip(self._previous, snapshot):
+            if previous != current:
+                break
+            stable += 1
+        self._previous = snapshot
+        self._pending = (sum(tokens), sum(tokens[:stable]), stable)
+
+    def record_usage(self, prompt_tokens: int):
+        if not self._pending or not prompt_tokens:
+            return
+        total, prefix, stable = self._pending
+        self._pending = None
+        hit_rate = max(0.0, min(1.0, 1 - prompt_tokens / total))
+        self.turns.append((total, prompt_tokens, hit_rate))
+        average = sum(t[2] for t in self.turns) / len(self.turns)
+        logging.info(f"Prompt cache: evaluated {prompt_tokens} of ~{total} prompt tokens (hit rate ~{hit_rate:.0%}, session ~{average:.0%}), stable prefix ~{prefix} tokens / {stable} messages")
+
 class SystemInstructionRefresher(FrameProcessor):
-    def __init__(self, instructional_anchor: str):
+    """Keeps exactly one reminder system message, always last in the prompt.
+
+    Sits right before the LLM so only turns that reach it are touched. Earlier copies
+    are removed, which keeps everything before the newest turn byte for byte identical
+    between requests and lets Ollama reuse its prompt prefix cache.
+    """
+    PREFIX = "SYSTEM REMINDER:"
+
+    def __init__(self, context: LLMContext, instructional_anchor: str, prompt_stats: Optional[PromptCacheStats]=None):
         super().__init__()
+        self._context = context
         self.anchor = instructional_anchor
+        self._prompt_stats = prompt_stats
+
+    def _is_reminder(self, message: dict) -> bool:
+        return message.get("role") == "system" and str(message.get("content", "")).startswith(self.PREFIX)
+
+    def refresh(self):
+        messages = [m for m in self._context.messages if not self._is_reminder(m)]
+        messages.append({
+            "role": "system",
+            "content": f"{self.PREFIX} {self.anchor}"
+        })
+        self._context.set_messages(messages)
+        if self._prompt_stats:
+            self._prompt_stats.record_prompt(messages)
 
     async def process_frame(self, frame: Frame, direction: FrameDirection):
         await super().process_frame(frame, direction)
         
-        if isinstance(frame, TranscriptionFrame):
-            refresher_message = {
-                "role": "system",
-                "content": f"SYSTEM REMINDER: {self.anchor}"
-            }
-            await self.push_frame(LLMMessagesAppendFrame(messages=[refresher_message], run_llm=False), direction)
+        if isinstance(frame, LLMContextFrame) and direction == FrameDirection.DOWNSTREAM:
+            self.refresh()
         
         await self.push_frame(frame, direction)
 
+class LLMReadinessGate(FrameProcessor):
+    """Holds turns back until the LLM has been warmed up.
+
+    Lets the audio path start while Ollama is still loading the model. Only the most
+    recent turn is kept, it is sent as soon as ``ready`` is set and the user hears a
+    short notice the first time they have to wait.
+    """
+    def __init__(self, ready: asyncio.Event, defer_message: str="One moment, Sir. I am still warming up."):
+        super().__init__()
+        self._ready = ready
+        self._defer_message = defer_message
+        self._held: Optional[LLMContextFrame] = None
+        self._release_task: Optional[asyncio.Task] = None
+        self._notified = False
+
+    async def _release(self):
+        await self._ready.wait()
+        frame, self._held = self._held, None
+        if frame:
+            logging.info("LLM ready, releasing held turn")
+            await self.push_frame(frame, FrameDirection.DOWNSTREAM)
+
+    async def process_frame(self, frame: Frame, direction: FrameDirection):
+        await super().process_frame(frame, direction)
+
+        if isinstance(frame, LLMContextFrame) and direction == FrameDirection.DOWNSTREAM and not self._ready.is_set():
+            self._held = frame
+            if not self._notified:
+                self._notified = True
+                await self.push_frame(TTSSpeakFrame(self._defer_message, append_to_context=False), direction)
+            if not self._release_task:
+                self._release_task = asyncio.create_task(self._release())
+            return
+
+        await self.push_frame(frame, direction)
+
 class WakeWordGate(FrameProcessor):
-    def __init__(self, context: LLMContext, wake_word: str="jarvis", threshold: int=91, min_length: int=4, transcript_file: str=None):
+    """Only lets turns that address the assistant through to the LLM.
+
+    With ``drop_ambient`` set, utterances without the wake word are taken back out of
+    the context and kept in a bounded side buffer instead. Ambient speech from the last
+    ``lead_in_secs`` is attached to the next addressed turn, and the whole buffer is
+    attached when the user asks what was just said. Attached speech leaves the buffer. The
+    lead-in is one line in front of the utterance, ``utterance`` takes it back off.
+    """
+    LEAD_IN_PREFIX = "(Overheard before this, not addressed to you: "
+    _RECALL = re.compile(r"\bwhat (did|was|were) (i|we|you|he|she|they|someone|somebody)?\s*(just )?(say|said|saying|talking about)\b|\brepeat what\b", re.IGNORECASE)
+
+    def __init__(self, context: LLMContext, wake_word: str="jarvis", threshold: int=91, min_length: int=4, transcript=None, drop_ambient: bool=False, ambient_buffer_size: int=20, lead_in_secs: float=0.0):
         super().__init__()
         self._context = context
         self._wake_word = wake_word
         self._threshold = threshold
         self._min_length = min_length
-        self._transcript_file = transcript_file
+        self._transcript = transcript  # TranscriptWriter
+        self._drop_ambient = drop_ambient
+        self._lead_in_secs = lead_in_secs
+        self.ambient = deque(maxlen=ambient_buffer_size)  # (monotonic time, text)
 
     def _should_respond(self, text: str) -> bool:
         filtered_words = [w.lower() for w in text.split() if len(w) > self._min_length]
@@ -40,6 +163,34 @@ class WakeWordGate(FrameProcessor):
         logging.info(f"Word extracting: {match}:{score} {text}")
         return score >= self._threshold
 
+    def _hold_ambient(self, text: str):
+        """Moves the last (ambient) user message out of the context into the side buffer."""
+        self.ambient.append((time.monotonic(), text))
+        self._context.set_messages(self._context.messages[:-1])
+
+    @classmethod
+    def utterance(cls, content: str) -> str:
+        """The user's own words of a message, without an attached lead-in."""
+        if content.startswith(cls.LEAD_IN_PREFIX) and "\n" in content:
+            return content.split("\n", 1)[1]
+        return content
+
+    def _attach_lead_in(self, text: str):
+        if self._RECALL.search(text):
+            cutoff = float("-inf")
+        elif self._lead_in_secs > 0:
+            cutoff = time.monotonic() - self._lead_in_secs
+        else:
+            return
+        heard = [t for when, t in self.ambient if when >= cutoff]
+        if not heard:
+            return
+        self.ambient = deque(((when, t) for when, t in self.ambient if when < cutoff), maxlen=self.ambient.maxlen)
+
+        overheard = " / ".join(" ".join(t.split()) for t in heard)
+        self._context.messages[-1] = {**self._context.messages[-1], "content": f"{self.LEAD_IN_PREFIX}{overheard})\n{text}"}
+        logging.info(f"Attached {len(heard)} ambient utterances to the turn")
+
     async def process_frame(self, frame: Frame, direction: FrameDirection):
         await super().process_frame(frame, direction)
 
@@ -48,28 +199,94 @@ class WakeWordGate(FrameProcessor):
             if self._context.messages and self._context.messages[-1]["role"] == "user":
                 last_user_message = self._context.messages[-1]["content"]
                 if self._should_respond(last_user_message):
+                    begin_turn()
                     print(f"User: {last_user_message}")
                     logging.info(f"User: {last_user_message}")
-                    if self._transcript_file:
-                        try:
-                            with open(self._transcript_file, "a", encoding="utf-8") as f:
-                                f.write(f"User: {last_user_message}\n")
-                        except Exception as e:
-                            logging.error(f"Failed to log to transcript: {e}")
+                    if self._transcript:
+                        self._transcript.write("User", last_user_message)
+                    if self._drop_ambient:
+                        self._attach_lead_in(last_user_message)
                 else:
                     print(last_user_message)
                     logging.info(f"Audio: {last_user_message}")
+                    if self._drop_ambient:
+                        self._hold_ambient(last_user_message)
                     return
         
         await self.push_frame(frame, direction)
 
+class IntentFastPath(FrameProcessor):
+    """Answers time, date, alarm and timer requests without a round trip through the LLM.
+
+    Sits after the wake word gate and matches the utterance without its lead-in. Turns
+    that are nothing but one of these requests are answered from a template, alarms go through the ``schedule_alarm`` handler as if the
+    LLM had called it, and the reply is appended to the context so later turns see it.
+    Everything else, and any request the handler rejects, continues to the LLM.
+    """
+    def __init__(self, context: LLMContext, registry=None, transcript=None):
+        super().__init__()
+        self._context = context
+        self._registry = registry
+        self._transcript = transcript  # TranscriptWriter
+        self.handled = 0
+
+    async def _call_tool(self, name: str, arguments: dict):
+        if not self._registry or name not in self._registry.enabled:
+            return None
+        results = []
+        async def result_callback(result, **kwargs):
+            results.append(result)
+        params = SimpleNamespace(function_name=name, tool_call_id=f"fast-path-{self.handled}", arguments=arguments, result_callback=result_callback)
+        await self._registry.handler(name)(params)
+        return results[0] if results else None
+
+    async def respond(self, text: str) -> Optional[str]:
+        intent = match_intent(text)
+        if not intent:
+            return None
+        name, arguments = intent
+        now = datetime.datetime.now()
+        if name == "time":
+            return f"It is {now.strftime('%I:%M %p').lstrip('0')}, Sir."
+        if name == "date":
+            return f"Today is {now.strftime('%A, %B')} {now.day}, {now.year}, Sir."
+
+        result = await self._call_tool("schedule_alarm", arguments)
+        if not isinstance(result, dict) or "error" in result or "result" not in result:
+            logging.info(f"Fast path could not schedule {arguments}: {result}")
+            return None
+        if name == "alarm":
+            return f"Alarm set for {arguments['time']}, Sir."
+        return f"{arguments['alarm_name']} set for {describe_duration(arguments)}, Sir."
+
+    async def process_frame(self, frame: Frame, direction: FrameDirection):
+        await super().process_frame(frame, direction)
+
+        if isinstance(frame, LLMContextFrame) and direction == FrameDirection.DOWNSTREAM:
+            messages = self._context.messages
+            if messages and messages[-1].get("role") == "user" and isinstance(messages[-1].get("content"), str):
+                start = time.perf_counter()
+                reply = await self.respond(WakeWordGate.utterance(messages[-1]["content"]))
+                if reply:
+                    self.handled += 1
+                    self._context.add_message({"role": "assistant", "content": reply})
+                    # Already in the context, the assistant aggregator must not add it to the next reply
+                    await self.push_frame(TTSSpeakFrame(reply, append_to_context=False), direction)
+                    print(f"Jarvis: {reply}")
+                    logging.info(f"Jarvis (fast path, {(time.perf_counter() - start) * 1000:.1f} ms): {reply}")
+                    if self._transcript:
+                        self._transcript.write("Jarvis", reply)
+                    return
+
+        await self.push_frame(frame, direction)
+
 class ConsoleLogger(FrameProcessor):
-    def __init__(self, transcript_file: str=None):
+    def __init__(self, transcript=None):
         super().__init__()
         self._started = False
         self._current_response = ""
         self._label_printed = False
-        self._transcript_file = transcript_file
+        self._transcript = transcript  # TranscriptWriter
 
     async def process_frame(self, frame: Frame, direction: FrameDirection):
         await super().process_frame(frame, direction)
@@ -91,12 +308,8 @@ class ConsoleLogger(FrameProcessor):
             if self._current_response:
                 print()
                 logging.info(f"Jarvis: {self._current_response}")
-                if self._transcript_file:
-                    try:
-                        with open(self._transcript_file, "a", encoding="utf-8") as f:
-                            f.write(f"Jarvis: {self._current_response}\n")
-                    except Exception as e:
-                        logging.error(f"Failed to log to transcript: {e}")
+                if self._transcript:
+                    self._transcript.write("Jarvis", self._current_response)
                 self._current_response = ""
             self._started = False
             self._label_printed = False
@@ -115,32 +328,292 @@ class HardcodedInputInjector(FrameProcessor):
             await self.push_frame(TranscriptionFrame(text=self._text, user_id="user", timestamp=0), direction)
 
 class MessageInjector(FrameProcessor):
-    def __init__(self, context: LLMContext):
+    """Sends scheduled prompts to the LLM as user turns as soon as they are due.
+
+    A consumer task started with the pipeline waits on the queue, so a prompt does not
+    sit there until some other frame passes. Prompts scheduled within ``coalesce_secs``
+    of each other, or while the bot or the user is speaking, become one turn that is sent
+    once both are quiet. Sits after the wake word gate, which would drop the prompt, and
+    pushes the context downstream like a spoken turn.
+    """
+    def __init__(self, context: LLMContext, coalesce_secs: float=0.2):
         super().__init__()
         self._context = context
+        self._coalesce_secs = coalesce_secs
         self._queue = asyncio.Queue()
+        self._speaking = set()  # "bot" and "user" while they are speaking
+        self._quiet = asyncio.Event()
+        self._quiet.set()
+        self._consumer: Optional[asyncio.Task] = None
+        self.latencies = deque(maxlen=100)  # Seconds from schedule to injection
 
     def schedule(self, text: str):
-        self._queue.put_nowait(text)
+        self._queue.put_nowait((time.monotonic(), text))
+
+    def _set_speaking(self, who: str, speaking: bool):
+        if speaking:
+            self._speaking.add(who)
+            self._quiet.clear()
+        else:
+            self._speaking.discard(who)
+            if not self._speaking:
+                self._quiet.set()
+
+    async def _consume(self):
+        while True:
+            pending = [await self._queue.get()]
+            await asyncio.sleep(self._coalesce_secs)
+            await self._quiet.wait()
+            while not self._queue.empty():
+                pending.append(self._queue.get_nowait())
+            try:
+                await self._inject(pending)
+            except Exception as e:
+                logging.error(f"Error injecting message: {e}")
+
+    async def _inject(self, pending: List[tuple]):
+        text = "\n".join(text for _, text in pending)
+        begin_turn()
+        now = time.monotonic()
+        self.latencies.extend(now - scheduled for scheduled, _ in pending)
+        logging.info(f"Injecting {len(pending)} scheduled message(s), {(now - pending[0][0]) * 1000:.0f} ms after scheduling: {text}")
+        print(f"User (Scheduled): {text}")
+
+        self._context.add_message({"role": "user", "content": text})
+        await self.push_frame(LLMContextFrame(context=self._context), FrameDirection.DOWNSTREAM)
 
     async def process_frame(self, frame: Frame, direction: FrameDirection):
         await super().process_frame(frame, direction)
-        
-        # Check if we have any pending messages to inject
-        try:
-            while not self._queue.empty():
-                text = self._queue.get_nowait()
-                logging.info(f"Injecting scheduled message: {text}")
-                print(f"User (Scheduled): {text}")
-                
-                # Create a user message
-                user_message = {"role": "user", "content": text}
-                self._context.messages.append(user_message)
-                
-                # Push LLMMessagesAppendFrame to trigger the LLM
-                await self.push_frame(LLMMessagesAppendFrame(messages=[user_message]), direction)
-        except Exception as e:
-            logging.error(f"Error injecting message: {e}")
-
-        # Pass the original frame through
+
+        if isinstance(frame, StartFrame) and not self._consumer:
+            self._consumer = asyncio.create_task(self._consume())
+        elif isinstance(frame, (EndFrame, CancelFrame)) and self._consumer:
+            self._consumer.cancel()
+            self._consumer = None
+        elif isinstance(frame, BotStartedSpeakingFrame):
+            self._set_speaking("bot", True)
+        elif isinstance(frame, BotStoppedSpeakingFrame):
+            self._set_speaking("bot", False)
+        elif isinstance(frame, UserStartedSpeakingFrame):
+            self._set_speaking("user", True)
+        elif isinstance(frame, UserStoppedSpeakingFrame):
+            self._set_speaking("user", False)
+
+        await self.push_frame(frame, direction)
+
+class SentenceChunker(FrameProcessor):
+    """Splits streamed LLM text into sentence or clause segments for the TTS.
+
+    Each segment is pushed as an AggregatedTextFrame, which the TTS synthesizes as is,
+    and upcoming segments are prefetched so sentence N+1 is synthesized while N plays.
+    The TTS still handles frames in order, so audio is emitted in order.
+    """
+    _SENTENCE_END = re.compile(r"[.!?]+[\"')\]]*\s+")
+    _CLAUSE_END = re.compile(r"[,;:]\s+|\s+(?:-{1,2}|—)\s+")
+
+    def __init__(self, tts=None, min_length: int=20, clause_min_length: int=60, lookahead_depth: int=2):
+        super().__init__()
+        self._tts = tts
+        self._min_length = min_length
+        self._clause_min_length = clause_min_length
+        self._lookahead_depth = lookahead_depth
+        self._buffer = ""
+
+    def _pop_segment(self) -> str:
+        """Returns the next complete segment from the buffer, or an empty string."""
+        boundaries = [(m.end(), self._min_length) for m in self._SENTENCE_END.finditer(self._buffer)]
+        boundaries += [(m.end(), self._clause_min_length) for m in self._CLAUSE_END.finditer(self._buffer)]
+        for end, min_length in sorted(boundaries):
+            if len(self._buffer[:end].strip()) >= min_length:
+                segment = self._buffer[:end].strip()
+                self._buffer = self._buffer[end:]
+                return segment
+        return ""
+
+    async def _push_segment(self, segment: str, direction: FrameDirection):
+        if self._tts and self._lookahead_depth > 0:
+            self._tts.prefetch(segment, max_pending=self._lookahead_depth)
+        await self.push_frame(AggregatedTextFrame(text=segment, aggregated_by=AggregationType.SENTENCE), direction)
+
+    async def process_frame(self, frame: Frame, direction: FrameDirection):
+        await super().process_frame(frame, direction)
+
+        if isinstance(frame, TextFrame) and not isinstance(frame, (TranscriptionFrame, AggregatedTextFrame)) and not getattr(frame, "skip_tts", False):
+            self._buffer += frame.text
+            while segment := self._pop_segment():
+                await self._push_segment(segment, direction)
+            return
+
+        if isinstance(frame, LLMFullResponseEndFrame):
+            segment = self._buffer.strip()
+            self._buffer = ""
+            if segment:
+                await self._push_segment(segment, direction)
+        elif isinstance(frame, InterruptionFrame):
+            self._buffer = ""
+            if self._tts:
+                self._tts.cancel_prefetch()
+
+        await self.push_frame(frame, direction)
+
+class ContextGovernor(FrameProcessor):
+    """Keeps the LLM prompt bounded before every LLM run.
+
+    The system prompt and the last ``keep_turns`` user turns stay verbatim. Large tool
+    results in older turns are replaced with stubs, and when the estimated prompt is
+    over ``max_tokens`` the oldest turns are folded into a rolling summary message that
+    is condensed in the background by ``summarize``. Condensing runs on the chat model, so
+    it waits until the bot has finished speaking the turn that was just sent, for at most
+    ``idle_timeout`` seconds, instead of queueing in front of it.
+    """
+    SUMMARY_PREFIX = "CONVERSATION SUMMARY (older turns):"
+
+    def __init__(self, context: LLMContext, max_tokens: int=8192, keep_turns: int=6, tool_stub_chars: int=600, summary_max_chars: int=4000, summarize: Optional[Callable[[str], Awaitable[str]]]=None, idle_timeout: float=60):
+        super().__init__()
+        self._context = context
+        self._max_tokens = max_tokens
+        self._keep_turns = keep_turns
+        self._tool_stub_chars = tool_stub_chars
+        self._summary_max_chars = summary_max_chars
+        self._summarize = summarize
+        self._summary = ""
+        self._summary_dirty = False
+        self._summary_task: Optional[asyncio.Task] = None
+        self._idle_timeout = idle_timeout
+        self._llm_idle = asyncio.Event()  # Cleared when a turn is sent, set once the bot stopped speaking
+        self._llm_idle.set()
+        self.last_prompt_tokens = 0
+
+    def _is_summary(self, message: dict) -> bool:
+        return message.get("role") == "system" and str(message.get("content", "")).startswith(self.SUMMARY_PREFIX)
+
+    def _stub(self, message: dict) -> dict:
+        content = message.get("content")
+        if message.get("role") != "tool" or not isinstance(content, str) or len(content) <= self._tool_stub_chars:
+            return message
+        stub = f"[Older tool result removed to save space: {len(content)} characters, began with: {content[:120]}...]"
+        return {**message, "content": stub}
+
+    @staticmethod
+    def _describe(message: dict) -> str:
+        role = message.get("role")
+        content = message.get("content")
+        if role not in ("user", "assistant") or not isinstance(content, str) or not content.strip():
+            return ""
+        text = " ".join(content.split())
+        text = text[:200] + "..." if len(text) > 200 else text
+        return f"{'User' if role == 'user' else 'Jarvis'}: {text}"
+
+    def _summary_message(self) -> List[dict]:
+        if not self._summary:
+            return []
+        return [{"role": "system", "content": f"{self.SUMMARY_PREFIX}\n{self._summary}"}]
+
+    def compact(self):
+        messages = [m for m in self._context.messages if not self._is_summary(m)]
+        head = messages[:1] if messages and messages[0].get("role") == "system" else []
+        body = messages[len(head):]
+
+        turn_starts = [i for i, m in enumerate(body) if m.get("role") == "user"]
+        split = turn_starts[-self._keep_turns] if len(turn_starts) > self._keep_turns else 0
+        old = [self._stub(m) for m in body[:split]]
+        recent = body[split:]
+
+        # Fold whole turns, oldest first, until the prompt fits
+        fixed_tokens = sum(estimate_tokens(m) for m in head + recent)
+        folded = []
+        while old and fixed_tokens + sum(estimate_tokens(m) for m in self._summary_message() + old) > self._max_tokens:
+            end = next((i for i, m in enumerate(old) if i > 0 and m.get("role") == "user"), len(old))
+            self._fold(old[:end])
+            folded.extend(old[:end])
+            old = old[end:]
+
+        new_messages = head + self._summary_message() + old + recent
+        self.last_prompt_tokens = sum(estimate_tokens(m) for m in new_messages)
+        if len(new_messages) != len(self._context.messages) or folded:
+            logging.info(f"Context compacted: {len(self._context.messages)} -> {len(new_messages)} messages, ~{self.last_prompt_tokens} tokens ({len(folded)} messages folded)")
+        self._context.set_messages(new_messages)
+
+    def _fold(self, messages: List[dict]):
+        lines = [line for line in (self._describe(m) for m in messages) if line]
+        self._summary = "\n".join([self._summary] + lines if self._summary else lines)
+        if len(self._summary) > self._summary_max_chars:
+            self._summary = self._summary[-self._summary_max_chars:].split("\n", 1)[-1]
+
+        if self._summarize:
+            self._summary_dirty = True
+            if not self._summary_task or self._summary_task.done():
+                self._summary_task = asyncio.create_task(self._refresh_summary())
+
+    async def _refresh_summary(self):
+        while self._summary_dirty:
+            try:
+                await asyncio.wait_for(self._llm_idle.wait(), timeout=self._idle_timeout)
+            except asyncio.TimeoutError:
+                logging.warning(f"LLM still busy after {self._idle_timeout} s, summarizing anyway")
+            self._summary_dirty = False
+            snapshot = self._summary
+            try:
+                condensed = (await self._summarize(snapshot)).strip()
+            except Exception as e:
+                logging.error(f"Failed to summarize conversation: {e}")
+                return
+            # Keep anything folded in while the summary was being written
+            if condensed and self._summary.startswith(snapshot):
+                self._summary = condensed + self._summary[len(snapshot):]
+                logging.info(f"Conversation summary condensed: {len(snapshot)} -> {len(condensed)} characters")
+
+    async def process_frame(self, frame: Frame, direction: FrameDirection):
+        await super().process_frame(frame, direction)
+
+        if isinstance(frame, LLMContextFrame):
+            try:
+                self.compact()
+            except Exception as e:
+                logging.error(f"Failed to compact context: {e}")
+            if direction == FrameDirection.DOWNSTREAM:
+                self._llm_idle.clear()
+        elif isinstance(frame, BotStoppedSpeakingFrame):
+            self._llm_idle.set()
+
+        await self.push_frame(frame, direction)
+
+class ToolSelector(FrameProcessor):
+    """Swaps the context's tools for the ones the router picks for the latest user message.
+
+    Routing on the latest user message keeps the selection fixed across the tool call
+    round trips of one turn, so a tool the model called is still offered afterwards. The
+    context's tools are only replaced when the router moves off the previous selection,
+    an unchanged tools block keeps Ollama's cached prompt prefix usable.
+    """
+    def __init__(self, context: LLMContext, router: ToolRouter):
+        super().__init__()
+        self._context = context
+        self._router = router
+        self.last_selection: List[str] = []
+
+    def _latest_user_text(self) -> str:
+        for message in reversed(self._context.messages):
+            if message.get("role") == "user":
+                content = message.get("content")
+                if isinstance(content, list):
+                    return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+                return str(content or "")
+        return ""
+
+    def select(self):
+        text = self._latest_user_text()
+        selection = self._router.select(text, current=self.last_selection)
+        if selection == self.last_selection:
+            return
+        logging.info(f"Tools for '{text[:60]}': {', '.join(selection)}")
+        self.last_selection = selection
+        self._context.set_tools(ToolsSchema(standard_tools=self._router.schemas(selection)))
+
+    async def process_frame(self, frame: Frame, direction: FrameDirection):
+        await super().process_frame(frame, direction)
+
+        if isinstance(frame, LLMContextFrame) and direction == FrameDirection.DOWNSTREAM:
+            self.select()
+
         await self.push_frame(frame, direction)
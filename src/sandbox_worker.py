@@ -0,0 +1,102 @@
+"""Runs sandboxed code in a worker process, see functions.sandbox.
+
+Started as a script in isolated mode, so a fresh worker only pays for the interpreter and
+the allowed modules. Requests and results are JSON lines over stdin and stdout.
+"""
+import io, sys, json, time, builtins
+
+try:
+    import resource  # Not available on Windows, where neither the CPU nor the memory limit applies, only the wall clock timeout
+except ImportError:
+    resource = None
+
+SAFE_MODULE_NAMES = ['math', 'random', 'datetime', 'json']
+
+SAFE_BUILTIN_NAMES = [
+    'abs', 'all', 'any', 'ascii', 'bin', 'bool', 'bytearray', 'bytes', 'callable', 'chr',
+    'complex', 'dict', 'divmod', 'enumerate', 'filter', 'float', 'format', 'frozenset',
+    'getattr', 'hasattr', 'hash', 'hex', 'id', 'int', 'isinstance', 'issubclass', 'iter',
+    'len', 'list', 'map', 'max', 'min', 'next', 'object', 'oct', 'ord', 'pow', 'print',
+    'range', 'repr', 'reversed', 'round', 'set', 'slice', 'sorted', 'str', 'sum',
+    'tuple', 'type', 'zip',
+]
+
+class CappedOutput(io.TextIOBase):
+    """Keeps the first ``limit`` characters written and counts the rest."""
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.parts = []
+        self.size = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        room = self.limit - self.size
+        if room > 0:
+            self.parts.append(text[:room])
+        self.size += len(text)
+        return len(text)
+
+    def getvalue(self) -> str:
+        output = "".join(self.parts)
+        if self.size > self.limit:
+            output += f"\n[Output truncated, {self.size - self.limit} more characters]"
+        return output
+
+def execute(code: str, modules: dict, output_limit: int) -> tuple:
+    """Runs ``code`` with restricted builtins and imports, returns ``(output, error)``."""
+    def safe_import(name, globals=None, locals=None, fromlist=(), level=0):
+        if name in modules:
+            return modules[name]
+        raise ImportError(f"Import of '{name}' is not allowed")
+
+    safe_builtins = {name: getattr(builtins, name) for name in SAFE_BUILTIN_NAMES}
+    safe_builtins['__import__'] = safe_import
+
+    output = CappedOutput(output_limit)
+    stdout, stderr = sys.stdout, sys.stderr
+    sys.stdout = sys.stderr = output
+    try:
+        exec(code, {'__builtins__': safe_builtins})
+        return output.getvalue(), None
+    except MemoryError:
+        return output.getvalue(), "Code exceeded the memory limit"
+    except Exception as e:
+        return output.getvalue(), str(e) or type(e).__name__
+    finally:
+        sys.stdout, sys.stderr = stdout, stderr
+
+def _cpu_seconds() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+def serve(memory_limit: int):
+    """Answers ``{code, cpu_seconds, output_limit}`` requests until stdin closes.
+
+    The address space limit holds for the worker's life. The CPU limit is a soft limit
+    moved to the CPU time used so far plus ``cpu_seconds`` before every run, so the kernel
+    stops a runaway worker with SIGXCPU.
+    """
+    requests, results = sys.stdin.buffer, sys.stdout.buffer
+    def send(message: dict):
+        results.write(json.dumps(message).encode() + b"\n")
+        results.flush()
+
+    modules = {name: __import__(name) for name in SAFE_MODULE_NAMES}
+    if resource and memory_limit:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+    send({"ready": True})
+    for line in requests:
+        request = json.loads(line)
+        code, cpu_seconds, output_limit = request["code"], request["cpu_seconds"], request["output_limit"]
+        if resource and cpu_seconds:
+            _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+            soft = int(_cpu_seconds() + cpu_seconds) + 1
+            resource.setrlimit(resource.RLIMIT_CPU, (soft if hard == resource.RLIM_INFINITY else min(soft, hard), hard))
+        start = time.perf_counter()
+        output, error = execute(code, modules, output_limit)
+        send({"output": output, "error": error, "elapsed": time.perf_counter() - start})
+
+if __name__ == "__main__":
+    serve(int(sys.argv[1]))
@@ -0,0 +1,33 @@
+from typing import Any, Awaitable, Callable, Dict
+import asyncio, logging, time
+
+class StartupTimer:
+    """Runs blocking startup steps in worker threads and records how long each took."""
+    def __init__(self):
+        self._start = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+
+    async def run(self, name: str, func: Callable[..., Any], *args, **kwargs) -> Any:
+        start = time.perf_counter()
+        try:
+            return await asyncio.to_thread(func, *args, **kwargs)
+        finally:
+            self.stages[name] = time.perf_counter() - start
+            logging.info(f"Startup stage '{name}' took {self.stages[name]:.2f} s")
+
+    async def track(self, name: str, awaitable: Awaitable[Any]) -> Any:
+        start = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            self.stages[name] = time.perf_counter() - start
+            logging.info(f"Startup stage '{name}' took {self.stages[name]:.2f} s")
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._start
+
+    def report(self, label: str):
+        breakdown = ", ".join(f"{name} {seconds:.2f} s" for name, seconds in sorted(self.stages.items(), key=lambda s: -s[1]))
+        message = f"{label} after {self.elapsed():.2f} s (stages: {breakdown}; serial sum {sum(self.stages.values()):.2f} s)"
+        print(message)
+        logging.info(message)
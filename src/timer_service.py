@@ -0,0 +1,196 @@
+from typing import Awaitable, Callable, Dict, List, Optional
+import asyncio, heapq, json, logging, os, time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TIMER_JOURNAL = os.path.join(BASE_DIR, "tools", "timers.jsonl")
+# The driver wakes at least this often, so wall clock jumps and sleeps are noticed, in seconds
+MAX_SLEEP = 60
+# The journal is rewritten with only pending timers once it holds this many more records
+COMPACT_AFTER = 1000
+
+class Timer:
+    def __init__(self, timer_id: int, due: float, kind: str, payload: dict):
+        self.id = timer_id
+        self.due = due  # Wall clock, so timers survive a restart
+        self.kind = kind
+        self.payload = payload
+
+    def to_record(self) -> dict:
+        return {"op": "add", "id": self.id, "due": self.due, "kind": self.kind, "payload": self.payload}
+
+TimerHandler = Callable[[Timer, float], Awaitable[None]]
+
+class TimerService:
+    """Every timer of the assistant on one min-heap, driven by a single task.
+
+    Modules ``register`` a handler per timer kind and ``schedule`` timers with a JSON
+    payload. Scheduling and cancelling append to a journal, which ``start`` replays to
+    restore pending timers after a restart. A timer whose due time passed while the
+    assistant was down fires late unless it is later than its kind's ``missed_grace``,
+    handlers get the timer and how late it fired. Cancelled timers are dropped when they reach the top
+    of the heap, so cancel is O(1) and schedule O(log n).
+    """
+    def __init__(self, journal_path: Optional[str]=TIMER_JOURNAL):
+        self._journal_path = journal_path
+        self._journal = None
+        self._records = 0
+        self._heap: List[tuple] = []  # (due, id)
+        self._timers: Dict[int, Timer] = {}
+        self._handlers: Dict[str, tuple] = {}  # kind -> (handler, missed_grace)
+        self._unhandled: Dict[str, List[Timer]] = {}  # Due timers whose module has not registered yet
+        self._next_id = 1
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._restored = False
+
+    def register(self, kind: str, handler: TimerHandler, missed_grace: Optional[float]=None):
+        """``missed_grace`` is how late a timer of this kind may still fire, ``None`` fires it however late."""
+        self._handlers[kind] = (handler, missed_grace)
+        for timer in self._unhandled.pop(kind, []):
+            if timer.id in self._timers:
+                heapq.heappush(self._heap, (timer.due, timer.id))
+        self._wake.set()
+
+    def schedule(self, kind: str, delay: float, payload: Optional[dict]=None) -> Timer:
+        self.restore()  # Ids continue from the journal even when a tool runs before start
+        timer = Timer(self._next_id, time.time() + delay, kind, payload or {})
+        self._next_id += 1
+        self._add(timer)
+        self._append(timer.to_record())
+        return timer
+
+    def cancel(self, timer_id: int) -> bool:
+        timer = self._timers.pop(timer_id, None)
+        if timer is None:
+            return False
+        self._append({"op": "cancel", "id": timer_id})
+        if len(self._heap) > 2 * len(self._timers) + 64:
+            # Mostly cancelled entries, rebuilt so the heap does not grow without bound
+            self._heap = [(t.due, t.id) for t in self._timers.values()]
+            heapq.heapify(self._heap)
+        self._wake.set()
+        return True
+
+    def list(self, kind: Optional[str]=None) -> List[Timer]:
+        return sorted((t for t in self._timers.values() if kind is None or t.kind == kind), key=lambda t: t.due)
+
+    def get(self, timer_id: int) -> Optional[Timer]:
+        return self._timers.get(timer_id)
+
+    def _add(self, timer: Timer):
+        self._timers[timer.id] = timer
+        heapq.heappush(self._heap, (timer.due, timer.id))
+        # Only an earlier first timer changes how long the driver should sleep
+        if self._heap[0][1] == timer.id:
+            self._wake.set()
+
+    def _append(self, record: dict):
+        if not self._journal_path:
+            return
+        if self._journal is None:
+            os.makedirs(os.path.dirname(self._journal_path) or ".", exist_ok=True)
+            self._journal = open(self._journal_path, "a", encoding="utf-8")
+        self._journal.write(json.dumps(record) + "\n")
+        self._journal.flush()
+        self._records += 1
+        if self._records > COMPACT_AFTER and self._records > 4 * len(self._timers):
+            self._compact()
+
+    def _compact(self):
+        self._journal.close()
+        temporary = self._journal_path + ".tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            for timer in self._timers.values():
+                f.write(json.dumps(timer.to_record()) + "\n")
+        os.replace(temporary, self._journal_path)
+        self._journal = open(self._journal_path, "a", encoding="utf-8")
+        self._records = len(self._timers)
+        logging.info(f"Compacted timer journal to {self._records} pending timers")
+
+    def restore(self):
+        """Replays the journal, pending timers are back on the heap and missed ones are due now."""
+        if self._restored or not self._journal_path or not os.path.exists(self._journal_path):
+            self._restored = True
+            return
+        pending: Dict[int, dict] = {}
+        records = 0
+        intact = 0  # Bytes up to the end of the last complete record
+        with open(self._journal_path, "rb") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A crash mid write leaves a partial last line
+                    break
+                intact += len(line)
+                records += 1
+                self._next_id = max(self._next_id, record["id"] + 1)
+                if record["op"] == "add":
+                    pending[record["id"]] = record
+                else:
+                    pending.pop(record["id"], None)
+        if intact < os.path.getsize(self._journal_path):
+            # Cut the partial line off, or the next record would be appended to it
+            os.truncate(self._journal_path, intact)
+        for record in pending.values():
+            self._add(Timer(record["id"], record["due"], record["kind"], record["payload"]))
+        self._records = records
+        self._restored = True
+        logging.info(f"Restored {len(pending)} pending timers from {self._journal_path}")
+
+    def start(self) -> asyncio.Task:
+        self.restore()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        return self._task
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        if self._journal:
+            self._journal.close()
+            self._journal = None
+
+    async def _run(self):
+        while True:
+            self._wake.clear()
+            now = time.time()
+            while self._heap and self._heap[0][0] <= now:
+                _, timer_id = heapq.heappop(self._heap)
+                timer = self._timers.get(timer_id)
+                if timer is None:
+                    continue  # Cancelled
+                if timer.kind not in self._handlers:
+                    # Its module is not loaded yet, back on the heap when a handler is registered
+                    self._unhandled.setdefault(timer.kind, []).append(timer)
+                    continue
+                self._fire(timer, now)
+            delay = min(self._heap[0][0] - now, MAX_SLEEP) if self._heap else MAX_SLEEP
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def _fire(self, timer: Timer, now: float):
+        del self._timers[timer.id]
+        handler, missed_grace = self._handlers[timer.kind]
+        late = max(now - timer.due, 0.0)
+        if missed_grace is not None and late > missed_grace:
+            logging.warning(f"Skipping {timer.kind} timer {timer.id}, missed by {late:.0f} s")
+            self._append({"op": "skip", "id": timer.id})
+            return
+        logging.info(f"Firing {timer.kind} timer {timer.id}" + (f", {late:.1f} s late" if late >= 1 else ""))
+
+        async def fire():
+            try:
+                await handler(timer, late)
+            except Exception as e:
+                logging.error(f"{timer.kind} timer {timer.id} failed: {e}")
+            finally:
+                # Recorded once handled, a crash while firing fires it again on restart
+                self._append({"op": "done", "id": timer.id})
+        asyncio.create_task(fire())
+
+# Shared by alarm, scheduler and website_blocker, started by main once the pipeline runs
+TIMERS = TimerService()
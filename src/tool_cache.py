@@ -0,0 +1,112 @@
+from collections import Counter, OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+import asyncio, time
+
+class ToolCache:
+    """TTL and LRU bounded cache for tool results, shared by the handlers in ``src/functions``.
+
+    Results are keyed by tool name, a request key and an optional ``span`` such as a day
+    range or an email limit. A cached or in-flight result with a wider span answers a
+    narrower request through the caller's ``narrow`` function, and identical concurrent
+    requests share one fetch. Failed fetches are never cached.
+    """
+    def __init__(self, max_entries: int=256):
+        self._max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, Tuple[float, Any]]" = OrderedDict()  # (tool, key, span) -> (expires, value)
+        self._inflight: Dict[Tuple, asyncio.Task] = {}
+        self.stats: Dict[str, Counter] = {}
+        self.evictions = 0
+
+    def _count(self, tool: str, event: str):
+        self.stats.setdefault(tool, Counter())[event] += 1
+
+    def _covering(self, table, tool: str, key: Hashable, span: Optional[int]):
+        """Smallest entry in ``table`` for the same request whose span covers ``span``."""
+        best = None
+        for entry in table:
+            if entry[0] != tool or entry[1] != key:
+                continue
+            if span is None or entry[2] is None:
+                if entry[2] == span:
+                    return entry
+            elif entry[2] >= span and (best is None or entry[2] < best[2]):
+                best = entry
+        return best
+
+    def _lookup(self, tool: str, key: Hashable, span: Optional[int]):
+        now = time.monotonic()
+        for entry in [e for e, (expires, _) in self._entries.items() if expires <= now]:
+            del self._entries[entry]
+        entry = self._covering(self._entries, tool, key, span)
+        if entry is None:
+            return None
+        self._entries.move_to_end(entry)
+        return entry
+
+    async def fetch(self, tool: str, key: Hashable, loader: Callable[[], Awaitable[Any]], *, ttl: Optional[float], span: Optional[int]=None, narrow: Optional[Callable[[Any, int], Any]]=None) -> Any:
+        """Returns the result for ``(tool, key, span)``, calling ``loader`` only when nothing covers it.
+
+        ``narrow(value, span)`` cuts a result fetched for a wider span down to ``span``,
+        without it only exact spans are reused. A ``ttl`` of None, a tool declared without a
+        ``cache_ttl``, always calls ``loader``.
+        """
+        if ttl is None:
+            return await loader()
+
+        def covers(entry) -> bool:
+            return entry is not None and (entry[2] == span or narrow is not None)
+
+        entry = self._lookup(tool, key, span)
+        if covers(entry):
+            self._count(tool, "hits" if entry[2] == span else "narrowed")
+            value = self._entries[entry][1]
+            return value if entry[2] == span else narrow(value, span)
+
+        entry = self._covering(self._inflight, tool, key, span)
+        if covers(entry):
+            self._count(tool, "joined")
+            value = await asyncio.shield(self._inflight[entry])
+            return value if entry[2] == span else narrow(value, span)
+
+        self._count(tool, "misses")
+        entry = (tool, key, span)
+        task = asyncio.ensure_future(loader())
+        self._inflight[entry] = task
+        try:
+            # Shielded so a cancelled caller does not cancel the fetch others may be waiting on
+            value = await asyncio.shield(task)
+        finally:
+            if task.done() and self._inflight.get(entry) is task:
+                del self._inflight[entry]
+            elif not task.done():
+                task.add_done_callback(lambda t: self._finish(entry, t, ttl))
+        self._store(entry, value, ttl)
+        return value
+
+    def _finish(self, entry: Tuple, task: asyncio.Task, ttl: float):
+        if self._inflight.get(entry) is task:
+            del self._inflight[entry]
+        if not task.cancelled() and task.exception() is None:
+            self._store(entry, task.result(), ttl)
+
+    def _store(self, entry: Tuple, value: Any, ttl: float):
+        self._entries[entry] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(entry)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, tool: Optional[str]=None):
+        for entry in [e for e in self._entries if tool is None or e[0] == tool]:
+            del self._entries[entry]
+
+    def summary(self) -> str:
+        parts = []
+        for tool, counts in sorted(self.stats.items()):
+            served = counts["hits"] + counts["narrowed"] + counts["joined"]
+            total = served + counts["misses"]
+            parts.append(f"{tool} {served}/{total} served from cache ({counts['hits']} hits, {counts['narrowed']} narrowed, {counts['joined']} joined)")
+        return "; ".join(parts) + f"; {len(self._entries)} entries, {self.evictions} evicted"
+
+# Shared by every tool module, MetricsLogger reports its statistics
+TOOL_CACHE = ToolCache()
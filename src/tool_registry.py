@@ -0,0 +1,150 @@
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+from types import ModuleType
+import asyncio, importlib, json, logging, time
+from pipecat.adapters.schemas.function_schema import FunctionSchema
+from pipecat.services.llm_service import FunctionCallParams
+
+class Tool:
+    """Everything the assistant needs to know about one tool, declared next to its handler.
+
+    Tool modules list these in a module level ``TOOLS``. ``timeout_secs`` bounds a single
+    call, ``cache_ttl`` is how long the handler may answer from ``TOOL_CACHE`` (None never
+    caches) and ``examples`` are sample requests the tool router indexes next to the description.
+    """
+    def __init__(self, schema: FunctionSchema, handler: Callable[[FunctionCallParams], Awaitable[None]], *, cancel_on_interruption: bool=True, timeout_secs: Optional[float]=None, cache_ttl: Optional[float]=None, examples: Optional[List[str]]=None):
+        self.schema = schema
+        self.handler = handler
+        self.cancel_on_interruption = cancel_on_interruption
+        self.timeout_secs = timeout_secs
+        self.cache_ttl = cache_ttl
+        self.examples = examples or []
+
+    @property
+    def name(self) -> str:
+        return self.schema.name
+
+class CompactFunctionSchema(FunctionSchema):
+    """A FunctionSchema that leaves out empty ``properties`` and ``required`` entries.
+
+    Tool definitions are rendered into the prompt of every request, so anything that does
+    not change the model's behaviour is prefill paid on every turn.
+    """
+    def to_default_dict(self) -> Dict[str, Any]:
+        parameters: Dict[str, Any] = {"type": "object"}
+        if self.properties:
+            parameters["properties"] = self.properties
+        if self.required:
+            parameters["required"] = self.required
+        return {"name": self.name, "description": self.description, "parameters": parameters}
+
+def compact_schema(schema: FunctionSchema) -> CompactFunctionSchema:
+    properties = {}
+    for name, spec in schema.properties.items():
+        spec = dict(spec)
+        if "description" in spec:
+            spec["description"] = " ".join(spec["description"].split())
+            if not spec["description"]:
+                del spec["description"]
+        properties[name] = spec
+    return CompactFunctionSchema(
+        name=schema.name,
+        description=" ".join(schema.description.split()),
+        properties=properties,
+        required=list(schema.required),
+    )
+
+class ToolRegistry:
+    """Imports the modules of enabled tools only, and lets them build their clients on first use.
+
+    Tool modules may define a ``warm_up()`` function that builds their clients ahead of the
+    first call, ``warm_up`` runs them in worker threads once the audio pipeline is live.
+    """
+    def __init__(self, enabled: Iterable[str], modules: Optional[Dict[str, str]]=None):
+        self._index = TOOL_MODULES if modules is None else modules
+        self.enabled = list(enabled)
+        unknown = [name for name in self.enabled if name not in self._index]
+        if unknown:
+            raise ValueError(f"Unknown tools enabled: {', '.join(unknown)}")
+        self._modules: Dict[str, ModuleType] = {}
+        self.import_times: Dict[str, float] = {}
+        self._warm_up_task = None
+
+    def _module(self, module_name: str) -> ModuleType:
+        module = self._modules.get(module_name)
+        if module is None:
+            start = time.perf_counter()
+            module = importlib.import_module(module_name)
+            self.import_times[module_name] = time.perf_counter() - start
+            logging.info(f"Imported tool module {module_name} in {self.import_times[module_name] * 1000:.1f} ms")
+            self._modules[module_name] = module
+        return module
+
+    def tool(self, name: str) -> Tool:
+        module_name = self._index[name]
+        for tool in getattr(self._module(module_name), "TOOLS", []):
+            if tool.name == name:
+                return tool
+        raise ValueError(f"{module_name} does not declare a tool named {name}")
+
+    def tools(self) -> List[Tool]:
+        return [self.tool(name) for name in self.enabled]
+
+    def schemas(self) -> List[CompactFunctionSchema]:
+        return [compact_schema(tool.schema) for tool in self.tools()]
+
+    def payload_size(self) -> int:
+        """Characters of tool definitions sent with every request."""
+        return sum(len(json.dumps(schema.to_default_dict())) for schema in self.schemas())
+
+    def handler(self, name: str):
+        tool = self.tool(name)
+        if not tool.timeout_secs:
+            return tool.handler
+
+        async def call(params: FunctionCallParams):
+            try:
+                await asyncio.wait_for(tool.handler(params), timeout=tool.timeout_secs)
+            except asyncio.TimeoutError:
+                logging.error(f"Tool {name} timed out after {tool.timeout_secs} s")
+                await params.result_callback({"error": f"{name} did not respond within {tool.timeout_secs:g} seconds."})
+        return call
+
+    def register(self, llm):
+        for tool in self.tools():
+            llm.register_function(tool.name, self.handler(tool.name), cancel_on_interruption=tool.cancel_on_interruption)
+
+    def start_warm_up(self) -> asyncio.Task:
+        self._warm_up_task = asyncio.create_task(self.warm_up())
+        return self._warm_up_task
+
+    async def warm_up(self):
+        """Builds the clients of every enabled module that has a ``warm_up`` hook."""
+        for module_name in dict.fromkeys(self._index[name] for name in self.enabled):
+            module = self._modules.get(module_name) or await asyncio.to_thread(importlib.import_module, module_name)
+            self._modules[module_name] = module
+            hook = getattr(module, "warm_up", None)
+            if not hook:
+                continue
+            start = time.perf_counter()
+            try:
+                await asyncio.to_thread(hook)
+                logging.info(f"Warmed up {module_name} in {(time.perf_counter() - start) * 1000:.1f} ms")
+            except Exception as e:
+                logging.error(f"Failed to warm up {module_name}: {e}")
+
+# Which module declares each tool, so disabled tools never have their module imported
+TOOL_MODULES = {
+    "search_internet": "functions.functions",
+    "get_resource_usage": "functions.functions",
+    "get_date_time_location": "functions.basic",
+    "run_python_code": "functions.sandbox",
+    "append_to_memory": "functions.files",
+    "manage_file_system": "functions.files",
+    "get_recent_emails": "functions.google_ops",
+    "get_calendar_events": "functions.google_ops",
+    "get_habits": "functions.supabase_ops",
+    "get_website_usage": "functions.supabase_ops",
+    "schedule_alarm": "functions.alarm",
+    "block_websites": "functions.website_blocker",
+    "schedule_prompt": "functions.scheduler",
+}
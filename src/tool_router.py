@@ -0,0 +1,85 @@
+from collections import Counter
+from typing import Dict, List, Sequence, Tuple
+import math, re
+from tool_registry import Tool, CompactFunctionSchema, compact_schema
+
+STOPWORDS = {
+    "a", "an", "and", "any", "are", "at", "be", "by", "can", "could", "do", "does", "for", "from", "get",
+    "give", "have", "how", "i", "if", "in", "is", "it", "jarvis", "just", "me", "my", "of", "on", "or",
+    "please", "s", "so", "sir", "that", "the", "this", "to", "use", "want", "was", "what", "when",
+    "where", "which", "who", "will", "with", "would", "you", "your",
+}
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    for word in re.findall(r"[a-z0-9]+", text.lower()):
+        if word in STOPWORDS:
+            continue
+        # Crude plural folding so "emails" matches "email" and "events" matches "event"
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        tokens.append(word)
+    return tokens
+
+class ToolRouter:
+    """Picks the tools worth sending with a request by BM25 ranking them against the utterance.
+
+    Each tool is indexed by its name, description, parameter descriptions and examples. The
+    ``top_k`` best matching tools are sent together with the ``fallback`` tools, which stay
+    available so the model always has a generic way out when the ranking misses.
+
+    A selection already sent is kept while it offers every tool scoring at least
+    ``switch_share`` of the best match, so the tools block, and with it the prompt prefix
+    Ollama has cached, only changes when the ranking moves enough to matter.
+    """
+    def __init__(self, tools: Sequence[Tool], top_k: int=3, fallback: Sequence[str]=("search_internet",), switch_share: float=0.5, k1: float=1.2, b: float=0.75):
+        self._tools = list(tools)
+        self.top_k = top_k
+        self.switch_share = switch_share
+        self.fallback = [name for name in fallback if any(tool.name == name for tool in self._tools)]
+        self._k1 = k1
+        self._b = b
+        self._schemas: Dict[str, CompactFunctionSchema] = {tool.name: compact_schema(tool.schema) for tool in self._tools}
+
+        self._documents: List[Counter] = []
+        for tool in self._tools:
+            parts = [tool.name.replace("_", " "), tool.schema.description]
+            parts.extend(str(spec.get("description", "")) for spec in tool.schema.properties.values())
+            parts.extend(tool.examples)
+            self._documents.append(Counter(tokenize(" ".join(parts))))
+        self._average_length = sum(sum(d.values()) for d in self._documents) / max(1, len(self._documents))
+        frequency = Counter(term for document in self._documents for term in document)
+        count = len(self._documents)
+        self._idf = {term: math.log(1 + (count - n + 0.5) / (n + 0.5)) for term, n in frequency.items()}
+
+    def rank(self, text: str) -> List[Tuple[str, float]]:
+        """Tools with a non zero score, best first."""
+        terms = tokenize(text)
+        scores = []
+        for tool, document in zip(self._tools, self._documents):
+            length = sum(document.values())
+            score = 0.0
+            for term in terms:
+                tf = document.get(term, 0)
+                if tf:
+                    score += self._idf[term] * tf * (self._k1 + 1) / (tf + self._k1 * (1 - self._b + self._b * length / self._average_length))
+            if score > 0:
+                scores.append((tool.name, score))
+        return sorted(scores, key=lambda s: -s[1])
+
+    def select(self, text: str, current: Sequence[str]=()) -> List[str]:
+        """Names of the tools to send, in declaration order so the rendered prompt stays stable.
+
+        ``current`` is the selection sent with the previous request, returned unchanged
+        when it still covers every strong match, including when nothing matched at all.
+        """
+        ranked = self.rank(text)[: self.top_k]
+        if current:
+            strong = [name for name, score in ranked if score >= ranked[0][1] * self.switch_share]
+            if all(name in current for name in strong):
+                return list(current)
+        chosen = {name for name, _ in ranked} | set(self.fallback)
+        return [tool.name for tool in self._tools if tool.name in chosen]
+
+    def schemas(self, names: Sequence[str]) -> List[CompactFunctionSchema]:
+        return [self._schemas[name] for name in names]
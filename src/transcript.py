@@ -0,0 +1,125 @@
+from typing import Callable, List, Optional, Tuple
+import asyncio, datetime, gzip, logging, os, shutil, time
+
+HISTORY_DIR = ".history"
+TRANSCRIPT_FLUSH_INTERVAL = 2  # Seconds a written line may sit in the file buffer
+TRANSCRIPT_MAX_BYTES = 1024 * 1024  # Size a session file may reach before a new one is started, None disables
+
+class TranscriptWriter:
+    """The single sink for the conversation transcript.
+
+    Processors call ``write`` from the event loop, which only queues the line. A
+    background task hands queued lines to a thread that writes them to one buffered file
+    under ``.history/Week_N/Day``, flushing at most every ``flush_interval`` seconds and
+    at ``close``. A new session file is started on a new day or once ``max_bytes`` is
+    reached, and closed files are gzipped when ``compress`` is set.
+    """
+    def __init__(self, base_dir: str=HISTORY_DIR, flush_interval: float=TRANSCRIPT_FLUSH_INTERVAL, max_bytes: Optional[int]=TRANSCRIPT_MAX_BYTES, rotate_daily: bool=True, compress: bool=False, clock: Callable[[], datetime.datetime]=datetime.datetime.now):
+        self.base_dir = base_dir
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.rotate_daily = rotate_daily
+        self.compress = compress
+        self._clock = clock
+        self._queue: "asyncio.Queue[Optional[Tuple[datetime.datetime, str]]]" = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+        self._file = None
+        self._opened: Optional[datetime.datetime] = None
+        self._size = 0
+        self._last_flush = time.monotonic()
+        self.path: Optional[str] = None
+        self.closed_paths: List[str] = []
+
+    def session_path(self, when: datetime.datetime) -> str:
+        directory = os.path.join(self.base_dir, f"Week_{when.isocalendar()[1]}", when.strftime("%A"))
+        path = os.path.join(directory, when.strftime("%Y-%m-%d_%H-%M-%S.txt"))
+        n = 1
+        while os.path.exists(path) or os.path.exists(path + ".gz"):
+            # A size rotation within the same second
+            path = os.path.join(directory, when.strftime("%Y-%m-%d_%H-%M-%S") + f"_{n}.txt")
+            n += 1
+        return path
+
+    def write(self, speaker: str, text: str):
+        """Queues a transcript line, never blocks."""
+        self._queue.put_nowait((self._clock(), f"{speaker}: {text}\n"))
+
+    def start(self) -> asyncio.Task:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        return self._task
+
+    async def close(self):
+        """Writes everything still queued, flushes and closes the session file."""
+        if self._task:
+            self._queue.put_nowait(None)
+            await self._task
+            self._task = None
+        else:
+            await asyncio.to_thread(self._write, self._drain([]))
+        await asyncio.to_thread(self._close_file)
+
+    def _drain(self, batch: list) -> list:
+        while not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _run(self):
+        while True:
+            try:
+                entry = await asyncio.wait_for(self._queue.get(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                await asyncio.to_thread(self._flush)
+                continue
+            batch = self._drain([entry])
+            done = None in batch
+            try:
+                await asyncio.to_thread(self._write, [e for e in batch if e is not None])
+            except Exception as e:
+                logging.error(f"Failed to log to transcript: {e}")
+            if done:
+                return
+
+    # Everything below runs in a worker thread, one batch at a time
+
+    def _write(self, batch: list):
+        for when, line in batch:
+            if self._file is None or self._should_rotate(when):
+                self._rotate(when)
+            data = line.encode("utf-8")
+            self._file.write(data)
+            self._size += len(data)
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self._flush()
+
+    def _should_rotate(self, when: datetime.datetime) -> bool:
+        if self.rotate_daily and when.date() != self._opened.date():
+            return True
+        return bool(self.max_bytes) and self._size >= self.max_bytes
+
+    def _rotate(self, when: datetime.datetime):
+        self._close_file()
+        self.path = self.session_path(when)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._file = open(self.path, "ab")
+        self._opened = when
+        self._size = 0
+        logging.info(f"Logging conversation to {self.path}")
+
+    def _flush(self):
+        if self._file:
+            self._file.flush()
+        self._last_flush = time.monotonic()
+
+    def _close_file(self):
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        path = self.path
+        if self.compress:
+            with open(path, "rb") as source, gzip.open(path + ".gz", "wb") as target:
+                shutil.copyfileobj(source, target)
+            os.remove(path)
+            path += ".gz"
+        self.closed_paths.append(path)
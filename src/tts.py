@@ -1,39 +1,513 @@
-from typing import AsyncGenerator
-from pipecat.frames.frames import Frame, TTSAudioRawFrame, TTSStartedFrame, TTSStoppedFrame
+from typing import AsyncGenerator, Dict, List, Optional, Tuple
+from pipecat.frames.frames import Frame, StartFrame, EndFrame, CancelFrame, TTSAudioRawFrame, TTSStartedFrame, TTSStoppedFrame
 from pipecat.services.tts_service import TTSService
-import sys, subprocess, asyncio
+from tts_cache import TTSCache, normalize_text
+from dsp import OutputDSP
+import asyncio, logging, os, shutil, tempfile, time, wave, json, functools
 import numpy as np
 
-class LocalPiperTTSService(TTSService):
-    def __init__(self, *, piper_path: str, voice_path: str, device: str="cpu", sample_rate: int=22050, volume: float=1.0, **kwargs):
-        super().__init__(sample_rate=sample_rate, **kwargs)
+class PiperWorker:
+    """A long-lived piper process that keeps the voice model loaded between requests.
+
+    Piper runs in output directory mode: every line written to stdin is synthesized
+    into its own WAV file and the path of that file is printed on stdout once it is
+    complete, so one stdout line frames one request.
+    """
+    def __init__(self, cmd: List[str], worker_id: int=0):
+        self._cmd = cmd
+        self.worker_id = worker_id
+        self._process: Optional[asyncio.subprocess.Process] = None
+        self.pending = False  # A request was written and its reply not read yet
+
+    @property
+    def alive(self) -> bool:
+        return self._process is not None and self._process.returncode is None
+
+    async def start(self):
+        self._process = await asyncio.create_subprocess_exec(*self._cmd, stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL)
+        logging.info(f"Piper worker {self.worker_id} started (pid {self._process.pid})")
+
+    async def synthesize(self, text: str) -> bytes:
+        # Piper reads one utterance per line
+        line = " ".join(text.split())
+        self.pending = True
+        self._process.stdin.write(f"{line}\n".encode("utf-8"))
+        await self._process.stdin.drain()
+
+        path = (await self._process.stdout.readline()).decode("utf-8").strip()
+        self.pending = False
+        if not path:
+            raise RuntimeError(f"Piper worker {self.worker_id} exited with code {self._process.returncode}")
+
+        return await asyncio.to_thread(_read_wav_pcm, path)
+
+    def abandon(self):
+        """Kills the process without waiting for it, the next request starts a fresh one."""
+        process, self._process = self._process, None
+        self.pending = False
+        if process is not None and process.returncode is None:
+            process.kill()
+            asyncio.ensure_future(process.wait())
+        logging.info(f"Piper worker {self.worker_id} abandoned mid request")
+
+    async def stop(self):
+        if not self.alive:
+            return
+        try:
+            self._process.stdin.close()
+            await asyncio.wait_for(self._process.wait(), timeout=2.0)
+        except (asyncio.TimeoutError, ConnectionResetError, BrokenPipeError):
+            self._process.kill()
+            await self._process.wait()
+        logging.info(f"Piper worker {self.worker_id} stopped")
+
+def _read_wav_pcm(path: str) -> bytes:
+    try:
+        with wave.open(path, "rb") as wav:
+            return wav.readframes(wav.getnframes())
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+class PiperWorkerPool:
+    def __init__(self, *, piper_path: str, voice_path: str, device: str="cpu", size: int=2):
         self._piper_path = piper_path
         self._voice_path = voice_path
         self._device = device
-        self._sample_rate = sample_rate
+        self._size = max(1, size)
+        self._output_dir = None
+        self._workers: List[PiperWorker] = []
+        self._idle: asyncio.Queue = None
+        self.requests = 0
+        self.total_latency = 0.0
+        self.last_latency = 0.0
+
+    @property
+    def started(self) -> bool:
+        return self._idle is not None
+
+    def _command(self) -> List[str]:
+        cmd = [self._piper_path, "--model", self._voice_path, "--output_dir", self._output_dir]
+        if self._device == "cuda":
+            cmd.append("--use_cuda")
+        return cmd
+
+    async def start(self):
+        if self.started:
+            return
+        self._output_dir = tempfile.mkdtemp(prefix="piper-")
+        self._idle = asyncio.Queue()
+        self._workers = [PiperWorker(self._command(), worker_id=i) for i in range(self._size)]
+        await asyncio.gather(*(w.start() for w in self._workers))
+        for worker in self._workers:
+            self._idle.put_nowait(worker)
+
+    async def synthesize(self, text: str) -> bytes:
+        if not self.started:
+            await self.start()
+
+        worker = await self._idle.get()
+        try:
+            start = time.perf_counter()
+            try:
+                if not worker.alive:
+                    await self._restart(worker)
+                audio = await worker.synthesize(text)
+            except (RuntimeError, ConnectionResetError, BrokenPipeError) as e:
+                # The worker crashed mid request, replace it and try once more
+                logging.warning(f"Piper worker {worker.worker_id} failed, restarting: {e}")
+                await self._restart(worker)
+                audio = await worker.synthesize(text)
+
+            latency = time.perf_counter() - start
+            self.requests += 1
+            self.total_latency += latency
+            self.last_latency = latency
+            logging.info(f"Piper synthesis: {latency * 1000:.0f} ms for {len(text)} characters (worker {worker.worker_id}, avg {self.total_latency / self.requests * 1000:.0f} ms)")
+            return audio
+        finally:
+            if worker.pending:
+                # Cancelled or failed while piper was still working, its reply would answer the next request
+                worker.abandon()
+            self._idle.put_nowait(worker)
+
+    async def stream(self, text: str) -> AsyncGenerator[bytes, None]:
+        yield await self.synthesize(text)
+
+    async def _restart(self, worker: PiperWorker):
+        await worker.stop()
+        await worker.start()
+
+    async def stop(self):
+        if not self.started:
+            return
+        await asyncio.gather(*(w.stop() for w in self._workers), return_exceptions=True)
+        self._workers = []
+        self._idle = None
+        shutil.rmtree(self._output_dir, ignore_errors=True)
+
+class PiperStreamer:
+    """Streams raw PCM from piper while it is still synthesizing.
+
+    Each utterance gets its own ``--output_raw`` process so end of stdout frames the
+    request. A spare process is spawned ahead of time so the voice is already loaded
+    when the next utterance arrives, but back to back utterances and prefetches use it
+    up and then wait for a voice load. ``PiperWorkerPool`` keeps its processes and is
+    the default, this trades that for audio starting before the sentence is synthesized.
+    """
+    def __init__(self, *, piper_path: str, voice_path: str, device: str="cpu", read_size: int=4096):
+        self._cmd = [piper_path, "--model", voice_path, "--output_raw"]
+        if device == "cuda":
+            self._cmd.append("--use_cuda")
+        self._read_size = read_size
+        self._spare: Optional[asyncio.Task] = None
+
+    def _spawn(self) -> asyncio.Task:
+        return asyncio.create_task(asyncio.create_subprocess_exec(*self._cmd, stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL))
+
+    async def start(self):
+        if self._spare is None:
+            self._spare = self._spawn()
+
+    async def stream(self, text: str) -> AsyncGenerator[bytes, None]:
+        await self.start()
+        # Swap before awaiting so concurrent utterances never share a process
+        spare, self._spare = self._spare, self._spawn()
+        process = await spare
+
+        finished = False
+        try:
+            process.stdin.write(" ".join(text.split()).encode("utf-8"))
+            await process.stdin.drain()
+            process.stdin.close()
+
+            while True:
+                data = await process.stdout.read(self._read_size)
+                if not data:
+                    break
+                yield data
+            finished = True
+        finally:
+            # Interrupted mid utterance, no reason to let piper finish
+            if not finished and process.returncode is None:
+                try:
+                    process.kill()
+                except ProcessLookupError:
+                    pass
+            await process.wait()
+
+    async def stop(self):
+        if self._spare is None:
+            return
+        spare, self._spare = self._spare, None
+        try:
+            process = await spare
+        except Exception:
+            return
+        if process.returncode is None:
+            process.kill()
+        await process.wait()
+
+class OnnxPiperVoice:
+    """A piper voice run in-process with onnxruntime on the CPU.
+
+    Text is phonemized with espeak-ng once per utterance (and cached), then each
+    sentence is synthesized separately so audio can be streamed sentence by sentence.
+    """
+    def __init__(self, *, voice_path: str, espeak_data_path: Optional[str]=None, intra_op_threads: int=1, inter_op_threads: int=1, phoneme_cache_size: int=256):
+        self._voice_path = voice_path
+        self._espeak_data_path = espeak_data_path
+        self._intra_op_threads = intra_op_threads
+        self._inter_op_threads = inter_op_threads
+        self._session = None
+
+        with open(f"{voice_path}.json", "r", encoding="utf-8") as f:
+            self.config = json.load(f)
+        self.sample_rate = self.config["audio"]["sample_rate"]
+        self.phoneme_ids = functools.lru_cache(maxsize=phoneme_cache_size)(self._phoneme_ids)
+
+    def load(self):
+        if self._session is not None:
+            return
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = self._intra_op_threads
+        options.inter_op_num_threads = self._inter_op_threads
+        start = time.perf_counter()
+        self._session = onnxruntime.InferenceSession(self._voice_path, sess_options=options, providers=["CPUExecutionProvider"])
+        logging.info(f"Loaded ONNX voice {self._voice_path} in {(time.perf_counter() - start) * 1000:.0f} ms (intra_op={self._intra_op_threads}, inter_op={self._inter_op_threads})")
+
+    def _phoneme_ids(self, text: str) -> Tuple[Tuple[int, ...], ...]:
+        id_map = self.config["phoneme_id_map"]
+        sentences = []
+        for phonemes in _phonemize_espeak(text, self.config["espeak"]["voice"], self._espeak_data_path):
+            ids = list(id_map["^"])
+            for phoneme in phonemes:
+                if phoneme in id_map:
+                    ids.extend(id_map[phoneme])
+                    ids.extend(id_map["_"])
+            ids.extend(id_map["$"])
+            sentences.append(tuple(ids))
+        return tuple(sentences)
+
+    def infer(self, ids: Tuple[int, ...]) -> bytes:
+        inference = self.config.get("inference", {})
+        args = {
+            "input": np.array([ids], dtype=np.int64),
+            "input_lengths": np.array([len(ids)], dtype=np.int64),
+            "scales": np.array([inference.get("noise_scale", 0.667), inference.get("length_scale", 1.0), inference.get("noise_w", 0.8)], dtype=np.float32),
+        }
+        if self.config.get("num_speakers", 1) > 1:
+            args["sid"] = np.array([0], dtype=np.int64)
+
+        audio = self._session.run(None, args)[0].squeeze()
+        audio = audio * (32767.0 / max(0.01, float(np.max(np.abs(audio)))))
+        return np.clip(audio, -32767, 32767).astype(np.int16).tobytes()
+
+    def warm_up(self, text: str="Warming up."):
+        self.load()
+        start = time.perf_counter()
+        for ids in self.phoneme_ids(text):
+            self.infer(ids)
+        logging.info(f"ONNX voice warm up took {(time.perf_counter() - start) * 1000:.0f} ms")
+
+def _phonemize_espeak(text: str, voice: str, data_path: Optional[str]=None) -> List[List[str]]:
+    from piper_phonemize import phonemize_espeak
+
+    if data_path:
+        return phonemize_espeak(text, voice, data_path=data_path)
+    return phonemize_espeak(text, voice)
+
+class OnnxPiperEngine:
+    def __init__(self, voice: OnnxPiperVoice, warm_up: bool=True):
+        self._voice = voice
+        self._warm_up = warm_up
+        self._loaded = False
+
+    async def start(self):
+        if self._loaded:
+            return
+        await asyncio.to_thread(self._voice.warm_up if self._warm_up else self._voice.load)
+        self._loaded = True
+
+    async def stream(self, text: str) -> AsyncGenerator[bytes, None]:
+        await self.start()
+        sentences = await asyncio.to_thread(self._voice.phoneme_ids, " ".join(text.split()))
+        for ids in sentences:
+            yield await asyncio.to_thread(self._voice.infer, ids)
+
+    async def stop(self):
+        pass
+
+class PCMTTSService(TTSService):
+    """Base for local engines that produce mono int16 PCM.
+
+    The engine exposes ``start``, ``stop`` and an async ``stream(text)`` of PCM bytes at
+    ``sample_rate``. This class handles framing, the output DSP (volume, limiting and
+    resampling to ``output_sample_rate``), the phrase cache and time to first audio reporting.
+    """
+    def __init__(self, *, engine, sample_rate: int=22050, output_sample_rate: Optional[int]=None, volume: float=1.0, soft_limit: bool=False, frame_ms: int=20, voice_path: Optional[str]=None, cache_dir: Optional[str]=None, cache_max_mb: int=200, prewarm_phrases: Optional[List[str]]=None, **kwargs):
+        output_sample_rate = output_sample_rate or sample_rate
+        super().__init__(sample_rate=output_sample_rate, **kwargs)
+        self._engine = engine
+        self._engine_sample_rate = sample_rate
+        self._sample_rate = output_sample_rate
         self._volume = max(0.0, min(1.0, volume))  # Clamp between 0-1
+        self._soft_limit = soft_limit
+        self._dsp = self._new_dsp()
+        # Whole int16 samples per fixed duration frame, before and after the DSP
+        self._frame_bytes = max(1, sample_rate * frame_ms // 1000) * 2
+        self._output_frame_bytes = max(1, output_sample_rate * frame_ms // 1000) * 2
+        self.last_first_audio_latency = None
+        self._cache = None
+        if cache_dir:
+            self._cache = TTSCache(cache_dir, voice_path=voice_path or "", sample_rate=output_sample_rate, volume=self._volume, max_bytes=cache_max_mb * 1024 * 1024)
+        self._prewarm_phrases = prewarm_phrases or []
+        self._prewarm_task: Optional[asyncio.Task] = None
+        # normalized text -> (synthesis task, queue of PCM chunks ending in None)
+        self._prefetched: Dict[str, Tuple[asyncio.Task, asyncio.Queue]] = {}
+
+    async def start(self, frame: StartFrame):
+        await super().start(frame)
+        await self._engine.start()
+        if self._cache and self._prewarm_phrases:
+            self._prewarm_task = asyncio.create_task(self.prewarm_cache(self._prewarm_phrases))
+
+    async def warm_up(self):
+        """Starts the engine ahead of the pipeline so it can overlap with other startup work."""
+        await self._engine.start()
+
+    async def stop(self, frame: EndFrame):
+        await super().stop(frame)
+        await self._stop_engine()
+
+    async def cancel(self, frame: CancelFrame):
+        await super().cancel(frame)
+        await self._stop_engine()
+
+    async def _stop_engine(self):
+        if self._prewarm_task:
+            self._prewarm_task.cancel()
+            self._prewarm_task = None
+        self.cancel_prefetch()
+        await self._engine.stop()
+
+    def prefetch(self, text: str, max_pending: int=2) -> bool:
+        """Starts synthesizing text ahead of time so run_tts can pick it up later.
+
+        Returns False if the text is cached or ``max_pending`` segments are already waiting.
+        """
+        key = normalize_text(text)
+        if not key:
+            return False
+        if key in self._prefetched:
+            return True
+        if len(self._prefetched) >= max_pending:
+            return False
+        if self._cache and self._cache.cacheable(text) and text in self._cache:
+            return False
+
+        queue = asyncio.Queue()
+        self._prefetched[key] = (asyncio.create_task(self._prefetch(text, queue)), queue)
+        return True
+
+    async def _prefetch(self, text: str, queue: asyncio.Queue):
+        try:
+            async for data in self._engine.stream(text):
+                queue.put_nowait(data)
+        except Exception as e:
+            queue.put_nowait(e)
+        finally:
+            queue.put_nowait(None)
+
+    def cancel_prefetch(self):
+        for task, _ in self._prefetched.values():
+            task.cancel()
+        self._prefetched.clear()
+
+    def _claim_prefetch(self, text: str) -> Optional[Tuple[asyncio.Task, asyncio.Queue]]:
+        """Takes the prefetch for ``text`` off the pending ones, whichever way run_tts plays it.
+
+        Segments are spoken in the order they were prefetched, so entries ahead of the
+        matching one will never be played and are cancelled, which frees their
+        ``max_pending`` slots. A text without an entry, one that was cached or turned down
+        while the lookahead was full, leaves the pending entries alone, they belong to
+        later segments.
+        """
+        key = normalize_text(text)
+        if key not in self._prefetched:
+            return None
+        while True:
+            pending, entry = next(iter(self._prefetched.items()))
+            del self._prefetched[pending]
+            if pending == key:
+                return entry
+            entry[0].cancel()
+
+    async def _stream(self, text: str, entry: Optional[Tuple[asyncio.Task, asyncio.Queue]]) -> AsyncGenerator[bytes, None]:
+        if entry is None:
+            async for data in self._engine.stream(text):
+                yield data
+            return
+
+        task, queue = entry
+        try:
+            while True:
+                data = await queue.get()
+                if data is None:
+                    break
+                if isinstance(data, Exception):
+                    raise data
+                yield data
+        finally:
+            task.cancel()
+
+    def _new_dsp(self) -> OutputDSP:
+        return OutputDSP(in_rate=self._engine_sample_rate, out_rate=self._sample_rate, gain=self._volume, soft_limit=self._soft_limit)
+
+    async def prewarm_cache(self, phrases: List[str]):
+        start = time.perf_counter()
+        added = 0
+        for phrase in phrases:
+            if not self._cache.cacheable(phrase) or phrase in self._cache:
+                continue
+            pcm = b"".join([data async for data in self._engine.stream(phrase)])
+            dsp = self._new_dsp()
+            pcm = dsp.process(pcm[: len(pcm) - len(pcm) % 2]) + dsp.flush()
+            await asyncio.to_thread(self._cache.put, phrase, pcm)
+            added += 1
+        logging.info(f"TTS cache prewarm: synthesized {added} of {len(phrases)} phrases in {time.perf_counter() - start:.2f} s")
+
+    def _report_first_audio(self, start: float, source: str):
+        self.last_first_audio_latency = time.perf_counter() - start
+        logging.info(f"TTS time to first audio byte: {self.last_first_audio_latency * 1000:.0f} ms ({source})")
 
     async def run_tts(self, text: str) -> AsyncGenerator[Frame, None]:
         yield TTSStartedFrame()
 
-        cmd = [self._piper_path, "--model", self._voice_path, "--output_raw"]
-        
-        if self._device == "cuda":
-            cmd.append("--use_cuda")
+        start = time.perf_counter()
+        entry = self._claim_prefetch(text)
+        cached = self._cache.get(text) if self._cache and self._cache.cacheable(text) else None
+        if cached is not None:
+            if entry:
+                entry[0].cancel()
+            self._report_first_audio(start, "cache")
+            await self.stop_ttfb_metrics()
+            with cached:
+                for i in range(0, len(cached), self._output_frame_bytes):
+                    yield TTSAudioRawFrame(audio=cached[i : i + self._output_frame_bytes], sample_rate=self._sample_rate, num_channels=1)
+            yield TTSStoppedFrame()
+            return
+
+        store = self._cache is not None and self._cache.cacheable(text)
+        synthesized = []
+        self._dsp.reset()
+        first_audio = True
+        buffer = b""
+        async for data in self._stream(text, entry):
+            if first_audio and data:
+                first_audio = False
+                self._report_first_audio(start, type(self._engine).__name__)
+                await self.stop_ttfb_metrics()
 
-        process = await asyncio.create_subprocess_exec(*cmd, stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL)
-        out, _ = await process.communicate(input=text.encode("utf-8"))
-        
-        # Apply volume scaling
-        if self._volume < 1.0:
-            audio = np.frombuffer(out, dtype=np.int16)
-            audio = (audio * self._volume).astype(np.int16)
-            out = audio.tobytes()
-        
-        chunk_size = 4096 
-        for i in range(0, len(out), chunk_size):
-            chunk = out[i : i + chunk_size]
-            if chunk:
+            buffer += data
+            whole = len(buffer) - len(buffer) % self._frame_bytes
+            for i in range(0, whole, self._frame_bytes):
+                chunk = self._dsp.process(buffer[i : i + self._frame_bytes])
+                if store:
+                    synthesized.append(chunk)
                 yield TTSAudioRawFrame(audio=chunk, sample_rate=self._sample_rate, num_channels=1)
+            buffer = buffer[whole:]
+
+        # Flush the last partial frame and the filter tail, dropping any odd trailing byte
+        buffer = buffer[: len(buffer) - len(buffer) % 2]
+        chunk = self._dsp.process(buffer) + self._dsp.flush()
+        if chunk:
+            if store:
+                synthesized.append(chunk)
+            yield TTSAudioRawFrame(audio=chunk, sample_rate=self._sample_rate, num_channels=1)
+
+        if store:
+            await asyncio.to_thread(self._cache.put, text, b"".join(synthesized))
+
+        yield TTSStoppedFrame()
+
+class LocalPiperTTSService(PCMTTSService):
+    def __init__(self, *, piper_path: str, voice_path: str, device: str="cpu", sample_rate: int=22050, volume: float=1.0, pool_size: int=2, streaming: bool=False, frame_ms: int=20, **kwargs):
+        if streaming:
+            engine = PiperStreamer(piper_path=piper_path, voice_path=voice_path, device=device)
+        else:
+            engine = PiperWorkerPool(piper_path=piper_path, voice_path=voice_path, device=device, size=pool_size)
+        super().__init__(engine=engine, sample_rate=sample_rate, volume=volume, frame_ms=frame_ms, voice_path=voice_path, **kwargs)
+        self._piper_path = piper_path
+        self._voice_path = voice_path
+        self._device = device
 
-        yield TTSStoppedFrame()
\ No newline at end of file
+class OnnxPiperTTSService(PCMTTSService):
+    def __init__(self, *, voice_path: str, espeak_data_path: Optional[str]=None, volume: float=1.0, intra_op_threads: int=1, inter_op_threads: int=1, warm_up: bool=True, frame_ms: int=20, **kwargs):
+        voice = OnnxPiperVoice(voice_path=voice_path, espeak_data_path=espeak_data_path, intra_op_threads=intra_op_threads, inter_op_threads=inter_op_threads)
+        super().__init__(engine=OnnxPiperEngine(voice, warm_up=warm_up), sample_rate=voice.sample_rate, volume=volume, frame_ms=frame_ms, voice_path=voice_path, **kwargs)
+        self._voice = voice
@@ -0,0 +1,119 @@
+from collections import OrderedDict
+from typing import Optional
+import hashlib, logging, mmap, os, unicodedata
+
+class TTSCache:
+    """Content-addressed on-disk cache of synthesized speech.
+
+    Entries are raw mono int16 PCM (already volume scaled) stored as ``<sha256>.pcm``,
+    keyed by normalized text, voice model hash, sample rate and volume. File mtimes
+    record recency so the LRU order survives restarts.
+    """
+    def __init__(self, cache_dir: str, *, voice_path: str, sample_rate: int, volume: float, max_bytes: int=200 * 1024 * 1024, max_text_length: int=120):
+        self._cache_dir = cache_dir
+        self._sample_rate = sample_rate
+        self._volume = volume
+        self._max_bytes = max_bytes
+        self.max_text_length = max_text_length
+        self._voice_hash = _file_digest(voice_path)
+        self._index: "OrderedDict[str, int]" = OrderedDict()  # key -> size, least recent first
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(cache_dir, exist_ok=True)
+        entries = []
+        for name in os.listdir(cache_dir):
+            if name.endswith(".pcm"):
+                path = os.path.join(cache_dir, name)
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, name[:-4], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._total_bytes += size
+        self._evict()
+        logging.info(f"TTS cache at {cache_dir}: {len(self._index)} entries, {self._total_bytes / (1024 * 1024):.1f} MB")
+
+    def key(self, text: str) -> str:
+        material = f"{normalize_text(text)}\0{self._voice_hash}\0{self._sample_rate}\0{self._volume:.4f}"
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self._cache_dir, f"{key}.pcm")
+
+    def cacheable(self, text: str) -> bool:
+        return 0 < len(normalize_text(text)) <= self.max_text_length
+
+    def __contains__(self, text: str) -> bool:
+        return self.key(text) in self._index
+
+    def get(self, text: str) -> Optional[mmap.mmap]:
+        """Returns a read-only memory map of the cached audio, the caller closes it."""
+        key = self.key(text)
+        if key not in self._index:
+            self.misses += 1
+            return None
+
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                audio = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            os.utime(path)
+        except (OSError, ValueError) as e:
+            logging.warning(f"Dropping unreadable TTS cache entry {key}: {e}")
+            self._remove(key)
+            self.misses += 1
+            return None
+
+        self._index.move_to_end(key)
+        self.hits += 1
+        return audio
+
+    def put(self, text: str, pcm: bytes):
+        if not pcm or not self.cacheable(text):
+            return
+        key = self.key(text)
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(pcm)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logging.error(f"Failed to write TTS cache entry: {e}")
+            return
+
+        self._total_bytes += len(pcm) - self._index.pop(key, 0)
+        self._index[key] = len(pcm)
+        self._evict()
+
+    def _remove(self, key: str) -> bool:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+        except OSError:
+            # Still memory mapped somewhere (Windows), try again on a later eviction
+            return False
+        self._total_bytes -= self._index.pop(key, 0)
+        return True
+
+    def _evict(self):
+        for key in list(self._index):
+            if self._total_bytes <= self._max_bytes:
+                break
+            self._remove(key)
+
+def normalize_text(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+def _file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+    except OSError:
+        # Voice file missing, fall back to its path so the key is still stable
+        digest.update(os.path.abspath(path).encode("utf-8"))
+    return digest.hexdigest()
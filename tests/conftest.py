@@ -7,3 +7,5 @@ os.environ["TAVILY_API_KEY"] = "test_key"
 # Add the project root directory to sys.path
 # This allows tests to import from src.functions
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+# Modules in src import each other by their flat names, as they do when running src/main.py
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
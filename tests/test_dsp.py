@@ -0,0 +1,44 @@
+import numpy as np
+from src.dsp import OutputDSP, polyphase_filter
+
+def sine(rate, seconds=1.0, freq=1000, amplitude=10000):
+    t = np.arange(int(rate * seconds)) / rate
+    return (amplitude * np.sin(2 * np.pi * freq * t)).astype(np.int16)
+
+def test_resample_matches_ideal_sine():
+    dsp = OutputDSP(in_rate=22050, out_rate=16000)
+    out = np.frombuffer(dsp.process(sine(22050).tobytes()) + dsp.flush(), dtype=np.int16)
+
+    # The filter delays the signal by half its length, 8 input samples
+    t = np.arange(len(out)) / 16000 - 8 / 22050
+    ideal = 10000 * np.sin(2 * np.pi * 1000 * t)
+    assert abs(len(out) - 16000) <= 8
+    assert np.abs(out[100:-100] - ideal[100:-100]).max() < 10
+
+def test_chunked_resampling_equals_whole_buffer():
+    audio = sine(22050)
+    whole = OutputDSP(in_rate=22050, out_rate=16000)
+    expected = whole.process(audio.tobytes()) + whole.flush()
+
+    chunked = OutputDSP(in_rate=22050, out_rate=16000)
+    parts = [chunked.process(audio[i : i + 441].tobytes()) for i in range(0, len(audio), 441)]
+    assert b"".join(parts) + chunked.flush() == expected
+    # 20 ms in, 20 ms out
+    assert {len(p) for p in parts[1:-1]} == {640}
+
+def test_gain_and_soft_limit():
+    audio = sine(22050, amplitude=20000).tobytes()
+    quiet = np.frombuffer(OutputDSP(in_rate=22050, gain=0.5).process(audio), dtype=np.int16)
+    assert np.array_equal(quiet, np.rint(np.frombuffer(audio, dtype=np.int16) * 0.5).astype(np.int16))
+
+    # 30000 peak, compressed above the 80% threshold (26214) but below full scale
+    limited = np.frombuffer(OutputDSP(in_rate=22050, gain=1.5, soft_limit=True).process(audio), dtype=np.int16)
+    assert 26214 < limited.max() < 30000
+    loud = np.frombuffer(OutputDSP(in_rate=22050, gain=3.0, soft_limit=True).process(audio), dtype=np.int16)
+    assert np.sum(loud >= 32767) < np.sum(np.frombuffer(OutputDSP(in_rate=22050, gain=3.0).process(audio), dtype=np.int16) >= 32767)
+
+def test_filter_is_cached_per_rate_pair():
+    assert polyphase_filter(22050, 16000) is polyphase_filter(22050, 16000)
+    up, down, phases = polyphase_filter(22050, 16000)
+    assert (up, down) == (320, 441)
+    assert phases.shape == (320, 16)
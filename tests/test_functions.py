@@ -52,3 +52,68 @@ async def test_monitor_resources():
         assert "cpu" in result
         assert result["ram"] == 100.0
         assert result["cpu"] == 15.5
+
+async def max_loop_stall(coroutine, interval=0.005):
+    """Runs ``coroutine`` while ticking the event loop, returns the longest gap between ticks."""
+    gaps = []
+    async def ticker():
+        last = asyncio.get_running_loop().time()
+        while True:
+            await asyncio.sleep(interval)
+            now = asyncio.get_running_loop().time()
+            gaps.append(now - last)
+            last = now
+    task = asyncio.create_task(ticker())
+    try:
+        await coroutine
+    finally:
+        task.cancel()
+    return max(gaps)
+
+@pytest.mark.asyncio
+async def test_web_search_does_not_block_the_event_loop(monkeypatch):
+    backend = functions.LocalSearchBackend(results=["Sunny"], delay=0.3)
+    monkeypatch.setattr(functions, "search_backend", backend)
+    params = mock_params({"query": "weather in Lansing stall test"})
+
+    stall = await max_loop_stall(functions.execute_web_search(params))
+
+    assert stall < 0.1
+    assert params.result_callback.call_args[0][0] == {"result": "[CTX: WEB SEARCH]\nSunny\n[END DATA]"}
+
+@pytest.mark.asyncio
+async def test_web_search_caches_normalized_queries(monkeypatch):
+    backend = functions.LocalSearchBackend(results=["Paris"])
+    monkeypatch.setattr(functions, "search_backend", backend)
+
+    await functions.execute_web_search(mock_params({"query": "Capital of  France"}))
+    await functions.execute_web_search(mock_params({"query": "capital of france"}))
+
+    assert backend.queries == ["Capital of  France"]
+
+@pytest.mark.asyncio
+async def test_web_search_times_out(monkeypatch):
+    monkeypatch.setattr(functions, "search_backend", functions.LocalSearchBackend(delay=0.5))
+    monkeypatch.setattr(functions, "SEARCH_TIMEOUT", 0.05)
+    params = mock_params({"query": "slow search timeout test"})
+
+    start = asyncio.get_running_loop().time()
+    await functions.execute_web_search(params)
+
+    assert asyncio.get_running_loop().time() - start < 0.3
+    assert "error" in params.result_callback.call_args[0][0]
+
+@pytest.mark.asyncio
+async def test_interrupted_web_search_returns_immediately(monkeypatch):
+    monkeypatch.setattr(functions, "search_backend", functions.LocalSearchBackend(delay=0.5))
+    params = mock_params({"query": "interrupted search test"})
+
+    task = asyncio.create_task(functions.execute_web_search(params))
+    await asyncio.sleep(0.05)
+    start = asyncio.get_running_loop().time()
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert asyncio.get_running_loop().time() - start < 0.05
+    params.result_callback.assert_not_called()
@@ -0,0 +1,92 @@
+import datetime
+import threading
+import time
+from unittest.mock import MagicMock
+from src import google_clients
+from src.google_clients import GoogleClients, HttpPool
+
+class FakeCredentials:
+    def __init__(self, expires_in):
+        self.expiry = self._utcnow() + datetime.timedelta(seconds=expires_in)
+        self.refreshes = 0
+
+    def _utcnow(self):
+        return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+    def refresh(self, request):
+        self.refreshes += 1
+        self.expiry = self._utcnow() + datetime.timedelta(hours=1)
+
+def test_credentials_and_services_are_reused():
+    load = MagicMock(return_value=FakeCredentials(expires_in=3600))
+    build = MagicMock(side_effect=lambda *args, **kwargs: object())
+    clients = GoogleClients(load_credentials=load, build=build)
+
+    calendar = clients.service("calendar", "v3")
+    assert clients.service("calendar", "v3") is calendar
+    assert clients.service("gmail", "v1") is not calendar
+    clients.credentials()
+
+    load.assert_called_once()
+    assert build.call_count == 2
+    assert "requestBuilder" in build.call_args.kwargs
+    clients.reset()
+
+def test_expiring_credentials_are_refreshed_and_saved():
+    creds = FakeCredentials(expires_in=60)
+    save = MagicMock()
+    clients = GoogleClients(load_credentials=lambda: creds, save_credentials=save)
+
+    assert clients.credentials() is creds
+    assert creds.refreshes == 1
+    save.assert_called_once_with(creds)
+    # Fresh credentials are served from memory
+    clients.credentials()
+    assert creds.refreshes == 1
+    clients.reset()
+
+def test_credentials_refresh_in_the_background():
+    creds = FakeCredentials(expires_in=google_clients.CREDENTIALS_REFRESH_MARGIN + 0.05)
+    clients = GoogleClients(load_credentials=lambda: creds)
+    clients.credentials()
+    assert creds.refreshes == 0
+
+    deadline = time.monotonic() + 2
+    while creds.refreshes == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert creds.refreshes == 1
+    clients.reset()
+
+def test_pool_reuses_idle_connections():
+    pool = HttpPool(object)
+    with pool.lease() as first:
+        pass
+    with pool.lease() as second:
+        assert second is first
+        # A concurrent caller gets a connection of its own
+        with pool.lease() as third:
+            assert third is not first
+    assert pool.created == 2
+
+def test_pool_hands_each_thread_its_own_connection():
+    pool = HttpPool(object)
+    in_use, overlaps = set(), []
+    lock = threading.Lock()
+
+    def work():
+        for _ in range(50):
+            with pool.lease() as http:
+                with lock:
+                    overlaps.append(id(http) in in_use)
+                    in_use.add(id(http))
+                time.sleep(0.001)
+                with lock:
+                    in_use.discard(id(http))
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not any(overlaps)
+    assert pool.created <= 4
@@ -11,6 +11,13 @@ def mock_params(args=None):
     params.result_callback.return_value.set_result(None)
     return params
 
+@pytest.fixture(autouse=True)
+def fresh_clients():
+    # Credentials and services are cached process wide, each test patches its own
+    google_ops.CLIENTS.reset()
+    yield
+    google_ops.CLIENTS.reset()
+
 @pytest.mark.asyncio
 @patch("src.functions.google_ops._get_creds")
 @patch("src.functions.google_ops.build")
@@ -25,6 +32,20 @@ async def test_execute_get_recent_emails(mock_build, mock_get_creds):
         'messages': [{'id': '123'}]
     }
 
+    # Batched metadata requests answer every message through the batch callback
+    class FakeBatch:
+        def __init__(self, callback):
+            self.callback = callback
+            self.requests = []
+
+        def add(self, request, request_id):
+            self.requests.append((request_id, request))
+
+        def execute(self, http=None):
+            for request_id, request in self.requests:
+                self.callback(request_id, request.execute(), None)
+    mock_service.new_batch_http_request.side_effect = lambda callback: FakeBatch(callback)
+
     # Mock get message details
     mock_service.users().messages().get().execute.return_value = {
         'snippet': 'This is a test email snippet',
@@ -48,6 +69,9 @@ async def test_execute_get_recent_emails(mock_build, mock_get_creds):
     expected_output = f"[CTX: EMAILS - Natural Speech/No Lists]\n{expected_email_info}\n[END DATA]"
     
     assert result == expected_output
+    _, kwargs = mock_service.users().messages().get.call_args
+    assert kwargs["format"] == "metadata"
+    assert kwargs["metadataHeaders"] == ["Subject", "From", "Date"]
 
 @pytest.mark.asyncio
 @patch("src.functions.google_ops._get_creds")
@@ -0,0 +1,130 @@
+import asyncio
+import datetime
+import pytest
+from unittest.mock import MagicMock, patch
+from pipecat.services.llm_service import FunctionCallParams
+from src.google_sync import GoogleStore, GoogleSync, describe_age
+from src.functions import google_ops
+
+def mock_params(args=None):
+    params = MagicMock(spec=FunctionCallParams)
+    params.arguments = args or {}
+    params.result_callback = MagicMock(return_value=asyncio.Future())
+    params.result_callback.return_value.set_result(None)
+    return params
+
+class HttpError(Exception):
+    def __init__(self, status):
+        self.resp = MagicMock(status=status)
+
+def message(message_id, internal_date, labels=("INBOX",)):
+    return {
+        "id": message_id,
+        "internalDate": str(internal_date),
+        "labelIds": list(labels),
+        "snippet": f"Snippet {message_id}",
+        "payload": {"headers": [{"name": "Subject", "value": f"Subject {message_id}"}]},
+    }
+
+def event(event_id, days_from_now, status="confirmed"):
+    start = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(days=days_from_now)
+    return {"id": event_id, "status": status, "summary": event_id, "start": {"dateTime": start.isoformat()}, "end": {"dateTime": start.isoformat()}}
+
+@pytest.fixture
+def store(tmp_path):
+    return GoogleStore(str(tmp_path / "google.db"))
+
+def gmail_sync(store, mailbox):
+    service = MagicMock()
+    service.users().getProfile().execute.return_value = {"historyId": "100"}
+    service.users().messages().list().execute.return_value = {"messages": [{"id": i} for i in mailbox]}
+    fetch_metadata = lambda service, ids: [mailbox[i] for i in ids if i in mailbox]
+    return GoogleSync(store, gmail=lambda: service, calendar=None, fetch_metadata=fetch_metadata), service
+
+def test_gmail_history_applies_changes_after_full_sync(store):
+    mailbox = {"a": message("a", 1), "b": message("b", 2)}
+    sync, service = gmail_sync(store, mailbox)
+    sync.sync_gmail()
+    assert [m["id"] for m in store.emails(5)] == ["b", "a"]
+
+    mailbox["c"] = message("c", 3)
+    mailbox["a"] = message("a", 1, labels=["ARCHIVED"])
+    service.users().history().list().execute.return_value = {
+        "historyId": "105",
+        "history": [
+            {"messagesAdded": [{"message": {"id": "c", "labelIds": ["INBOX", "UNREAD"]}}]},
+            {"labelsRemoved": [{"message": {"id": "a"}, "labelIds": ["INBOX"]}]},
+            {"messagesDeleted": [{"message": {"id": "b"}}]},
+        ],
+    }
+    sync.sync_gmail()
+
+    assert [m["id"] for m in store.emails(5)] == ["c"]
+    assert store.token("gmail") == "105"
+    _, kwargs = service.users().history().list.call_args
+    assert kwargs["startHistoryId"] == "100"
+
+def test_expired_history_id_falls_back_to_full_resync(store):
+    mailbox = {"a": message("a", 1)}
+    sync, service = gmail_sync(store, mailbox)
+    sync.sync_gmail()
+
+    mailbox["b"] = message("b", 2)
+    service.users().messages().list().execute.return_value = {"messages": [{"id": "b"}, {"id": "a"}]}
+    service.users().history().list().execute.side_effect = HttpError(404)
+    service.users().getProfile().execute.return_value = {"historyId": "200"}
+    sync.sync_gmail()
+
+    assert [m["id"] for m in store.emails(5)] == ["b", "a"]
+    assert store.token("gmail") == "200"
+
+def test_calendar_sync_token_and_expiry(store):
+    service = MagicMock()
+    service.events().list().execute.return_value = {"items": [event("standup", 1), event("review", 3)], "nextSyncToken": "t1"}
+    sync = GoogleSync(store, gmail=None, calendar=lambda: service, fetch_metadata=None)
+    sync.sync_once()
+
+    service.events().list().execute.return_value = {"items": [event("standup", 1, status="cancelled"), event("lunch", 2)], "nextSyncToken": "t2"}
+    sync.sync_once()
+    _, kwargs = service.events().list.call_args
+    assert kwargs["syncToken"] == "t1"
+    now = datetime.datetime.now(datetime.timezone.utc)
+    assert [e["id"] for e in store.events(now, now + datetime.timedelta(days=7))] == ["lunch", "review"]
+    assert [e["id"] for e in store.events(now, now + datetime.timedelta(days=2, hours=1))] == ["lunch"]
+
+    service.events().list().execute.side_effect = [HttpError(410), {"items": [event("offsite", 5)], "nextSyncToken": "t3"}]
+    sync.sync_once()
+    assert [e["id"] for e in store.events(now, now + datetime.timedelta(days=7))] == ["offsite"]
+    assert store.token("calendar") == "t3"
+
+def test_failed_sync_keeps_the_mirror(store):
+    service = MagicMock()
+    service.events().list().execute.return_value = {"items": [event("standup", 1)], "nextSyncToken": "t1"}
+    sync = GoogleSync(store, gmail=None, calendar=lambda: service, fetch_metadata=None)
+    sync.sync_once()
+    service.events().list().execute.side_effect = HttpError(500)
+    sync.sync_once()
+
+    assert store.token("calendar") == "t1"
+    assert sync.age("calendar") is not None
+
+def test_describe_age():
+    assert describe_age(5) == "just now"
+    assert describe_age(60) == "1 minute ago"
+    assert describe_age(3 * 60 * 60) == "3 hours ago"
+
+@pytest.mark.asyncio
+@patch("src.functions.google_ops.build")
+async def test_handlers_answer_from_fresh_mirror(mock_build, store, monkeypatch):
+    sync, _ = gmail_sync(store, {"a": message("a", 1), "b": message("b", 2, labels=["INBOX", "UNREAD"])})
+    sync.sync_gmail()
+    monkeypatch.setattr(google_ops, "_sync", sync)
+
+    params = mock_params({"limit": 1})
+    await google_ops.execute_get_recent_emails(params)
+
+    result = params.result_callback.call_args[0][0]
+    assert result.startswith("[CTX: EMAILS - Natural Speech/No Lists]\n[Synced just now]\n")
+    assert "Status: Unread | Subject: Subject b" in result
+    assert "Subject a" not in result
+    mock_build.assert_not_called()
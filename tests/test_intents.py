@@ -0,0 +1,27 @@
+import pytest
+from src.intents import match_intent, describe_duration
+
+@pytest.mark.parametrize("text, expected", [
+    ("Jarvis, what time is it?", ("time", {})),
+    ("What is the date today, Jarvis?", ("date", {})),
+    ("Hey Jarvis, can you set an alarm at 6 am", ("alarm", {"alarm_name": "Alarm", "time": "6:00 AM"})),
+    ("Jarvis, set an alarm for 18:45.", ("alarm", {"alarm_name": "Alarm", "time": "18:45"})),
+    ("Jarvis, set a timer for ten minutes please", ("timer", {"alarm_name": "Timer", "minutes": 10})),
+    ("Set a 5 minute timer", ("timer", {"alarm_name": "Timer", "minutes": 5})),
+    ("Jarvis, set a timer for an hour and 15 minutes", ("timer", {"alarm_name": "Timer", "hours": 1, "minutes": 15})),
+    ("wake me up in half an hour", ("timer", {"alarm_name": "Alarm", "minutes": 30})),
+])
+def test_match_intent(text, expected):
+    assert match_intent(text) == expected
+
+@pytest.mark.parametrize("text", [
+    "Jarvis, what time is my meeting?",
+    "Jarvis, set a timer for 10 minutes and check my email",
+    "Jarvis, set an alarm for 25:00",
+    "Jarvis, can you schedule a reminder in one hour?",
+])
+def test_match_intent_leaves_the_rest_to_the_llm(text):
+    assert match_intent(text) is None
+
+def test_describe_duration():
+    assert describe_duration({"hours": 1, "minutes": 15}) == "1 hour and 15 minutes"
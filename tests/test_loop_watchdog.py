@@ -0,0 +1,35 @@
+import asyncio
+import logging
+import time
+import pytest
+from src.loop_watchdog import LoopWatchdog
+
+def blocking_handler(seconds):
+    time.sleep(seconds)
+
+@pytest.mark.asyncio
+async def test_stall_is_logged_with_blocking_stack(caplog):
+    watchdog = LoopWatchdog(threshold=0.05, interval=0.01)
+    watchdog.start()
+    await asyncio.sleep(0.05)
+    with caplog.at_level(logging.WARNING):
+        blocking_handler(0.2)
+        await asyncio.sleep(0.05)
+    watchdog.stop()
+
+    assert watchdog.stalls == 1
+    assert watchdog.last_stall == "test_loop_watchdog.blocking_handler"
+    warning = next(r.getMessage() for r in caplog.records if "stalled" in r.getMessage())
+    assert "time.sleep(seconds)" in warning
+    assert max(watchdog.lags) >= 0.15
+
+@pytest.mark.asyncio
+async def test_idle_loop_reports_low_lag():
+    watchdog = LoopWatchdog(threshold=0.1, interval=0.01)
+    watchdog.start()
+    await asyncio.sleep(0.2)
+    watchdog.stop()
+
+    assert watchdog.stalls == 0
+    assert watchdog.percentile(0.5) < 0.05
+    assert "0 stalls over 100 ms" in watchdog.summary()
@@ -0,0 +1,62 @@
+import json
+import logging
+import pytest
+from src import observer
+from src.observer import NoiseFilter, begin_turn, setup_logging, stop_logging
+
+@pytest.fixture
+def log_file(tmp_path):
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    setup_logging(log_dir=str(tmp_path), log_format="json")
+    def read():
+        stop_logging()
+        path, = tmp_path.glob("*.jsonl")
+        return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    yield read
+    stop_logging()
+    root.handlers[:] = handlers
+    root.setLevel(level)
+
+def test_records_are_json_lines_with_turn_and_truncated_once(log_file):
+    turn = begin_turn()
+    logging.info("User: Jarvis, read my emails")
+    logging.info(f"get_recent_emails output: {'x' * 5000}")
+    try:
+        raise ValueError("bad payload")
+    except ValueError:
+        logging.exception("Tool failed")
+    entries = log_file()
+
+    assert [e["turn"] for e in entries] == [turn] * 3
+    assert entries[0]["message"] == "User: Jarvis, read my emails"
+    assert entries[1]["message"].endswith(f"... [{5000 + len('get_recent_emails output: ') - observer.LOG_MAX_CHARS} more characters]")
+    assert len(entries[1]["message"]) < observer.LOG_MAX_CHARS + 50
+    assert entries[2]["level"] == "ERROR" and "ValueError: bad payload" in entries[2]["exception"]
+
+def make_record(msg, lineno=1, created=0.0, level=logging.INFO):
+    record = logging.LogRecord("root", level, "processors.py", lineno, msg, None, None)
+    record.created = created
+    return record
+
+def test_noise_filter_throttles_call_sites_and_samples_metrics():
+    noise = NoiseFilter(rate=10, burst=3, sampled={"Metric: ": 4})
+    passed = [noise.filter(make_record(f"frame {n}", created=n * 0.01)) for n in range(10)]
+    assert passed == [True] * 3 + [False] * 7
+    # Another call site and warnings are not affected
+    assert noise.filter(make_record("other", lineno=2, created=0.1))
+    assert noise.filter(make_record("frame", created=0.1, level=logging.WARNING))
+    # Refilled after a second, the first record to pass reports what was dropped
+    record = make_record("frame", created=1.0)
+    assert noise.filter(record) and record.suppressed == 7
+
+    metrics = [make_record(f"Metric: TTFB {n}", lineno=3, created=n) for n in range(8)]
+    assert [noise.filter(r) for r in metrics] == [True, False, False, False] * 2
+    assert metrics[0].sampled == 4
+
+def test_default_sampling_only_thins_processing_metrics():
+    noise = NoiseFilter()
+    ttfb = [make_record(f"Metric: TTFBMetricsData, time to first byte: {n}", lineno=4, created=n) for n in range(5)]
+    processing = [make_record(f"Metric: ProcessingMetricsData, processing: {n}", lineno=5, created=n) for n in range(5)]
+    assert all(noise.filter(r) for r in ttfb)
+    assert [noise.filter(r) for r in processing] == [True, False, False, False, False]
@@ -32,5 +32,13 @@ def test_ensure_model_downloaded_passes_options(mock_run, mock_request, mock_url
     assert payload["options"]["num_ctx"] == 16384
     print("Verification Passed: Options were correctly passed to Ollama API.")
 
+@patch("src.ollama.time.sleep")
+@patch("src.ollama.urllib.request.urlopen")
+def test_wait_for_ollama_backs_off_exponentially(mock_urlopen, mock_sleep):
+    mock_urlopen.side_effect = [ollama.urllib.error.URLError("refused")] * 5 + [MagicMock()]
+
+    assert ollama.wait_for_ollama(initial_delay=0.05, max_delay=0.3)
+    assert [c[0][0] for c in mock_sleep.call_args_list] == [0.05, 0.1, 0.2, 0.3, 0.3]
+
 if __name__ == "__main__":
     test_ensure_model_downloaded_passes_options()
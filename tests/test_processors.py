@@ -0,0 +1,360 @@
+import pytest
+import time
+import asyncio
+from pipecat.frames.frames import LLMContextFrame, BotStartedSpeakingFrame, BotStoppedSpeakingFrame, LLMFullResponseStartFrame, LLMFullResponseEndFrame, LLMTextFrame, TTSStartedFrame, TTSStoppedFrame, TTSAudioRawFrame
+from pipecat.processors.frame_processor import FrameDirection, FrameProcessor
+from pipecat.processors.aggregators.llm_response_universal import LLMContextAggregatorPair
+from pipecat.services.tts_service import TTSService
+from pipecat.services.llm_service import LLMContext
+from pipecat.pipeline.pipeline import Pipeline
+from pipecat.pipeline.runner import PipelineRunner
+from pipecat.pipeline.task import PipelineTask
+from src.processors import SentenceChunker, ContextGovernor, WakeWordGate, SystemInstructionRefresher, PromptCacheStats, LLMReadinessGate, IntentFastPath, MessageInjector, estimate_tokens
+
+def split(chunker, *tokens):
+    segments = []
+    for token in tokens:
+        chunker._buffer += token
+        while segment := chunker._pop_segment():
+            segments.append(segment)
+    return segments
+
+def test_sentence_chunker_splits_on_sentences():
+    chunker = SentenceChunker(min_length=10)
+    segments = split(chunker, "You have lunch ", "at noon, Sir. ", "Then a review", " at three. And")
+    assert segments == ["You have lunch at noon, Sir.", "Then a review at three."]
+    assert chunker._buffer == "And"
+
+def test_sentence_chunker_merges_short_sentences():
+    chunker = SentenceChunker(min_length=20)
+    assert split(chunker, "Yes, Sir. ", "Right away. ", "It is done now, Sir. ") == ["Yes, Sir. Right away.", "It is done now, Sir."]
+
+def test_sentence_chunker_splits_long_clauses():
+    chunker = SentenceChunker(min_length=10, clause_min_length=30)
+    segments = split(chunker, "Your meeting with the design team is at noon, followed by lunch")
+    assert segments == ["Your meeting with the design team is at noon,"]
+    assert chunker._buffer == "followed by lunch"
+
+def test_sentence_chunker_ignores_decimal_points():
+    chunker = SentenceChunker(min_length=5)
+    assert split(chunker, "It weighs 3.5 kilograms. ") == ["It weighs 3.5 kilograms."]
+
+def conversation(turns, tool_payload=""):
+    messages = [{"role": "system", "content": "You are Jarvis."}]
+    for n in range(turns):
+        messages.append({"role": "user", "content": f"Question {n} " + "x" * 200})
+        if tool_payload:
+            messages.append({"role": "assistant", "content": "", "tool_calls": [{"id": f"call_{n}", "type": "function", "function": {"name": "get_recent_emails", "arguments": "{}"}}]})
+            messages.append({"role": "tool", "tool_call_id": f"call_{n}", "content": tool_payload})
+        messages.append({"role": "assistant", "content": f"Answer {n}, Sir."})
+    return messages
+
+def test_context_governor_keeps_recent_turns_and_stubs_old_tool_results():
+    context = LLMContext(messages=conversation(4, tool_payload="email " * 500))
+    governor = ContextGovernor(context, max_tokens=100000, keep_turns=2, tool_stub_chars=600)
+    governor.compact()
+
+    messages = context.messages
+    tools = [m for m in messages if m["role"] == "tool"]
+    assert len(messages) == 1 + 4 * 4
+    assert all(m["content"].startswith("[Older tool result removed") for m in tools[:2])
+    assert all(m["content"] == "email " * 500 for m in tools[2:])
+
+def test_context_governor_folds_old_turns_into_summary():
+    context = LLMContext(messages=conversation(10))
+    governor = ContextGovernor(context, max_tokens=600, keep_turns=3)
+    governor.compact()
+
+    messages = context.messages
+    assert messages[0]["content"] == "You are Jarvis."
+    assert messages[1]["content"].startswith(ContextGovernor.SUMMARY_PREFIX)
+    assert "User: Question 0" in messages[1]["content"]
+    assert messages[-1]["content"] == "Answer 9, Sir."
+    assert [m["content"][:10] for m in messages if m["role"] == "user"][-3:] == ["Question 7", "Question 8", "Question 9"]
+    assert governor.last_prompt_tokens < sum(estimate_tokens(m) for m in conversation(10))
+
+    # Compacting again reuses the summary instead of stacking a second one
+    context.add_message({"role": "user", "content": "Question 10"})
+    governor.compact()
+    assert sum(m["content"].startswith(ContextGovernor.SUMMARY_PREFIX) for m in context.messages if m["role"] == "system") == 1
+
+@pytest.mark.asyncio
+async def test_context_governor_condenses_summary_in_background():
+    async def summarize(text):
+        return "Sir asked ten questions."
+
+    context = LLMContext(messages=conversation(10))
+    governor = ContextGovernor(context, max_tokens=600, keep_turns=3, summarize=summarize)
+    governor.compact()
+    await governor._summary_task
+    governor.compact()
+
+    assert context.messages[1]["content"] == f"{ContextGovernor.SUMMARY_PREFIX}\nSir asked ten questions."
+
+def test_wake_word_gate_holds_ambient_speech_outside_context():
+    context = LLMContext(messages=[{"role": "system", "content": "You are Jarvis."}])
+    gate = WakeWordGate(context, drop_ambient=True, ambient_buffer_size=2)
+    for text in ["the game is on tonight", "pass the salt", "turn the volume down"]:
+        context.add_message({"role": "user", "content": text})
+        gate._hold_ambient(text)
+
+    assert context.messages == [{"role": "system", "content": "You are Jarvis."}]
+    assert [t for _, t in gate.ambient] == ["pass the salt", "turn the volume down"]
+
+def test_wake_word_gate_attaches_lead_in_and_recall():
+    context = LLMContext(messages=[])
+    gate = WakeWordGate(context, drop_ambient=True, lead_in_secs=10)
+    gate.ambient.append((time.monotonic() - 60, "an hour ago"))
+    gate.ambient.append((time.monotonic(), "pick up milk"))
+
+    context.add_message({"role": "user", "content": "Jarvis, remind me of that"})
+    gate._attach_lead_in("Jarvis, remind me of that")
+    assert context.messages[-1]["content"] == "(Overheard before this, not addressed to you: pick up milk)\nJarvis, remind me of that"
+
+    # Attached speech is not attached again, a recall gets the rest of the buffer
+    gate.ambient.append((time.monotonic(), "the game is at eight"))
+    context.add_message({"role": "user", "content": "Jarvis, what did I just say?"})
+    gate._attach_lead_in("Jarvis, what did I just say?")
+    assert context.messages[-1]["content"] == "(Overheard before this, not addressed to you: an hour ago / the game is at eight)\nJarvis, what did I just say?"
+    assert WakeWordGate.utterance(context.messages[-1]["content"]) == "Jarvis, what did I just say?"
+    assert not gate.ambient
+
+def test_refresher_keeps_one_reminder_at_the_end():
+    context = LLMContext(messages=[{"role": "system", "content": "You are Jarvis."}])
+    stats = PromptCacheStats()
+    refresher = SystemInstructionRefresher(context=context, instructional_anchor="Speak naturally.", prompt_stats=stats)
+
+    context.add_message({"role": "user", "content": "Jarvis, hello"})
+    refresher.refresh()
+    first_prompt = list(context.messages)
+    context.add_message({"role": "assistant", "content": "Sir."})
+    context.add_message({"role": "user", "content": "Jarvis, the time?"})
+    refresher.refresh()
+
+    messages = context.messages
+    reminders = [m for m in messages if m["content"].startswith("SYSTEM REMINDER:")]
+    assert reminders == [messages[-1]]
+    assert messages[:2] == first_prompt[:2]
+    assert stats._pending[2] == 2
+
+def test_prompt_cache_stats_hit_rate():
+    stats = PromptCacheStats()
+    stats.record_prompt([{"role": "system", "content": "x" * 384}])
+    stats.record_usage(100)
+    stats.record_prompt([{"role": "system", "content": "x" * 384}, {"role": "user", "content": "y" * 384}])
+    stats.record_usage(50)
+    assert [round(t[2], 2) for t in stats.turns] == [0.0, 0.75]
+
+@pytest.mark.asyncio
+async def test_llm_readiness_gate_holds_latest_turn():
+    from pipecat.frames.frames import TTSSpeakFrame
+    ready = asyncio.Event()
+    gate = LLMReadinessGate(ready=ready, defer_message="Wait.")
+    pushed = []
+    async def fake_push(frame, direction=FrameDirection.DOWNSTREAM):
+        pushed.append(frame)
+    gate.push_frame = fake_push
+
+    first, second = LLMContextFrame(context=LLMContext()), LLMContextFrame(context=LLMContext())
+    await gate.process_frame(first, FrameDirection.DOWNSTREAM)
+    await gate.process_frame(second, FrameDirection.DOWNSTREAM)
+    assert len(pushed) == 1 and isinstance(pushed[0], TTSSpeakFrame)
+    assert pushed[0].append_to_context is False
+
+    ready.set()
+    await gate._release_task
+    assert pushed[1:] == [second]
+
+class FakeRegistry:
+    enabled = ["schedule_alarm"]
+
+    def __init__(self):
+        self.calls = []
+
+    def handler(self, name):
+        async def schedule_alarm(params):
+            self.calls.append(params.arguments)
+            await params.result_callback({"result": "scheduled", "alarm_id": 1})
+        return schedule_alarm
+
+@pytest.mark.asyncio
+async def test_intent_fast_path_answers_without_llm():
+    from pipecat.frames.frames import TTSSpeakFrame
+    registry = FakeRegistry()
+    context = LLMContext(messages=[{"role": "user", "content": "Jarvis, set a timer for 10 minutes."}])
+    fast_path = IntentFastPath(context=context, registry=registry)
+    pushed = []
+    async def fake_push(frame, direction=FrameDirection.DOWNSTREAM):
+        pushed.append(frame)
+    fast_path.push_frame = fake_push
+
+    await fast_path.process_frame(LLMContextFrame(context=context), FrameDirection.DOWNSTREAM)
+    assert registry.calls == [{"alarm_name": "Timer", "minutes": 10}]
+    assert [type(f) for f in pushed] == [TTSSpeakFrame]
+    assert context.messages[-1] == {"role": "assistant", "content": "Timer set for 10 minutes, Sir."}
+
+    context.add_message({"role": "user", "content": "Jarvis, what is on my calendar?"})
+    frame = LLMContextFrame(context=context)
+    await fast_path.process_frame(frame, FrameDirection.DOWNSTREAM)
+    assert pushed[-1] is frame
+
+class StubLLM(FrameProcessor):
+    """Records when each turn arrives and speaks for ``speak_secs`` like the bot would."""
+    def __init__(self, speak_secs=0.0):
+        super().__init__()
+        self.speak_secs = speak_secs
+        self.turns = []
+
+    async def process_frame(self, frame, direction):
+        await super().process_frame(frame, direction)
+        if isinstance(frame, LLMContextFrame):
+            self.turns.append((time.monotonic(), frame.context.messages[-1]["content"]))
+            if self.speak_secs:
+                await self.push_frame(BotStartedSpeakingFrame(), FrameDirection.UPSTREAM)
+                await asyncio.sleep(self.speak_secs)
+                await self.push_frame(BotStoppedSpeakingFrame(), FrameDirection.UPSTREAM)
+            return
+        await self.push_frame(frame, direction)
+
+async def run_pipeline(*processors):
+    task = PipelineTask(Pipeline(list(processors)))
+    runner = asyncio.create_task(PipelineRunner(handle_sigint=False).run(task))
+    await asyncio.sleep(0.1)
+    return task, runner
+
+@pytest.mark.asyncio
+async def test_message_injector_sends_prompt_without_other_frames():
+    context = LLMContext(messages=[{"role": "system", "content": "You are Jarvis."}])
+    injector = MessageInjector(context=context, coalesce_secs=0.02)
+    llm = StubLLM()
+    task, runner = await run_pipeline(injector, llm)
+
+    scheduled = time.monotonic()
+    injector.schedule("Remind Sir about the oven.")
+    await asyncio.sleep(0.2)
+    await task.cancel()
+    await runner
+
+    assert [text for _, text in llm.turns] == ["Remind Sir about the oven."]
+    assert llm.turns[0][0] - scheduled < 0.1
+    assert context.messages[-1] == {"role": "user", "content": "Remind Sir about the oven."}
+
+@pytest.mark.asyncio
+async def test_message_injector_coalesces_and_waits_for_bot_to_finish():
+    context = LLMContext(messages=[])
+    injector = MessageInjector(context=context, coalesce_secs=0.02)
+    llm = StubLLM(speak_secs=0.3)
+    task, runner = await run_pipeline(injector, llm)
+
+    injector.schedule("First.")
+    injector.schedule("Second.")
+    await asyncio.sleep(0.1)
+    # The bot is answering the first turn, the third prompt waits until it has finished
+    injector.schedule("Third.")
+    await asyncio.sleep(0.5)
+    await task.cancel()
+    await runner
+
+    assert [text for _, text in llm.turns] == ["First.\nSecond.", "Third."]
+    assert llm.turns[1][0] - llm.turns[0][0] >= 0.3
+    assert max(injector.latencies) < 0.4
+
+@pytest.mark.asyncio
+async def test_fast_path_still_answers_after_ambient_lead_in():
+    context = LLMContext(messages=[{"role": "system", "content": "You are Jarvis."}])
+    gate = WakeWordGate(context, drop_ambient=True, lead_in_secs=10)
+    registry = FakeRegistry()
+    llm = StubLLM()
+    task, runner = await run_pipeline(gate, IntentFastPath(context=context, registry=registry), llm)
+
+    async def say(text):
+        context.add_message({"role": "user", "content": text})
+        await task.queue_frame(LLMContextFrame(context=context))
+        await asyncio.sleep(0.1)
+
+    await say("pass the salt please")
+    await say("Jarvis, set a timer for 10 minutes.")
+    await say("Jarvis, what is on my calendar?")
+    await task.cancel()
+    await runner
+
+    assert registry.calls == [{"alarm_name": "Timer", "minutes": 10}]
+    assert context.messages[1]["content"].startswith(WakeWordGate.LEAD_IN_PREFIX + "pass the salt please)")
+    # The ambient line went with the timer turn and is not attached to the next one
+    assert [text for _, text in llm.turns] == ["Jarvis, what is on my calendar?"]
+
+@pytest.mark.asyncio
+async def test_context_governor_summarizes_once_the_bot_stopped_speaking():
+    summarized = []
+    async def summarize(text):
+        summarized.append(time.monotonic())
+        return "Sir asked ten questions."
+
+    context = LLMContext(messages=conversation(10))
+    governor = ContextGovernor(context, max_tokens=600, keep_turns=3, summarize=summarize)
+    async def fake_push(frame, direction=FrameDirection.DOWNSTREAM):
+        pass
+    governor.push_frame = fake_push
+
+    await governor.process_frame(LLMContextFrame(context=context), FrameDirection.DOWNSTREAM)
+    await asyncio.sleep(0.1)
+    assert summarized == []
+
+    stopped = time.monotonic()
+    await governor.process_frame(BotStoppedSpeakingFrame(), FrameDirection.UPSTREAM)
+    await governor._summary_task
+    assert summarized and summarized[0] >= stopped
+
+class SilentTTS(TTSService):
+    def __init__(self):
+        super().__init__(sample_rate=16000)
+
+    def can_generate_metrics(self):
+        return False
+
+    async def run_tts(self, text, *args):
+        yield TTSStartedFrame()
+        yield TTSAudioRawFrame(audio=b"\0\0" * 160, sample_rate=16000, num_channels=1)
+        yield TTSStoppedFrame()
+
+class AnsweringLLM(FrameProcessor):
+    """Answers every turn with the same streamed reply."""
+    def __init__(self, reply):
+        super().__init__()
+        self.reply = reply
+
+    async def process_frame(self, frame, direction):
+        await super().process_frame(frame, direction)
+        if isinstance(frame, LLMContextFrame):
+            await self.push_frame(LLMFullResponseStartFrame())
+            await self.push_frame(LLMTextFrame(self.reply))
+            await self.push_frame(LLMFullResponseEndFrame())
+            return
+        await self.push_frame(frame, direction)
+
+async def converse(context, processors, *turns):
+    """Runs turns through ``processors``, an LLM, TTS and the assistant aggregator, returns the assistant messages."""
+    task, runner = await run_pipeline(*processors, AnsweringLLM("Why did the chicken cross the road."), SilentTTS(), LLMContextAggregatorPair(context).assistant())
+    for text in turns:
+        context.add_message({"role": "user", "content": text})
+        await task.queue_frame(LLMContextFrame(context=context))
+        await asyncio.sleep(0.3)
+    await task.cancel()
+    await runner
+    return [m["content"] for m in context.messages if m["role"] == "assistant"]
+
+@pytest.mark.asyncio
+async def test_fast_path_reply_is_stored_once():
+    context = LLMContext(messages=[])
+    replies = await converse(context, [IntentFastPath(context=context)], "Jarvis, what time is it?", "Jarvis, tell me a joke.")
+    assert len(replies) == 2
+    assert replies[0].startswith("It is ") and replies[0].endswith(", Sir.")
+    assert replies[1] == "Why did the chicken cross the road."
+
+@pytest.mark.asyncio
+async def test_readiness_notice_is_not_stored_with_the_held_reply():
+    context = LLMContext(messages=[])
+    ready = asyncio.Event()
+    asyncio.get_running_loop().call_later(0.2, ready.set)
+    replies = await converse(context, [LLMReadinessGate(ready=ready, defer_message="Wait.")], "Jarvis, tell me a joke.")
+    assert replies == ["Why did the chicken cross the road."]
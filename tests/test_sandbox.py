@@ -1,6 +1,7 @@
 import pytest
 from unittest.mock import MagicMock
 from src.functions import sandbox
+from src import sandbox_worker
 from pipecat.services.llm_service import FunctionCallParams
 
 import asyncio
@@ -46,3 +47,47 @@ async def test_execute_run_python_code_math_library():
     params.result_callback.assert_called_once()
     result = params.result_callback.call_args[0][0]
     assert "4.0" in result
+
+@pytest.mark.asyncio
+async def test_runaway_code_times_out_and_worker_is_replaced(monkeypatch):
+    monkeypatch.setattr(sandbox, "SANDBOX_TIMEOUT", 0.5)
+    params = mock_params("while True:\n    pass")
+
+    await sandbox.execute_run_python_code(params)
+
+    assert "did not finish within 0.5 seconds" in params.result_callback.call_args[0][0]
+    params = mock_params("print(sum(range(10)))")
+    await sandbox.execute_run_python_code(params)
+    assert "45" in params.result_callback.call_args[0][0]
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(sandbox_worker.resource is None, reason="resource limits need the resource module")
+async def test_cpu_and_memory_limits(monkeypatch):
+    monkeypatch.setattr(sandbox, "SANDBOX_CPU_SECONDS", 1)
+    params = mock_params("while True:\n    pass")
+    await sandbox.execute_run_python_code(params)
+    assert "CPU limit" in params.result_callback.call_args[0][0]
+
+    params = mock_params("data = bytearray(2 * 1024 ** 3)")
+    await sandbox.execute_run_python_code(params)
+    assert "memory limit" in params.result_callback.call_args[0][0]
+
+@pytest.mark.asyncio
+async def test_output_is_capped(monkeypatch):
+    monkeypatch.setattr(sandbox, "SANDBOX_OUTPUT_LIMIT", 100)
+    params = mock_params("print('x' * 1000)")
+
+    await sandbox.execute_run_python_code(params)
+
+    result = params.result_callback.call_args[0][0]
+    assert result.startswith("x" * 100 + "\n[Output truncated")
+
+@pytest.mark.asyncio
+async def test_run_reports_busy_when_no_worker_frees_up(monkeypatch):
+    monkeypatch.setattr(sandbox, "SANDBOX_BUSY_TIMEOUT", 0.1)
+    monkeypatch.setattr(sandbox, "_pool", sandbox.SandboxPool(size=0))
+    params = mock_params("print(1)")
+
+    await sandbox.execute_run_python_code(params)
+
+    assert "Sandbox busy" in params.result_callback.call_args[0][0]
@@ -0,0 +1,150 @@
+import asyncio
+import json
+import time
+import pytest
+from unittest.mock import MagicMock
+from src import timer_service
+from src.timer_service import TimerService
+from src.functions import scheduler
+
+def recorder(fired):
+    async def handler(timer, late):
+        fired.append((timer.payload["name"], late))
+    return handler
+
+@pytest.mark.asyncio
+async def test_timers_fire_in_due_order_and_cancelled_ones_do_not(tmp_path):
+    fired = []
+    timers = TimerService(str(tmp_path / "timers.jsonl"))
+    timers.register("alarm", recorder(fired))
+    timers.start()
+    timers.schedule("alarm", 0.15, {"name": "late"})
+    timers.schedule("alarm", 0.05, {"name": "early"})
+    cancelled = timers.schedule("alarm", 0.1, {"name": "cancelled"})
+    assert timers.cancel(cancelled.id)
+    assert not timers.cancel(cancelled.id)
+    assert [t.payload["name"] for t in timers.list("alarm")] == ["early", "late"]
+
+    await asyncio.sleep(0.3)
+    timers.stop()
+
+    assert [name for name, _ in fired] == ["early", "late"]
+    assert all(late < 0.1 for _, late in fired)
+    assert timers.list() == []
+
+@pytest.mark.asyncio
+async def test_restore_fires_missed_timers_within_grace(tmp_path):
+    journal = tmp_path / "timers.jsonl"
+    now = time.time()
+    records = [
+        {"op": "add", "id": 1, "due": now - 30, "kind": "alarm", "payload": {"name": "recent"}},
+        {"op": "add", "id": 2, "due": now - 3600, "kind": "alarm", "payload": {"name": "stale"}},
+        {"op": "add", "id": 3, "due": now - 3600, "kind": "unblock", "payload": {"name": "unblock"}},
+        {"op": "add", "id": 4, "due": now + 3600, "kind": "alarm", "payload": {"name": "pending"}},
+        {"op": "add", "id": 5, "due": now - 30, "kind": "alarm", "payload": {"name": "cancelled"}},
+        {"op": "cancel", "id": 5},
+    ]
+    journal.write_text("".join(json.dumps(r) + "\n" for r in records) + '{"op": "add", "id": 6, "du')
+
+    fired = []
+    timers = TimerService(str(journal))
+    timers.register("alarm", recorder(fired), missed_grace=600)
+    timers.start()
+    await asyncio.sleep(0.05)
+    # A kind registered after the driver started still gets its missed timers
+    timers.register("unblock", recorder(fired))
+    await asyncio.sleep(0.05)
+    timers.stop()
+
+    assert sorted(name for name, _ in fired) == ["recent", "unblock"]
+    assert dict(fired)["recent"] >= 30
+    assert [t.id for t in timers.list()] == [4]
+    assert timers.schedule("alarm", 60).id == 6
+
+    # Fired and skipped timers are not restored again
+    restored = TimerService(str(journal))
+    restored.restore()
+    assert [t.id for t in restored.list()] == [6, 4]
+
+def test_journal_is_compacted_to_pending_timers(tmp_path, monkeypatch):
+    monkeypatch.setattr(timer_service, "COMPACT_AFTER", 20)
+    journal = tmp_path / "timers.jsonl"
+    timers = TimerService(str(journal))
+    keep = timers.schedule("alarm", 60, {"name": "keep"})
+    for _ in range(30):
+        timers.cancel(timers.schedule("alarm", 60).id)
+    timers.stop()
+
+    assert len(journal.read_text().splitlines()) < 20
+    restored = TimerService(str(journal))
+    restored.restore()
+    assert [t.id for t in restored.list()] == [keep.id]
+
+@pytest.mark.asyncio
+async def test_scheduled_prompt_is_injected(tmp_path, monkeypatch):
+    timers = TimerService(str(tmp_path / "timers.jsonl"))
+    timers.register("prompt", scheduler._inject)
+    monkeypatch.setattr(scheduler, "TIMERS", timers)
+    injector = MagicMock()
+    scheduler.set_injector(injector)
+    params = MagicMock()
+    params.arguments = {"prompt": "check the oven", "delay_seconds": 0}
+    params.result_callback = MagicMock(return_value=asyncio.Future())
+    params.result_callback.return_value.set_result(None)
+
+    timers.start()
+    await scheduler.execute_schedule_prompt(params)
+    await asyncio.sleep(0.05)
+    timers.stop()
+    scheduler.set_injector(None)
+
+    injector.schedule.assert_called_once_with("check the oven")
+
+@pytest.mark.asyncio
+async def test_restored_timer_reaches_handler_with_its_id(tmp_path):
+    journal = tmp_path / "timers.jsonl"
+    timers = TimerService(str(journal))
+    scheduled = timers.schedule("unblock", -1, {"domains": ["example.com"], "name": "Block example.com"})
+    timers.stop()
+
+    fired = []
+    async def handler(timer, late):
+        fired.append((timer.id, timer.payload))
+    restored = TimerService(str(journal))
+    restored.register("unblock", handler)
+    restored.start()
+    await asyncio.sleep(0.05)
+    restored.stop()
+
+    assert fired == [(scheduled.id, {"domains": ["example.com"], "name": "Block example.com"})]
+
+@pytest.mark.asyncio
+async def test_block_is_lifted_after_restart(tmp_path, monkeypatch):
+    pytest.importorskip("plyer")
+    from src.functions import website_blocker
+    command_file = tmp_path / "block-commands.json"
+    monkeypatch.setattr(website_blocker, "COMMAND_FILE_PATH", str(command_file))
+    monkeypatch.setattr(website_blocker, "_show_notification", lambda title, message: None)
+    journal = tmp_path / "timers.jsonl"
+    timers = TimerService(str(journal))
+    monkeypatch.setattr(website_blocker, "TIMERS", timers)
+    params = MagicMock()
+    params.arguments = {"websites": ["example.com"], "minutes": 1}
+    params.result_callback = MagicMock(return_value=asyncio.Future())
+    params.result_callback.return_value.set_result(None)
+    await website_blocker.execute_block_websites(params)
+    block_id = json.loads(command_file.read_text())["block_id"]
+    timers.stop()
+
+    # Restarted after the block ran out
+    records = [json.loads(line) for line in journal.read_text().splitlines()]
+    records[0]["due"] = time.time() - 5
+    journal.write_text("".join(json.dumps(r) + "\n" for r in records))
+    restored = TimerService(str(journal))
+    restored.register("unblock", website_blocker._trigger_unblock)
+    restored.start()
+    await asyncio.sleep(0.05)
+    restored.stop()
+
+    command = json.loads(command_file.read_text())
+    assert command["command"] == "unblock" and command["block_id"] == block_id
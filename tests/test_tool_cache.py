@@ -0,0 +1,83 @@
+import asyncio
+import pytest
+from src import tool_cache
+from src.tool_cache import ToolCache
+
+def counting_loader(value, delay=0.0):
+    calls = []
+    async def load():
+        calls.append(value)
+        await asyncio.sleep(delay)
+        return value
+    return load, calls
+
+@pytest.mark.asyncio
+async def test_cache_hits_until_ttl_expires(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(tool_cache.time, "monotonic", lambda: now[0])
+    cache = ToolCache()
+    load, calls = counting_loader("result")
+
+    assert await cache.fetch("search", "query", load, ttl=60) == "result"
+    assert await cache.fetch("search", "query", load, ttl=60) == "result"
+    now[0] += 61
+    await cache.fetch("search", "query", load, ttl=60)
+
+    assert len(calls) == 2
+    assert cache.stats["search"]["hits"] == 1
+
+@pytest.mark.asyncio
+async def test_wider_result_answers_narrower_request():
+    cache = ToolCache()
+    load, calls = counting_loader(list(range(7)))
+    narrow = lambda items, n: items[:n]
+
+    await cache.fetch("emails", None, load, ttl=60, span=7, narrow=narrow)
+    assert await cache.fetch("emails", None, load, ttl=60, span=2, narrow=narrow) == [0, 1]
+    # A wider request than anything cached still goes to the API
+    wider, wider_calls = counting_loader(list(range(10)))
+    await cache.fetch("emails", None, wider, ttl=60, span=10, narrow=narrow)
+
+    assert len(calls) == 1 and len(wider_calls) == 1
+    assert cache.stats["emails"]["narrowed"] == 1
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_one_fetch():
+    cache = ToolCache()
+    load, calls = counting_loader(list(range(7)), delay=0.01)
+    narrow = lambda items, n: items[:n]
+
+    results = await asyncio.gather(
+        cache.fetch("calendar", None, load, ttl=60, span=7, narrow=narrow),
+        cache.fetch("calendar", None, load, ttl=60, span=7, narrow=narrow),
+        cache.fetch("calendar", None, load, ttl=60, span=1, narrow=narrow),
+    )
+
+    assert results == [list(range(7)), list(range(7)), [0]]
+    assert len(calls) == 1
+    assert cache.stats["calendar"]["joined"] == 2
+
+@pytest.mark.asyncio
+async def test_failures_are_not_cached_and_lru_evicts():
+    cache = ToolCache(max_entries=2)
+    async def fail():
+        raise RuntimeError("API down")
+    with pytest.raises(RuntimeError):
+        await cache.fetch("search", "a", fail, ttl=60)
+
+    for key in ["a", "b", "c"]:
+        load, _ = counting_loader(key)
+        await cache.fetch("search", key, load, ttl=60)
+    load, _ = counting_loader("a again")
+
+    assert await cache.fetch("search", "a", load, ttl=60) == "a again"
+    assert cache.evictions >= 1
+
+@pytest.mark.asyncio
+async def test_tool_without_cache_ttl_is_never_cached():
+    cache = ToolCache()
+    load, calls = counting_loader("result")
+    await cache.fetch("uncached", "query", load, ttl=None)
+    await cache.fetch("uncached", "query", load, ttl=None)
+    assert len(calls) == 2
+    assert "uncached" not in cache.stats
@@ -0,0 +1,90 @@
+import sys
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from pipecat.adapters.schemas.function_schema import FunctionSchema
+from src.tool_registry import ToolRegistry, compact_schema
+
+TOOL_MODULE = """
+import asyncio
+from pipecat.adapters.schemas.function_schema import FunctionSchema
+from tool_registry import Tool
+
+calls = []
+warmed = False
+
+def warm_up():
+    global warmed
+    warmed = True
+
+async def handler(params):
+    calls.append(params)
+
+async def slow_handler(params):
+    await asyncio.sleep(10)
+
+TOOLS = [
+    Tool(FunctionSchema(name="{name}_tool", description="A   tool.", properties={}, required=[]), handler),
+    Tool(FunctionSchema(name="{name}_slow", description="Slow.", properties={}, required=[]), slow_handler, timeout_secs=0.01, cancel_on_interruption=False),
+]
+"""
+
+@pytest.fixture
+def tool_modules(tmp_path, monkeypatch):
+    index = {}
+    for name in ["lazy_enabled", "lazy_disabled"]:
+        (tmp_path / f"{name}.py").write_text(TOOL_MODULE.replace("{name}", name))
+        monkeypatch.delitem(sys.modules, name, raising=False)
+        index[f"{name}_tool"] = index[f"{name}_slow"] = name
+    monkeypatch.syspath_prepend(str(tmp_path))
+    return index
+
+@pytest.mark.asyncio
+async def test_registry_only_imports_enabled_tools(tool_modules):
+    registry = ToolRegistry(enabled=["lazy_enabled_tool"], modules=tool_modules)
+    assert "lazy_enabled" not in sys.modules
+
+    llm = MagicMock()
+    registry.register(llm)
+    name, handler = llm.register_function.call_args[0]
+    assert name == "lazy_enabled_tool"
+    assert llm.register_function.call_args[1] == {"cancel_on_interruption": True}
+    await handler("params")
+    await registry.warm_up()
+
+    assert sys.modules["lazy_enabled"].calls == ["params"]
+    assert sys.modules["lazy_enabled"].warmed
+    assert "lazy_disabled" not in sys.modules
+
+def test_registry_rejects_unknown_tools(tool_modules):
+    with pytest.raises(ValueError):
+        ToolRegistry(enabled=["missing_tool"], modules=tool_modules)
+
+@pytest.mark.asyncio
+async def test_registry_enforces_timeouts(tool_modules):
+    registry = ToolRegistry(enabled=["lazy_enabled_slow"], modules=tool_modules)
+    params = MagicMock()
+    params.result_callback = AsyncMock()
+
+    await registry.handler("lazy_enabled_slow")(params)
+
+    assert "did not respond" in params.result_callback.call_args[0][0]["error"]
+
+def test_compact_schema_drops_empty_fields(tool_modules):
+    registry = ToolRegistry(enabled=["lazy_enabled_tool"], modules=tool_modules)
+    assert registry.schemas()[0].to_default_dict() == {
+        "name": "lazy_enabled_tool",
+        "description": "A tool.",
+        "parameters": {"type": "object"},
+    }
+
+    schema = compact_schema(FunctionSchema(
+        name="search",
+        description="Search\n  the web.",
+        properties={"query": {"type": "string", "description": " The  query. "}},
+        required=["query"],
+    ))
+    assert schema.to_default_dict()["parameters"] == {
+        "type": "object",
+        "properties": {"query": {"type": "string", "description": "The query."}},
+        "required": ["query"],
+    }
@@ -0,0 +1,59 @@
+from pipecat.adapters.schemas.function_schema import FunctionSchema
+from pipecat.services.llm_service import LLMContext
+from src.tool_router import ToolRouter, tokenize
+from src.processors import ToolSelector
+from src.tool_registry import Tool
+
+async def handler(params):
+    pass
+
+def tool(name, description, examples=()):
+    return Tool(FunctionSchema(name=name, description=description, properties={}, required=[]), handler, examples=list(examples))
+
+TOOLS = [
+    tool("search_internet", "Search the internet for any additional information.", ["what's the weather like"]),
+    tool("get_recent_emails", "Get the most recent emails from the user's Gmail account.", ["check my inbox"]),
+    tool("get_calendar_events", "Get Google Calendar events.", ["what do I have today", "my next meeting"]),
+    tool("schedule_alarm", "Schedule an alarm to go off at a specific time.", ["wake me up in 20 minutes"]),
+]
+
+def test_tokenize_drops_stopwords_and_plurals():
+    assert tokenize("Jarvis, what are my Emails?") == ["email"]
+
+def test_router_picks_matching_tools_plus_fallback():
+    router = ToolRouter(TOOLS, top_k=1)
+    assert router.rank("Jarvis, summarize my last email")[0][0] == "get_recent_emails"
+    assert router.select("When is my next meeting?") == ["search_internet", "get_calendar_events"]
+    assert router.select("Hello Jarvis.") == ["search_internet"]
+
+def test_tool_selector_keeps_tools_for_follow_ups():
+    context = LLMContext(messages=[{"role": "user", "content": "Wake me up in ten minutes"}])
+    selector = ToolSelector(context=context, router=ToolRouter(TOOLS, top_k=1))
+    selector.select()
+    assert [s.name for s in context.tools.standard_tools] == ["search_internet", "schedule_alarm"]
+
+    context.add_message({"role": "assistant", "content": "For ten minutes, Sir?"})
+    context.add_message({"role": "user", "content": "Yes."})
+    selector.select()
+    assert selector.last_selection == ["search_internet", "schedule_alarm"]
+
+def test_selection_sticks_until_a_strong_match_is_missing():
+    router = ToolRouter(TOOLS, top_k=2)
+    current = router.select("Wake me up before my meeting")
+    assert current == ["search_internet", "get_calendar_events", "schedule_alarm"]
+    assert router.select("Move the alarm to 7", current=current) == current
+    assert router.select("Thanks.", current=current) == current
+    assert router.select("Check my inbox", current=current) == ["search_internet", "get_recent_emails"]
+
+def test_tool_selector_leaves_tools_alone_while_the_selection_sticks():
+    context = LLMContext(messages=[{"role": "user", "content": "Wake me up before my meeting"}])
+    selector = ToolSelector(context=context, router=ToolRouter(TOOLS, top_k=2))
+    selector.select()
+    tools = context.tools
+    context.add_message({"role": "user", "content": "Snooze the alarm for ten minutes"})
+    selector.select()
+    assert context.tools is tools
+
+    context.add_message({"role": "user", "content": "Check my inbox"})
+    selector.select()
+    assert [s.name for s in context.tools.standard_tools] == ["search_internet", "get_recent_emails"]
@@ -0,0 +1,58 @@
+import asyncio
+import datetime
+import gzip
+import os
+import pytest
+from src.transcript import TranscriptWriter
+
+class FakeClock:
+    def __init__(self, when):
+        self.when = when
+
+    def __call__(self):
+        return self.when
+
+@pytest.mark.asyncio
+async def test_lines_are_written_in_order_under_week_and_day(tmp_path):
+    clock = FakeClock(datetime.datetime(2026, 2, 3, 16, 12, 38))
+    transcript = TranscriptWriter(base_dir=str(tmp_path), flush_interval=0.05, clock=clock)
+    transcript.start()
+    transcript.write("User", "Jarvis, what time is it?")
+    transcript.write("Jarvis", "It is 4:12 PM, Sir.")
+    await asyncio.sleep(0.15)
+
+    path = tmp_path / "Week_6" / "Tuesday" / "2026-02-03_16-12-38.txt"
+    # Flushed on the interval, before the transcript is closed
+    assert path.read_text() == "User: Jarvis, what time is it?\nJarvis: It is 4:12 PM, Sir.\n"
+
+    transcript.write("User", "Thank you.")
+    await transcript.close()
+    assert path.read_text().endswith("User: Thank you.\n")
+
+@pytest.mark.asyncio
+async def test_rotates_on_new_day_and_size_and_compresses(tmp_path):
+    clock = FakeClock(datetime.datetime(2026, 2, 3, 23, 59, 0))
+    transcript = TranscriptWriter(base_dir=str(tmp_path), max_bytes=40, compress=True, clock=clock)
+    transcript.start()
+    transcript.write("User", "x" * 40)
+    transcript.write("User", "Over the size limit")
+    await asyncio.sleep(0.05)
+    clock.when = datetime.datetime(2026, 2, 4, 0, 1, 0)
+    transcript.write("User", "The next day")
+    await transcript.close()
+
+    names = [os.path.relpath(p, tmp_path) for p in transcript.closed_paths]
+    assert names == [
+        os.path.join("Week_6", "Tuesday", "2026-02-03_23-59-00.txt.gz"),
+        os.path.join("Week_6", "Tuesday", "2026-02-03_23-59-00_1.txt.gz"),
+        os.path.join("Week_6", "Wednesday", "2026-02-04_00-01-00.txt.gz"),
+    ]
+    assert [gzip.open(p, "rt").read() for p in transcript.closed_paths] == ["User: " + "x" * 40 + "\n", "User: Over the size limit\n", "User: The next day\n"]
+    assert not list(tmp_path.rglob("*.txt"))
+
+@pytest.mark.asyncio
+async def test_close_without_start_writes_queued_lines(tmp_path):
+    transcript = TranscriptWriter(base_dir=str(tmp_path), clock=FakeClock(datetime.datetime(2026, 1, 30, 20, 25, 48)))
+    transcript.write("Jarvis", "Goodbye, Sir.")
+    await transcript.close()
+    assert (tmp_path / "Week_5" / "Friday" / "2026-01-30_20-25-48.txt").read_text() == "Jarvis: Goodbye, Sir.\n"
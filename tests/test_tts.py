@@ -0,0 +1,261 @@
+import pytest
+import asyncio
+import os
+import sys
+import stat
+import json
+import numpy as np
+from src import tts
+
+# Stand-in for piper.exe. In output directory mode it writes one WAV per stdin line and echoes
+# the path, in raw mode it streams PCM for all of stdin in small pieces.
+# Every character of text becomes 100 samples of value 1000, and "crash" kills the process.
+FAKE_PIPER = f"""#!{sys.executable}
+import sys, os, time, wave
+sample = (1000).to_bytes(2, "little", signed=True)
+if "--output_raw" in sys.argv:
+    data = sample * (100 * len(sys.stdin.read().strip()))
+    for i in range(0, len(data), 333):
+        sys.stdout.buffer.write(data[i : i + 333])
+        sys.stdout.buffer.flush()
+    sys.exit(0)
+out_dir = sys.argv[sys.argv.index("--output_dir") + 1]
+for n, line in enumerate(sys.stdin):
+    text = line.strip()
+    if text == "crash":
+        sys.exit(1)
+    if text.startswith("slow"):
+        time.sleep(0.3)
+    path = os.path.join(out_dir, f"{{os.getpid()}}-{{n}}.wav")
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(22050)
+        wav.writeframes(sample * (100 * len(text)))
+    print(path, flush=True)
+"""
+
+@pytest.fixture
+def fake_piper(tmp_path):
+    path = tmp_path / "piper"
+    path.write_text(FAKE_PIPER)
+    path.chmod(path.stat().st_mode | stat.S_IEXEC)
+    return str(path)
+
+@pytest.mark.asyncio
+async def test_pool_reuses_workers(fake_piper):
+    pool = tts.PiperWorkerPool(piper_path=fake_piper, voice_path="voice.onnx", size=1)
+    await pool.start()
+    try:
+        pid = pool._workers[0]._process.pid
+        first = await pool.synthesize("hello")
+        second = await pool.synthesize("hi there")
+
+        assert len(first) == 2 * 100 * 5
+        assert len(second) == 2 * 100 * 8
+        assert pool._workers[0]._process.pid == pid
+        assert pool.requests == 2
+        assert os.listdir(pool._output_dir) == []
+    finally:
+        await pool.stop()
+
+@pytest.mark.asyncio
+async def test_pool_replaces_worker_cancelled_mid_request(fake_piper):
+    pool = tts.PiperWorkerPool(piper_path=fake_piper, voice_path="voice.onnx", size=1)
+    await pool.start()
+    try:
+        pid = pool._workers[0]._process.pid
+        task = asyncio.create_task(pool.synthesize("slow sentence, interrupted"))
+        await asyncio.sleep(0.1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        # The cancelled request's audio must not answer this one
+        assert len(await pool.synthesize("hi")) == 2 * 100 * 2
+        assert pool._workers[0]._process.pid != pid
+    finally:
+        await pool.stop()
+
+@pytest.mark.asyncio
+async def test_pool_restarts_crashed_worker(fake_piper):
+    pool = tts.PiperWorkerPool(piper_path=fake_piper, voice_path="voice.onnx", size=1)
+    await pool.start()
+    try:
+        pid = pool._workers[0]._process.pid
+        with pytest.raises(RuntimeError):
+            await pool.synthesize("crash")
+
+        audio = await pool.synthesize("hello")
+        assert len(audio) == 2 * 100 * 5
+        assert pool._workers[0]._process.pid != pid
+    finally:
+        await pool.stop()
+    assert not pool.started
+
+@pytest.mark.asyncio
+async def test_run_tts_applies_volume(fake_piper):
+    service = tts.LocalPiperTTSService(piper_path=fake_piper, voice_path="voice.onnx", volume=0.5, pool_size=1)
+    try:
+        frames = [f async for f in service.run_tts("hello")]
+    finally:
+        await service._engine.stop()
+
+    audio_frames = [f for f in frames if isinstance(f, tts.TTSAudioRawFrame)]
+    audio = np.frombuffer(b"".join(f.audio for f in audio_frames), dtype=np.int16)
+    assert isinstance(frames[0], tts.TTSStartedFrame)
+    assert isinstance(frames[-1], tts.TTSStoppedFrame)
+    assert len(audio) == 500
+    assert np.all(audio == 500)
+
+@pytest.mark.asyncio
+async def test_run_tts_streaming_frames(fake_piper):
+    service = tts.LocalPiperTTSService(piper_path=fake_piper, voice_path="voice.onnx", volume=0.5, streaming=True, frame_ms=20)
+    try:
+        frames = [f async for f in service.run_tts("hello world")]
+    finally:
+        await service._engine.stop()
+
+    audio_frames = [f for f in frames if isinstance(f, tts.TTSAudioRawFrame)]
+    # 1100 samples at 22050 Hz split into 441 sample (20 ms) frames plus the remainder
+    assert [len(f.audio) for f in audio_frames] == [882, 882, 436]
+    audio = np.frombuffer(b"".join(f.audio for f in audio_frames), dtype=np.int16)
+    assert np.all(audio == 500)
+    assert service.last_first_audio_latency is not None
+
+class FakeSession:
+    def __init__(self):
+        self.calls = []
+
+    def run(self, outputs, args):
+        self.calls.append(args)
+        # 10 samples per phoneme id, peak normalized by the voice
+        return [np.full((1, 1, 10 * args["input"].shape[1]), 0.5, dtype=np.float32)]
+
+@pytest.mark.asyncio
+async def test_onnx_voice_streams_per_sentence(tmp_path, monkeypatch):
+    voice_path = tmp_path / "voice.onnx"
+    config = {
+        "audio": {"sample_rate": 16000},
+        "espeak": {"voice": "en-gb-x-rp"},
+        "inference": {"noise_scale": 0.6, "length_scale": 1.0, "noise_w": 0.8},
+        "num_speakers": 1,
+        "phoneme_id_map": {"^": [1], "$": [2], "_": [0], "h": [20], "i": [21]},
+    }
+    (tmp_path / "voice.onnx.json").write_text(json.dumps(config))
+    phonemize_calls = []
+    def fake_phonemize(text, voice, data_path=None):
+        phonemize_calls.append(text)
+        return [["h", "i"], ["h", "?"]]
+    monkeypatch.setattr(tts, "_phonemize_espeak", fake_phonemize)
+
+    service = tts.OnnxPiperTTSService(voice_path=str(voice_path), warm_up=False)
+    session = FakeSession()
+    service._voice._session = session
+
+    frames = [f async for f in service.run_tts("Hi. Huh?")]
+    await service._engine.stop()
+    [f async for f in service.run_tts("Hi. Huh?")]
+
+    first, second = session.calls[0]["input"][0].tolist(), session.calls[1]["input"][0].tolist()
+    assert first == [1, 20, 0, 21, 0, 2]
+    assert second == [1, 20, 0, 2]
+    assert phonemize_calls == ["Hi. Huh?"]
+    audio = np.frombuffer(b"".join(f.audio for f in frames if isinstance(f, tts.TTSAudioRawFrame)), dtype=np.int16)
+    assert len(audio) == 100
+    assert np.all(audio == 32767)
+
+@pytest.mark.asyncio
+async def test_run_tts_serves_cached_phrases(fake_piper, tmp_path):
+    service = tts.LocalPiperTTSService(piper_path=fake_piper, voice_path="voice.onnx", volume=0.5, streaming=True, cache_dir=str(tmp_path / "cache"))
+    try:
+        await service.prewarm_cache(["Yes, Sir."])
+        frames = [f async for f in service.run_tts("Yes,  Sir.")]
+    finally:
+        await service._engine.stop()
+
+    audio = np.frombuffer(b"".join(f.audio for f in frames if isinstance(f, tts.TTSAudioRawFrame)), dtype=np.int16)
+    assert service._cache.hits == 1
+    assert len(audio) == 900
+    assert np.all(audio == 500)
+
+@pytest.mark.asyncio
+async def test_prefetched_segments_play_in_order(fake_piper):
+    service = tts.LocalPiperTTSService(piper_path=fake_piper, voice_path="voice.onnx", streaming=True)
+    try:
+        assert service.prefetch("First.", max_pending=2)
+        assert service.prefetch("The second one.", max_pending=2)
+        assert not service.prefetch("Third.", max_pending=2)
+
+        lengths = []
+        for text in ["First.", "The second one.", "Third."]:
+            frames = [f async for f in service.run_tts(text)]
+            lengths.append(sum(len(f.audio) for f in frames if isinstance(f, tts.TTSAudioRawFrame)))
+    finally:
+        await service._stop_engine()
+
+    assert lengths == [2 * 100 * 6, 2 * 100 * 15, 2 * 100 * 6]
+    assert service._prefetched == {}
+
+def audio_bytes(frames):
+    return sum(len(f.audio) for f in frames if isinstance(f, tts.TTSAudioRawFrame))
+
+@pytest.mark.asyncio
+async def test_cached_phrase_keeps_next_segments_prefetch(fake_piper, tmp_path):
+    service = tts.LocalPiperTTSService(piper_path=fake_piper, voice_path="voice.onnx", streaming=True, cache_dir=str(tmp_path / "cache"))
+    try:
+        await service.prewarm_cache(["Yes, Sir."])
+        assert not service.prefetch("Yes, Sir.", max_pending=2)
+        assert service.prefetch("Right away.", max_pending=2)
+        prefetch, _ = service._prefetched["Right away."]
+
+        [f async for f in service.run_tts("Yes, Sir.")]
+        assert not prefetch.cancelled()
+        frames = [f async for f in service.run_tts("Right away.")]
+        assert service._prefetched == {}
+    finally:
+        await service._stop_engine()
+
+    assert service._cache.hits == 1
+    assert audio_bytes(frames) == 2 * 100 * 11
+
+@pytest.mark.asyncio
+async def test_segment_turned_down_by_full_lookahead_keeps_later_prefetch(fake_piper):
+    service = tts.LocalPiperTTSService(piper_path=fake_piper, voice_path="voice.onnx", streaming=True)
+    try:
+        assert service.prefetch("One.", max_pending=2)
+        assert service.prefetch("Two.", max_pending=2)
+        assert not service.prefetch("Three.", max_pending=2)
+        [f async for f in service.run_tts("One.")]
+        assert service.prefetch("Four.", max_pending=2)
+        later, _ = service._prefetched["Four."]
+
+        [f async for f in service.run_tts("Two.")]
+        [f async for f in service.run_tts("Three.")]
+        assert not later.cancelled()
+        frames = [f async for f in service.run_tts("Four.")]
+        assert service._prefetched == {}
+    finally:
+        await service._stop_engine()
+
+    assert audio_bytes(frames) == 2 * 100 * 5
+
+@pytest.mark.asyncio
+async def test_prefetch_ahead_of_played_segment_is_dropped(fake_piper):
+    service = tts.LocalPiperTTSService(piper_path=fake_piper, voice_path="voice.onnx", streaming=True)
+    try:
+        assert service.prefetch("**Right** away.", max_pending=2)
+        assert service.prefetch("Done.", max_pending=2)
+        stale, _ = service._prefetched["**Right** away."]
+
+        # Its markdown was filtered out before it reached run_tts, the next segment clears it
+        [f async for f in service.run_tts("Right away.")]
+        assert len(service._prefetched) == 2
+        frames = [f async for f in service.run_tts("Done.")]
+        await asyncio.sleep(0)
+        assert service._prefetched == {}
+        assert stale.done()
+    finally:
+        await service._stop_engine()
+
+    assert audio_bytes(frames) == 2 * 100 * 5
@@ -0,0 +1,52 @@
+import os
+import time
+from src.tts_cache import TTSCache
+
+def make_cache(tmp_path, **kwargs):
+    voice = tmp_path / "voice.onnx"
+    voice.write_bytes(b"model")
+    options = {"voice_path": str(voice), "sample_rate": 22050, "volume": 0.3}
+    options.update(kwargs)
+    return TTSCache(str(tmp_path / "cache"), **options)
+
+def test_key_normalizes_text_and_includes_voice_settings(tmp_path):
+    cache = make_cache(tmp_path)
+    assert cache.key("Yes,  Sir.\n") == cache.key("Yes, Sir.")
+    assert cache.key("Yes, Sir.") != make_cache(tmp_path, volume=0.5).key("Yes, Sir.")
+    assert cache.key("Yes, Sir.") != make_cache(tmp_path, sample_rate=16000).key("Yes, Sir.")
+
+def test_get_returns_memory_map(tmp_path):
+    cache = make_cache(tmp_path)
+    assert cache.get("Sir.") is None
+    cache.put("Sir.", b"\x01\x00\x02\x00")
+
+    with cache.get("Sir.") as audio:
+        assert audio[:] == b"\x01\x00\x02\x00"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_lru_eviction_under_budget(tmp_path):
+    cache = make_cache(tmp_path, max_bytes=10)
+    cache.put("one", b"a" * 4)
+    cache.put("two", b"b" * 4)
+    cache.get("one").close()
+    cache.put("three", b"c" * 4)
+
+    assert "one" in cache
+    assert "two" not in cache
+    assert "three" in cache
+    assert len(os.listdir(tmp_path / "cache")) == 2
+
+def test_index_reloaded_in_recency_order(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.put("old", b"a" * 4)
+    os.utime(os.path.join(tmp_path, "cache", f"{cache.key('old')}.pcm"), (time.time() - 60, time.time() - 60))
+    cache.put("new", b"b" * 4)
+
+    reloaded = make_cache(tmp_path, max_bytes=4)
+    assert "new" in reloaded
+    assert "old" not in reloaded
+
+def test_long_text_is_not_cached(tmp_path):
+    cache = make_cache(tmp_path, max_text_length=10)
+    cache.put("This sentence is far too long to cache.", b"a" * 4)
+    assert "This sentence is far too long to cache." not in cache